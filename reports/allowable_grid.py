@@ -0,0 +1,249 @@
+import argparse, csv, hashlib, json
+from fnmatch import fnmatch
+from pathlib import Path
+
+import numpy as np
+
+from instrument import add_arguments, session, span
+from range_index import load_index
+from reference_data import CACHE_DIR, is_placeholder, load_reference
+from torque_engine import TEMP_STEP_F
+
+# Dense allowable stress grids: one row per grade x diameter band, one column
+# per grid temperature. 'exact' follows the reports and the app (the band
+# containing the temperature, else the next tabulated temperature above it);
+# 'linear' interpolates between tabulated points as Section II-D permits.
+# Below the first tabulated point both use the first value; above the last
+# there is no allowable and lookups fall back to Sy like lookup_strength.
+
+GRID_VERSION = 2
+GRID_DIR = CACHE_DIR / 'allowable_grid'
+GRID_INPUTS = ('grades', 'allowable/*')
+MODES = ('exact', 'linear')
+
+
+class AllowableGrid:
+    # s[row, t] in ksi and used_temp[row, t] (the tabulated temperature read,
+    # or the temperature itself when interpolated) for temps[t]; rows are
+    # bands listed per grade in file order, rows_by_grade[grade] = [(dia_min, dia_max, row)].
+    __slots__ = ('key', 'mode', 'step', 'temps', 'grade', 'dia_min', 'dia_max', 's', 'used_temp', 'rows_by_grade')
+
+    def __init__(self, key, mode, step, temps, grade, dia_min, dia_max, s, used_temp):
+        self.key = key
+        self.mode = str(mode)
+        self.step = int(step)
+        self.temps = temps
+        self.grade = grade
+        self.dia_min = dia_min
+        self.dia_max = dia_max
+        self.s = s
+        self.used_temp = used_temp
+        self.rows_by_grade = {}
+        for row, (g, lo, hi) in enumerate(zip(grade.tolist(), dia_min.tolist(), dia_max.tolist())):
+            self.rows_by_grade.setdefault(g, []).append((lo, hi, row))
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in ('mode', 'step', 'temps', 'grade', 'dia_min', 'dia_max', 's',
+                                                         'used_temp')}
+
+    def band_rows(self, grades, dia_in):
+        # rows[i, j]: band row for grades[i] at diameter dia_in[j] (inches),
+        # -1 where no band covers it; the first matching band wins like FlangeMath.
+        rows = np.full((len(grades), len(dia_in)), -1)
+        for i, g in enumerate(grades):
+            for j, d in enumerate(dia_in):
+                rows[i, j] = next((row for lo, hi, row in self.rows_by_grade.get(g, ()) if lo <= d <= hi), -1)
+        return rows
+
+    def at(self, rows, temps):
+        # (s, used_temp) for band rows at arbitrary temperatures: 'exact'
+        # snaps up to the next grid column, 'linear' interpolates between the
+        # two neighbouring columns.
+        rows = np.asarray(rows)
+        temps = np.asarray(temps, dtype=float)
+        s = np.full(len(temps), np.nan)
+        used = np.full(len(temps), np.nan)
+        pos = (temps - self.temps[0]) / self.step
+        ok = (rows >= 0) & ~np.isnan(temps) & (pos <= len(self.temps) - 1)
+        pos = np.clip(pos, 0, len(self.temps) - 1)
+        r = rows[ok]
+        if self.mode == 'exact':
+            col = np.ceil(pos[ok] - 1e-9).astype(int)
+            s[ok] = self.s[r, col]
+            used[ok] = self.used_temp[r, col]
+        else:
+            lo = np.floor(pos[ok]).astype(int)
+            hi = np.minimum(lo + 1, len(self.temps) - 1)
+            frac = pos[ok] - lo
+            # on a column the next one is not read (it may be NaN past the table)
+            s[ok] = np.where(frac > 0, self.s[r, lo] * (1.0 - frac) + self.s[r, hi] * frac, self.s[r, lo])
+            covered = np.where(frac > 0, self.used_temp[r, hi], self.used_temp[r, lo])
+            used[ok] = np.where(np.isnan(covered), np.nan, temps[ok])
+        return s, used
+
+
+def _stress(value):
+    return float(value) if isinstance(value, (int, float)) and not is_placeholder(value) else np.nan
+
+
+def _exact_rows(bands, temps):
+    # Same rule as range_index._temp_index, for every grid temperature at once.
+    lo = np.array([t.tmin for t in bands], dtype=float)
+    hi = np.array([t.tmax for t in bands], dtype=float)
+    s = np.array([_stress(t.s) for t in bands])
+    grid = temps[:, None]
+    inside = (grid >= lo) & (grid <= hi)
+    above = np.where(hi >= grid, hi, np.inf)
+    pick = np.where(inside.any(axis=1), inside.argmax(axis=1), above.argmin(axis=1))
+    found = inside.any(axis=1) | np.isfinite(above.min(axis=1))
+    return np.where(found, s[pick], np.nan), np.where(found, hi[pick], np.nan)
+
+
+def _linear_rows(bands, temps):
+    # Ranged bands contribute both endpoints at the same stress; a missing
+    # value makes its neighbouring intervals NaN rather than bridging them.
+    points = sorted({(float(x), _stress(t.s)) for t in bands for x in (t.tmin, t.tmax)}, key=lambda p: p[0])
+    xs = np.array([p[0] for p in points])
+    ys = np.array([p[1] for p in points])
+    s = np.interp(temps, xs, ys, left=ys[0], right=np.nan)
+    return s, np.where(temps <= xs[-1], temps, np.nan)
+
+
+def grid_key(ref, step, mode):
+    inputs = {k: v for k, v in sorted(ref.fingerprints.items()) if any(fnmatch(k, p) for p in GRID_INPUTS)}
+    payload = json.dumps([GRID_VERSION, inputs, step, mode])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def check_step(step, mode):
+    # An exact grid snaps up to the next column, so its columns must include
+    # every tabulated temperature: with a 7 F step, 547 F snaps to 553 F and
+    # reads the band above 550 F. Linear grids only need a positive step.
+    if mode not in MODES:
+        raise ValueError(f'mode must be one of {MODES}')
+    if step <= 0:
+        raise ValueError(f'step must be a positive number of degrees F, got {step}')
+    if mode == 'exact' and TEMP_STEP_F % step:
+        raise ValueError(f'an exact grid step must divide the {TEMP_STEP_F} F tabulation step, got {step}')
+
+
+def build_grid(ref, step=10, mode='exact', key=''):
+    check_step(step, mode)
+    bands = [(g, r) for g in ref.grades for r in ref.allowable.get(g, []) if r.temps]
+    all_temps = [x for _, r in bands for t in r.temps for x in (t.tmin, t.tmax)]
+    lo = int(min(all_temps, default=100)) // step * step
+    hi = -(-int(max(all_temps, default=1000)) // step) * step
+    temps = np.arange(lo, hi + 1, step, dtype=float)
+    s = np.full((len(bands), len(temps)), np.nan)
+    used = np.full_like(s, np.nan)
+    fill = _exact_rows if mode == 'exact' else _linear_rows
+    for row, (_, r) in enumerate(bands):
+        s[row], used[row] = fill(r.temps, temps)
+    return AllowableGrid(
+        key, mode, step, temps,
+        np.array([g for g, _ in bands], dtype=str),
+        np.array([r.dia_min for _, r in bands], dtype=float),
+        np.array([r.dia_max for _, r in bands], dtype=float),
+        s, used,
+    )
+
+
+def _read_grid(path, key):
+    try:
+        with np.load(path) as data:
+            return AllowableGrid(key, **{name: data[name] for name in data.files})
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_grid(path, grid):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp, **grid.arrays())
+        tmp.replace(path)
+    except OSError:
+        pass
+
+
+_grids = {}
+
+
+def load_grid(ref=None, step=10, mode='exact', use_cache=True):
+    ref = ref if ref is not None else load_reference()
+    key = grid_key(ref, step, mode)
+    grid = _grids.get(key)
+    if grid is not None:
+        return grid
+    path = GRID_DIR / (key + '.npz')
+    grid = _read_grid(path, key) if use_cache else None
+    if grid is None:
+        with span('build_allowable_grid'):
+            grid = build_grid(ref, step, mode, key)
+        if use_cache:
+            _write_grid(path, grid)
+    _grids[key] = grid
+    return grid
+
+
+def grid_lookup(step=10, mode='exact'):
+    # A drop-in for torque_engine.lookup_strength backed by the grid:
+    # compute_torque(..., lookup=grid_lookup(1, 'linear')).
+    check_step(step, mode)
+
+    def lookup(grade, dia_key, temp, ref=None):
+        ref = ref if ref is not None else load_reference()
+        grid = load_grid(ref, step, mode)
+        index = load_index(ref)
+        grade_names, grade_codes = np.unique(np.asarray(grade, dtype=str), return_inverse=True)
+        dia_names, dia_codes = np.unique(np.asarray(dia_key, dtype=str), return_inverse=True)
+        grade_names = grade_names.tolist()
+        dia_in = [ref.diameter_in.get(d, np.nan) for d in dia_names.tolist()]
+        # band row and Sy resolved once per grade x diameter, then gathered per row
+        rows = grid.band_rows(grade_names, dia_in)
+        sy = np.array([[_stress(index.lookup_sy(g, d)) if not np.isnan(d) else np.nan for d in dia_in]
+                       for g in grade_names]).reshape(rows.shape)
+        s, used = grid.at(rows[grade_codes, dia_codes], temp)
+        # Sy only where no band covers the temperature; a placeholder stays NaN
+        missing = np.isnan(used)
+        s[missing] = sy[grade_codes[missing], dia_codes[missing]]
+        return s, used
+
+    return lookup
+
+
+def write_grid_csv(path, grid):
+    columns = ['grade', 'dia_min_in', 'dia_max_in'] + [f'T{int(t)}F' for t in grid.temps]
+    with Path(path).open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in range(len(grid.grade)):
+            values = ['' if np.isnan(v) else round(float(v), 3) for v in grid.s[row]]
+            writer.writerow([grid.grade[row], grid.dia_min[row], grid.dia_max[row], *values])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a dense allowable stress grid per grade and diameter band.')
+    parser.add_argument('--step', type=int, default=10, help='grid resolution in F (default 10)')
+    parser.add_argument('--interpolate', action='store_true', help='interpolate linearly between tabulated points')
+    parser.add_argument('--out', type=Path, help='CSV path (default: reports/.cache/Allowable_Grid_<step>F[_linear].csv)')
+    parser.add_argument('--no-cache', action='store_true', help='rebuild the grid')
+    add_arguments(parser)
+    args = parser.parse_args()
+    mode = 'linear' if args.interpolate else 'exact'
+    try:
+        check_step(args.step, mode)
+    except ValueError as exc:
+        parser.error(f'--step: {exc}')
+    with session('allowable_grid', args.profile, args.timings):
+        grid = load_grid(step=args.step, mode=mode, use_cache=not args.no_cache)
+        out = args.out or GRID_DIR / f'Allowable_Grid_{args.step}F{"_linear" if args.interpolate else ""}.csv'
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with span('write_csv'):
+            write_grid_csv(out, grid)
+    print(f'{len(grid.grade)} bands x {len(grid.temps)} temps ({mode}, {args.step} F)')
+    print('Wrote:', out)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,174 +1,178 @@
-import json, re
+import argparse, json, re
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-src_csv = Path(r'C:\Users\KevinPenfield\Downloads\Bolt_B1_clean_noMaxTempCols.csv')
-root_path = Path('app/src/main/assets/flange_reference.json')
-
-if not src_csv.exists():
-    raise SystemExit(f"Missing CSV: {src_csv}")
-if not root_path.exists():
-    raise SystemExit(f"Missing JSON: {root_path}")
-
-# Load
-with root_path.open('r', encoding='utf-8') as f:
-    data = json.load(f)
-root = data['flange_helper_reference_data']
-
-fasteners = root['fasteners']
-bolt_grades = fasteners['boltGrades']
-
-# Load CSV
-_df = pd.read_csv(src_csv)
-
-# Normalize column names
-cols = list(_df.columns)
-
-temp_cols = [c for c in cols if re.match(r'^S_\d+F_ksi$', c)]
-
-temp_values = sorted([int(re.findall(r'\d+', c)[0]) for c in temp_cols])
-
-# Map grade to internal key
-
-def grade_key(row):
-    spec_raw = str(row.get('spec','')).strip()
-    grade = str(row.get('grade','')).strip()
-    cls = str(row.get('class','')).strip()
-    if cls == 'nan' or cls.lower() == 'none':
-        cls = ''
-
-    if spec_raw == 'SA-193':
-        if grade == 'B7':
-            return 'A193_B7'
-        if grade == 'B7M':
-            return 'A193_B7M'
-        if grade == 'B16':
-            return 'A193_B16'
-        if grade == 'B8' and cls == 'Class 1':
-            return 'A193_B8_Class1_304'
-        if grade == 'B8M' and cls == 'Class 1':
-            return 'A193_B8M_Class1_316'
-    if spec_raw == 'SA-320':
-        if grade == 'L7':
-            return 'A320_L7'
-        if grade == 'L7M':
-            return 'A320_L7M'
-    if spec_raw == 'SA-453':
-        if grade == '660' and cls == 'Class A':
-            return 'A453_660_ClassA'
-        if grade == '660' and cls == 'Class B':
-            return 'A453_660_ClassB'
-        if grade == '660' and cls == 'Class C':
-            return 'A453_660_ClassC'
-        if grade == '660' and cls == 'Class D':
-            return 'A453_660_ClassD'
-    return None
-
-# No inference: only use explicit S_###F_ksi cells
-def explicit_temp_map(row):
-    out = {}
-    for t in temp_values:
-        col = f'S_{t}F_ksi'
-        v = row.get(col)
-        if pd.isna(v):
-            continue
-        out[t] = float(v)
+from reference_data import REFERENCE_PATH
+
+TEMP_COLUMN = r'^S_(\d+)F_ksi$'
+
+# (spec, grade, class) -> internal key; a None class matches any class
+GRADE_KEYS = pd.DataFrame([
+    ('SA-193', 'B7', None, 'A193_B7'),
+    ('SA-193', 'B7M', None, 'A193_B7M'),
+    ('SA-193', 'B16', None, 'A193_B16'),
+    ('SA-193', 'B8', 'Class 1', 'A193_B8_Class1_304'),
+    ('SA-193', 'B8M', 'Class 1', 'A193_B8M_Class1_316'),
+    ('SA-320', 'L7', None, 'A320_L7'),
+    ('SA-320', 'L7M', None, 'A320_L7M'),
+    ('SA-453', '660', 'Class A', 'A453_660_ClassA'),
+    ('SA-453', '660', 'Class B', 'A453_660_ClassB'),
+    ('SA-453', '660', 'Class C', 'A453_660_ClassC'),
+    ('SA-453', '660', 'Class D', 'A453_660_ClassD'),
+], columns=['spec', 'grade', 'class', 'grade_key'])
+
+
+def _text(df, name):
+    if name not in df:
+        return pd.Series('', index=df.index, dtype=object)
+    values = df[name].astype(object).where(df[name].notna(), '').map(str).str.strip()
+    return values.mask(values.str.lower().isin(['nan', 'none']), '')
+
+
+def _number(df, name):
+    if name not in df:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors='coerce').astype(float)
+
+
+def load_csv(path):
+    return pd.read_csv(path, dtype={'spec': str, 'grade': str, 'class': str})
+
+
+def grade_keys(df):
+    # Two merges against GRADE_KEYS: class-specific rows on (spec, grade, class),
+    # class-agnostic rows on (spec, grade). Unmapped rows get None.
+    rows = pd.DataFrame({'spec': _text(df, 'spec'), 'grade': _text(df, 'grade'), 'class': _text(df, 'class')},
+                        index=df.index).reset_index()
+    exact = GRADE_KEYS[GRADE_KEYS['class'].notna()]
+    loose = GRADE_KEYS[GRADE_KEYS['class'].isna()].drop(columns='class')
+    by_class = rows.merge(exact, on=['spec', 'grade', 'class'], how='left').set_index('index')['grade_key']
+    any_class = rows.merge(loose, on=['spec', 'grade'], how='left').set_index('index')['grade_key']
+    keys = by_class.fillna(any_class).astype(object)
+    return keys.where(keys.notna(), None)
+
+
+def _existing_ranges(existing_strength):
+    entries = [(k, i, r.get('diaMin_in', 0.0), r.get('diaMax_in', 1e9), r.get('Sy'), r.get('Su'))
+               for k, ranges in existing_strength.items() for i, r in enumerate(ranges)]
+    out = pd.DataFrame({
+        'grade_key': pd.Series([e[0] for e in entries], dtype=object),
+        'rank': pd.Series([e[1] for e in entries], dtype=int),
+        'ex_min': pd.Series([e[2] for e in entries], dtype=float),
+        'ex_max': pd.Series([e[3] for e in entries], dtype=float),
+        # object dtype keeps ints, floats and PLACEHOLDER strings exactly as stored
+        'ex_sy': pd.Series([e[4] for e in entries], dtype=object),
+        'ex_su': pd.Series([e[5] for e in entries], dtype=object),
+    })
     return out
 
-# Build allowable ranges by contiguous equal S
-
-def to_temp_ranges(temp_map):
-    if not temp_map:
-        return []
-    ranges = []
-    temps = sorted(temp_map.keys())
-    start = temps[0]
-    prev = temps[0]
-    current_s = temp_map[start]
-    step = 50
-    for t in temps[1:]:
-        s = temp_map[t]
-        if t == prev + step and s == current_s:
-            prev = t
-            continue
-        ranges.append({'tMin': start, 'tMax': prev, 'S': current_s})
-        start = t
-        prev = t
-        current_s = s
-    ranges.append({'tMin': start, 'tMax': prev, 'S': current_s})
-    return ranges
-
-# Existing lookup for fallback
-existing_strength = bolt_grades.get('strength_Sy_Su_min_ksi', {})
-existing_allowable = bolt_grades.get('allowableStress_S_ksi_atTemp', {})
-
-# Group rows by grade key
-_df['grade_key'] = _df.apply(grade_key, axis=1)
-_df = _df[_df['grade_key'].notna()].copy()
-
-# Update strength and allowable for mapped grades
-new_strength = {k: [] for k in existing_strength.keys()}
-new_allowable = {k: [] for k in existing_allowable.keys()}
-
-# helper to find existing range for fallback
-
-def find_existing_strength(key, dia_min, dia_max):
-    ranges = existing_strength.get(key, [])
-    for r in ranges:
-        if dia_min >= r.get('diaMin_in', 0.0) and dia_max <= r.get('diaMax_in', 1e9):
-            return r
-    return None
-
-for key, group in _df.groupby('grade_key'):
-    for _, row in group.iterrows():
-        dia_min = row.get('dia_min_in')
-        dia_max = row.get('dia_max_in')
-        dia_min = 0.0 if pd.isna(dia_min) else float(dia_min)
-        dia_max = 1e9 if pd.isna(dia_max) else float(dia_max)
-        sy = row.get('yield_min_ksi')
-        su = row.get('tensile_min_ksi')
-        sy = None if (pd.isna(sy)) else float(sy)
-        su = None if (pd.isna(su)) else float(su)
-        if sy is None or su is None:
-            existing = find_existing_strength(key, dia_min, dia_max)
-            if existing:
-                if sy is None:
-                    sy = existing.get('Sy')
-                if su is None:
-                    su = existing.get('Su')
-        # add strength
+
+def strength_rows(df, existing_strength):
+    # One row per mapped CSV row: open diameter bounds become 0 / 1e9 and a
+    # missing Sy or Su falls back to the first existing range covering the band.
+    rows = pd.DataFrame({
+        'grade_key': df['grade_key'],
+        'dia_min': _number(df, 'dia_min_in').fillna(0.0),
+        'dia_max': _number(df, 'dia_max_in').fillna(1e9),
+        'sy': _number(df, 'yield_min_ksi').astype(object),
+        'su': _number(df, 'tensile_min_ksi').astype(object),
+    })
+    missing_sy = rows['sy'].isna()
+    missing_su = rows['su'].isna()
+    need = rows.loc[missing_sy | missing_su, ['grade_key', 'dia_min', 'dia_max']].reset_index()
+    if len(need):
+        cand = need.merge(_existing_ranges(existing_strength), on='grade_key')
+        cand = cand[(cand['dia_min'] >= cand['ex_min']) & (cand['dia_max'] <= cand['ex_max'])]
+        cand = cand.sort_values(['index', 'rank']).drop_duplicates('index').set_index('index')
+        fill_sy = missing_sy & rows.index.isin(cand.index)
+        fill_su = missing_su & rows.index.isin(cand.index)
+        rows.loc[fill_sy, 'sy'] = cand.loc[rows.index[fill_sy], 'ex_sy'].to_numpy()
+        rows.loc[fill_su, 'su'] = cand.loc[rows.index[fill_su], 'ex_su'].to_numpy()
+    for name in ('sy', 'su'):
+        rows[name] = rows[name].where(rows[name].notna(), None)
+    return rows
+
+
+def allowable_rows(df):
+    # Melt the explicit S_###F_ksi cells to long form (no inference between
+    # columns), then group back per CSV row into single-point temp bands.
+    temp_cols = [c for c in df.columns if re.match(TEMP_COLUMN, c)]
+    if not temp_cols:
+        return {}
+    long = df[temp_cols].reset_index().melt(id_vars='index', var_name='column', value_name='S')
+    long['S'] = pd.to_numeric(long['S'], errors='coerce').astype(float)
+    long = long[long['S'].notna()]
+    long['t'] = long['column'].str.extract(TEMP_COLUMN, expand=False).astype(int)
+    long = long.sort_values(['index', 't'], kind='stable')
+    rows = long['index'].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1], True])
+    ts = long['t'].tolist()
+    ss = long['S'].tolist()
+    return {
+        rows[start]: [{'tMin': t, 'tMax': t, 'S': s} for t, s in zip(ts[start:stop], ss[start:stop])]
+        for start, stop in zip(bounds[:-1], bounds[1:])
+    }
+
+
+def apply_csv(data, df):
+    # Replaces strength and allowable ranges for every grade the CSV maps to;
+    # grades without new rows keep their existing data.
+    bolt_grades = data['flange_helper_reference_data']['fasteners']['boltGrades']
+    existing_strength = bolt_grades.get('strength_Sy_Su_min_ksi', {})
+    existing_allowable = bolt_grades.get('allowableStress_S_ksi_atTemp', {})
+
+    df = df.assign(grade_key=grade_keys(df))
+    df = df[df['grade_key'].notna()]
+    # grouped by key (sorted), CSV order within a key
+    df = df.iloc[np.argsort(df['grade_key'].to_numpy(dtype=str), kind='stable')]
+
+    strength = strength_rows(df, existing_strength)
+    temps = allowable_rows(df)
+
+    new_strength = {k: [] for k in existing_strength}
+    new_allowable = {k: [] for k in existing_allowable}
+    for row, key, dia_min, dia_max, sy, su in zip(strength.index, strength['grade_key'], strength['dia_min'].tolist(),
+                                                  strength['dia_max'].tolist(), strength['sy'], strength['su']):
         if key in new_strength:
-            new_strength[key].append({
-                'diaMin_in': dia_min,
-                'diaMax_in': dia_max,
-                'Sy': sy,
-                'Su': su
-            })
-
-        # allowable temps (explicit only)
-        temp_map = explicit_temp_map(row)
-        temp_ranges = [{'tMin': t, 'tMax': t, 'S': s} for t, s in sorted(temp_map.items())]
-        if temp_ranges:
-            new_allowable.setdefault(key, [])
-            new_allowable[key].append({
-                'diaMin_in': dia_min,
-                'diaMax_in': dia_max,
-                'temps': temp_ranges
-            })
-
-# Merge with existing: if no new data for a key, keep existing
-for key, ranges in existing_strength.items():
-    if key not in new_strength or not new_strength[key]:
-        new_strength[key] = ranges
-
-for key, ranges in existing_allowable.items():
-    if key not in new_allowable or not new_allowable[key]:
-        new_allowable[key] = ranges
-
-bolt_grades['strength_Sy_Su_min_ksi'] = new_strength
-bolt_grades['allowableStress_S_ksi_atTemp'] = new_allowable
-
-with root_path.open('w', encoding='utf-8') as f:
-    json.dump(data, f, indent=2)
-
-print('Updated flange_reference.json from CSV')
+            new_strength[key].append({'diaMin_in': dia_min, 'diaMax_in': dia_max, 'Sy': sy, 'Su': su})
+        if row in temps:
+            new_allowable.setdefault(key, []).append({'diaMin_in': dia_min, 'diaMax_in': dia_max, 'temps': temps[row]})
+
+    for key, ranges in existing_strength.items():
+        if not new_strength.get(key):
+            new_strength[key] = ranges
+    for key, ranges in existing_allowable.items():
+        if not new_allowable.get(key):
+            new_allowable[key] = ranges
+
+    bolt_grades['strength_Sy_Su_min_ksi'] = new_strength
+    bolt_grades['allowableStress_S_ksi_atTemp'] = new_allowable
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update bolt strength/allowable data in flange_reference.json from an ASME CSV.')
+    parser.add_argument('csv', type=Path, help='allowables CSV (spec, grade, class, dia_min_in, dia_max_in, '
+                                               'yield_min_ksi, tensile_min_ksi, S_###F_ksi columns)')
+    parser.add_argument('--reference', type=Path, default=REFERENCE_PATH)
+    parser.add_argument('--out', type=Path, help='where to write the updated JSON (default: overwrite --reference)')
+    args = parser.parse_args()
+
+    if not args.csv.exists():
+        raise SystemExit(f"Missing CSV: {args.csv}")
+    if not args.reference.exists():
+        raise SystemExit(f"Missing JSON: {args.reference}")
+
+    with args.reference.open('r', encoding='utf-8') as f:
+        data = json.load(f)
+    apply_csv(data, load_csv(args.csv))
+    with (args.out or args.reference).open('w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+    print('Updated flange_reference.json from CSV')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import argparse, copy, csv, hashlib, json, platform, random, subprocess, tempfile, time
+from pathlib import Path
+
+import numpy as np
+
+import bolt_reports
+try:
+    import apply_bolt_csv
+except ImportError:
+    apply_bolt_csv = None
+from range_index import load_index
+from reference_data import CACHE_DIR, REFERENCE_PATH, build_reference, load_reference
+from torque_book import CsvSink, chunk_plan, iter_book_chunks
+from torque_engine import factorial_axes, lookup_strength
+
+RESULTS_DIR = CACHE_DIR / 'bench'
+SCALES = (1, 10, 100)
+
+
+def _split_ranges(ranges, parts):
+    # Split each diameter range into `parts` sub-bands (open-ended ranges are
+    # capped at 10 in. for splitting), keeping the data's 0.001 in. gaps.
+    out = []
+    for r in ranges:
+        lo, hi = r['diaMin_in'], r['diaMax_in']
+        top = min(hi, 10.0)
+        edges = [lo + (top - lo) * k / parts for k in range(parts + 1)]
+        for k in range(parts):
+            sub = copy.deepcopy(r)
+            sub['diaMin_in'] = round(edges[k] + (0.001 if k else 0.0), 3)
+            sub['diaMax_in'] = round(edges[k + 1], 3) if k < parts - 1 else hi
+            out.append(sub)
+    return out
+
+
+def _fine_temps(temps, step):
+    # Re-tabulate single-point temperature bands every `step` F with linear
+    # interpolation between the original points.
+    points = sorted((t['tMin'], t['S']) for t in temps if isinstance(t.get('S'), (int, float)))
+    if len(points) < 2:
+        return temps
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    grid = range(xs[0], xs[-1] + 1, step)
+    return [{'tMin': t, 'tMax': t, 'S': round(float(np.interp(t, xs, ys)), 2)} for t in grid]
+
+
+def synthetic_data(data, scale):
+    # 1x is the real file. Larger scales copy every grade `scale` times, split
+    # diameter bands finer and tabulate allowables every 10 F.
+    if scale == 1:
+        return data
+    data = copy.deepcopy(data)
+    bolt_grades = data['flange_helper_reference_data']['fasteners']['boltGrades']
+    parts = 2 if scale < 100 else 4
+    options, strength, allowable = [], {}, {}
+    for copy_id in range(scale):
+        for grade in bolt_grades['options']:
+            key = grade if copy_id == 0 else f'{grade}_X{copy_id}'
+            options.append(key)
+            if grade in bolt_grades['strength_Sy_Su_min_ksi']:
+                strength[key] = _split_ranges(bolt_grades['strength_Sy_Su_min_ksi'][grade], parts)
+            if grade in bolt_grades['allowableStress_S_ksi_atTemp']:
+                ranges = _split_ranges(bolt_grades['allowableStress_S_ksi_atTemp'][grade], parts)
+                for r in ranges:
+                    r['temps'] = _fine_temps(r['temps'], 10)
+                allowable[key] = ranges
+    bolt_grades['options'] = options
+    bolt_grades['strength_Sy_Su_min_ksi'] = strength
+    bolt_grades['allowableStress_S_ksi_atTemp'] = allowable
+    return data
+
+
+def _timed(fn, repeat=1):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_scale(raw_data, scale, lookups, csv_rows, workdir):
+    data = synthetic_data(raw_data, scale)
+    text = json.dumps(data, indent=2)
+    path = Path(workdir) / f'flange_reference_{scale}x.json'
+    path.write_text(text, encoding='utf-8')
+    out = {'scale': scale, 'json_bytes': len(text)}
+
+    # Each dataset needs its own digest: indexes and lookup caches are memoized by it.
+    def parse():
+        raw = path.read_bytes()
+        return build_reference(json.loads(raw), hashlib.sha256(raw).hexdigest())
+    out['parse_s'], ref = _timed(parse, 3)
+    out['grades'] = len(ref.grades)
+    out['allowable_bands'] = sum(len(r.temps) for rs in ref.allowable.values() for r in rs)
+    # load_index also primes the memo the vectorized lookups below go through
+    out['index_build_s'], index = _timed(lambda: load_index(ref))
+
+    rng = random.Random(scale)
+    dias = [ref.diameter_in[d] for d in ref.diameter_options]
+    queries = [(rng.choice(ref.grades), rng.choice(dias), rng.randrange(0, 1600)) for _ in range(lookups)]
+    elapsed, _ = _timed(lambda: [index.lookup_strength(g, d, t) for g, d, t in queries])
+    out['scalar_lookups_per_s'] = lookups / elapsed
+
+    grades = np.array([q[0] for q in queries])
+    dia_keys = np.array([rng.choice(ref.diameter_options) for _ in queries])
+    temps = np.array([q[2] for q in queries], dtype=float)
+    # The first call also converts each touched temperature index to arrays.
+    elapsed, _ = _timed(lambda: lookup_strength(grades, dia_keys, temps, ref))
+    out['vector_lookups_cold_per_s'] = lookups / elapsed
+    elapsed, _ = _timed(lambda: lookup_strength(grades, dia_keys, temps, ref), 3)
+    out['vector_lookups_per_s'] = lookups / elapsed
+
+    axes = factorial_axes(ref, pcts=[0.5], lubes=['Dry'])
+    rows = sum(stop - start for start, stop in chunk_plan(axes))
+    elapsed, _ = _timed(lambda: sum(1 for _ in iter_book_chunks(ref, axes=axes)))
+    out['torque_rows'] = rows
+    out['torque_rows_per_s'] = rows / elapsed
+
+    def write_csv():
+        sink = CsvSink(Path(workdir) / 'bench_book.csv')
+        written = 0
+        for chunk in iter_book_chunks(ref, axes=axes):
+            sink.write(chunk)
+            written += len(chunk['grade'])
+            if written >= csv_rows:
+                break
+        sink.close()
+        return written
+    elapsed, written = _timed(write_csv)
+    out['csv_rows_per_s'] = written / elapsed
+
+    def reports():
+        report_dir = Path(workdir) / f'reports_{scale}x'
+        report_dir.mkdir(exist_ok=True)
+        table = bolt_reports.BoltTable(ref)
+        for writer in bolt_reports.OUTPUTS.values():
+            writer(table, report_dir)
+    out['bolt_reports_s'], _ = _timed(reports)
+    return out
+
+
+def bench_ingest(raw_data, rows, workdir):
+    # apply_bolt_csv on a CSV repeating every allowable range of the real data
+    # until it has `rows` material rows; skipped when pandas is missing.
+    if apply_bolt_csv is None:
+        return None
+    specs = {key: (spec.replace('A/SA', 'SA'), grade, klass.split(' (')[0])
+             for key, (spec, grade, klass) in bolt_reports.GRADE_MAP.items()}
+    bolt_grades = raw_data['flange_helper_reference_data']['fasteners']['boltGrades']
+    temps = list(range(100, 1501, 50))
+    base = []
+    for key, ranges in bolt_grades['allowableStress_S_ksi_atTemp'].items():
+        spec, grade, klass = specs.get(key, ('', key, ''))
+        for r in ranges:
+            s = {t['tMin']: t['S'] for t in r['temps']}
+            base.append([spec, grade, klass, r['diaMin_in'], r['diaMax_in'], '', '']
+                        + [s.get(t, '') for t in temps])
+    header = ['spec', 'grade', 'class', 'dia_min_in', 'dia_max_in', 'yield_min_ksi', 'tensile_min_ksi']
+    header += [f'S_{t}F_ksi' for t in temps]
+    path = Path(workdir) / 'ingest.csv'
+    with path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(base[i % len(base)] for i in range(rows))
+    elapsed, _ = _timed(lambda: apply_bolt_csv.apply_csv(copy.deepcopy(raw_data), apply_bolt_csv.load_csv(path)))
+    return {'rows': rows, 'ingest_s': elapsed, 'ingest_rows_per_s': rows / elapsed}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _print_ratios(label, current, base):
+    print(label)
+    for key, value in current.items():
+        if key.endswith(('_s', '_per_s')) and base.get(key):
+            # >1.0 means faster for durations and throughputs alike
+            ratio = base[key] / value if key.endswith('_s') and not key.endswith('_per_s') else value / base[key]
+            print(f'  {key}: {value:.4g} ({ratio:.2f}x)')
+
+
+def compare(current, baseline):
+    base = {r['scale']: r for r in baseline['results']}
+    for r in current['results']:
+        if r['scale'] in base:
+            _print_ratios(f"{r['scale']}x vs {baseline['commit']}:", r, base[r['scale']])
+    if current.get('ingest') and baseline.get('ingest'):
+        _print_ratios(f"ingest vs {baseline['commit']}:", current['ingest'], baseline['ingest'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark reference parsing, lookups, torque book and reports.')
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES))
+    parser.add_argument('--lookups', type=int, default=200_000, help='random lookups per scale')
+    parser.add_argument('--csv-rows', type=int, default=200_000, help='torque book rows written to CSV per scale')
+    parser.add_argument('--ingest-rows', type=int, default=5_000, help='CSV rows for the apply_bolt_csv ingest run')
+    parser.add_argument('--out', type=Path, help='results JSON (default: reports/.cache/bench/<commit>.json)')
+    parser.add_argument('--compare', type=Path, help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    raw_data = json.loads(REFERENCE_PATH.read_text(encoding='utf-8'))
+    commit = _git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'reference_sha256': load_reference().digest,
+        'results': [],
+        'ingest': None,
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            r = bench_scale(raw_data, scale, args.lookups, args.csv_rows, workdir)
+            results['results'].append(r)
+            print(f"{scale}x: parse {r['parse_s']:.3f}s, {r['scalar_lookups_per_s']:,.0f} scalar / "
+                  f"{r['vector_lookups_per_s']:,.0f} vector lookups/s, {r['torque_rows_per_s']:,.0f} torque rows/s, "
+                  f"{r['csv_rows_per_s']:,.0f} CSV rows/s, reports {r['bolt_reports_s']:.3f}s")
+        results['ingest'] = bench_ingest(raw_data, args.ingest_rows, workdir)
+        if results['ingest'] is not None:
+            print(f"ingest: {args.ingest_rows} CSV rows in {results['ingest']['ingest_s']:.3f}s")
+
+    out = args.out or RESULTS_DIR / f'{commit}.json'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print('Wrote:', out)
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text(encoding='utf-8')))
+
+
+if __name__ == '__main__':
+    main()
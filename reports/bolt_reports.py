@@ -0,0 +1,345 @@
+import argparse, csv
+from pathlib import Path
+
+from instrument import add_arguments, count, session, span
+from reference_data import is_placeholder, load_reference
+
+OUT_DIR = Path('reports')
+
+# Map grade key to spec/grade/class text
+GRADE_MAP = {
+    'A193_B7': ('A/SA-193', 'B7', ''),
+    'A193_B16': ('A/SA-193', 'B16', ''),
+    'A193_B8_Class1_304': ('A/SA-193', 'B8', 'Class 1 (304)'),
+    'A193_B8M_Class1_316': ('A/SA-193', 'B8M', 'Class 1 (316)'),
+    'A320_L7': ('A/SA-320', 'L7', ''),
+    'A193_B7M': ('A/SA-193', 'B7M', ''),
+    'A320_L7M': ('A/SA-320', 'L7M', ''),
+    'A453_660_ClassA': ('A/SA-453', '660', 'Class A'),
+    'A453_660_ClassB': ('A/SA-453', '660', 'Class B'),
+    'A453_660_ClassC': ('A/SA-453', '660', 'Class C'),
+    'A453_660_ClassD': ('A/SA-453', '660', 'Class D'),
+}
+
+
+class Band:
+    # One row of the union of a grade's strength and allowable diameter ranges.
+    __slots__ = ('dia_min', 'dia_max', 'sy', 'su', 'strength_flags', 'temps', 'temps_str',
+                 'temps_placeholder', 'temp_map', 'max_temp')
+
+    def __init__(self, dia_min, dia_max, sy, su, strength_flags, temps):
+        self.dia_min = dia_min
+        self.dia_max = dia_max
+        self.sy = sy
+        self.su = su
+        self.strength_flags = strength_flags
+        # None when no allowable range covers the band
+        self.temps = temps
+        with span('format_temps'):
+            self.temps_str, self.temps_placeholder = temps_to_str(temps or [])
+        with span('build_temp_map'):
+            self.temp_map, self.max_temp = build_temp_map(temps or [])
+        count('temp_map_points', len(self.temp_map))
+
+
+class GradeReport:
+    __slots__ = ('grade', 'spec', 'name', 'klass', 'strength', 'allowable', 'strength_rows',
+                 'allowable_rows', 'strength_placeholder', 'bands')
+
+    def __init__(self, grade, strength, allowable):
+        self.grade = grade
+        self.spec, self.name, self.klass = GRADE_MAP.get(grade, ('', grade, ''))
+        self.strength = strength
+        self.allowable = allowable
+        self.strength_rows = []
+        self.strength_placeholder = False
+        for r in strength:
+            missing = []
+            if is_placeholder(r.sy):
+                missing.append('Sy_placeholder')
+            if is_placeholder(r.su):
+                missing.append('Su_placeholder')
+            self.strength_placeholder = self.strength_placeholder or bool(missing)
+            self.strength_rows.append((r.dia_min, r.dia_max, r.sy, r.su, ';'.join(missing)))
+        self.allowable_rows = [
+            (r.dia_min, r.dia_max, t.tmin, t.tmax, t.s,
+             'S_placeholder' if t.s is None or is_placeholder(t.s) else '')
+            for r in allowable for t in r.temps
+        ]
+        self.bands = []
+        with span('union_ranges'):
+            bands = union_ranges(strength, allowable)
+        for rmin, rmax in bands:
+            with span('find_range'):
+                s_match = find_range(strength, rmin, rmax) or (strength[0] if strength else None)
+                a_match = find_range(allowable, rmin, rmax)
+            count('bands')
+            sy = s_match.sy if s_match else None
+            su = s_match.su if s_match else None
+            flags = []
+            if not strength:
+                flags.append('NO_STRENGTH_DATA')
+            else:
+                if is_placeholder(sy):
+                    flags.append('Sy_placeholder')
+                if is_placeholder(su):
+                    flags.append('Su_placeholder')
+            self.bands.append(Band(rmin, rmax, sy, su, flags, a_match.temps if a_match else None))
+
+
+class BoltTable:
+    # Normalized view of every bolt grade, built in one traversal and shared by all writers.
+    __slots__ = ('grades', 'temp_columns', 'nuts')
+
+    def __init__(self, ref):
+        self.grades = []
+        for g in ref.grades:
+            with span('grade'):
+                self.grades.append(GradeReport(g, ref.strength.get(g, []), ref.allowable.get(g, [])))
+        # temperature columns (50 F increments) across every tabulated grade
+        all_temps = set()
+        for ranges in ref.allowable.values():
+            for r in ranges:
+                for t in r.temps:
+                    all_temps.update(range(int(t.tmin), int(t.tmax) + 1, 50))
+        self.temp_columns = sorted(all_temps or range(100, 1001, 50))
+        self.nuts = ref.nut_grades
+
+
+def range_key(r):
+    return (float(r.dia_min), float(r.dia_max))
+
+
+def union_ranges(s_ranges, a_ranges):
+    return sorted({range_key(r) for r in s_ranges} | {range_key(r) for r in a_ranges})
+
+
+def find_range(ranges, rmin, rmax):
+    for r in ranges:
+        mn = float(r.dia_min)
+        mx = float(r.dia_max)
+        if rmin >= mn and rmax <= mx:
+            return r
+    return None
+
+
+def temps_to_str(temps):
+    parts = []
+    missing = False
+    for t in temps:
+        if t.s is None or is_placeholder(t.s):
+            missing = True
+        if t.tmin == t.tmax:
+            parts.append(f"{t.tmin}: {t.s}")
+        else:
+            parts.append(f"{t.tmin}-{t.tmax}: {t.s}")
+    return '; '.join(parts), missing
+
+
+def build_temp_map(temps):
+    out = {}
+    max_temp = None
+    for t in temps:
+        tmin = int(t.tmin)
+        tmax = int(t.tmax)
+        if max_temp is None or tmax > max_temp:
+            max_temp = tmax
+        for temp in range(tmin, tmax + 1, 50):
+            out[temp] = t.s
+    return out, max_temp
+
+
+def text_table(rows, columns, preamble=()):
+    col_widths = {c: len(c) for c in columns}
+    for r in rows:
+        for c in columns:
+            col_widths[c] = max(col_widths[c], len(str(r.get(c, ''))))
+    lines = list(preamble)
+    lines.append(' | '.join(c.ljust(col_widths[c]) for c in columns))
+    lines.append('-+-'.join('-' * col_widths[c] for c in columns))
+    for r in rows:
+        lines.append(' | '.join(str(r.get(c, '')).ljust(col_widths[c]) for c in columns))
+    return '\n'.join(lines)
+
+
+def write_strength(table, out_dir):
+    path = out_dir / 'Bolt_Strength_RoomTemp.csv'
+    with path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['grade_key','dia_min_in','dia_max_in','Sy_ksi','Su_ksi','missing'])
+        for g in table.grades:
+            if not g.strength_rows:
+                writer.writerow([g.grade,'','','','','NO_STRENGTH_DATA'])
+            for row in g.strength_rows:
+                writer.writerow([g.grade, *row])
+    return [path]
+
+
+def write_allowable(table, out_dir):
+    path = out_dir / 'Bolt_AllowableStress_Temp.csv'
+    with path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['grade_key','dia_min_in','dia_max_in','temp_min_F','temp_max_F','S_ksi','missing'])
+        for g in table.grades:
+            if not g.allowable:
+                writer.writerow([g.grade,'','','','','','NO_ALLOWABLE_DATA'])
+            for row in g.allowable_rows:
+                writer.writerow([g.grade, *row])
+    return [path]
+
+
+def write_missing(table, out_dir):
+    path = out_dir / 'Bolt_Missing_Data.txt'
+    missing_allowable = [g.grade for g in table.grades if not g.allowable]
+    missing_strength = [g.grade for g in table.grades if not g.strength]
+    placeholder_strength = [g.grade for g in table.grades if g.strength_placeholder]
+    with path.open('w', encoding='utf-8') as f:
+        f.write('Missing Allowable Stress at Temperature (no entries):\n')
+        f.write(', '.join(missing_allowable) + ('\n\n' if missing_allowable else 'None\n\n'))
+        f.write('Missing Strength Ranges (no entries):\n')
+        f.write(', '.join(missing_strength) + ('\n\n' if missing_strength else 'None\n\n'))
+        f.write('Strength Placeholders Present:\n')
+        f.write(', '.join(sorted(placeholder_strength)) + ('\n' if placeholder_strength else 'None\n'))
+    return [path]
+
+
+ALL_IN_ONE_COLUMNS = ['grade','dia_min_in','dia_max_in','Sy_ksi','Su_ksi','allowable_S_ksi_by_tempF','missing_flags']
+
+
+def all_in_one_rows(table):
+    rows = []
+    for g in table.grades:
+        if not g.bands:
+            rows.append({
+                'grade': g.grade, 'dia_min_in': '', 'dia_max_in': '', 'Sy_ksi': '', 'Su_ksi': '',
+                'allowable_S_ksi_by_tempF': 'NO_ALLOWABLE_DATA',
+                'missing_flags': 'NO_STRENGTH_DATA;NO_ALLOWABLE_DATA',
+            })
+        for b in g.bands:
+            missing = list(b.strength_flags)
+            if b.temps:
+                temp_str = b.temps_str
+                if b.temps_placeholder:
+                    missing.append('Allowable_placeholder')
+            else:
+                temp_str = 'NO_ALLOWABLE_DATA'
+                missing.append('NO_ALLOWABLE_DATA')
+            rows.append({
+                'grade': g.grade, 'dia_min_in': b.dia_min, 'dia_max_in': b.dia_max,
+                'Sy_ksi': b.sy, 'Su_ksi': b.su, 'allowable_S_ksi_by_tempF': temp_str,
+                'missing_flags': ';'.join(missing),
+            })
+    return rows
+
+
+def write_all_in_one(table, out_dir):
+    rows = all_in_one_rows(table)
+    csv_path = out_dir / 'Bolt_AllInOne.csv'
+    with csv_path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(ALL_IN_ONE_COLUMNS)
+        for r in rows:
+            writer.writerow([r[c] for c in ALL_IN_ONE_COLUMNS])
+    text_path = out_dir / 'Bolt_AllInOne.txt'
+    text_path.write_text(text_table(rows, ALL_IN_ONE_COLUMNS), encoding='utf-8')
+    return [csv_path, text_path]
+
+
+CLEAN_COLUMNS = ['spec','grade','class','grade_key','dia_min_in','dia_max_in','Sy_ksi','Su_ksi','max_temp_F','missing_flags']
+
+
+def clean_rows(table):
+    rows = []
+    for g in table.grades:
+        base = {'spec': g.spec, 'grade': g.name, 'class': g.klass, 'grade_key': g.grade}
+        if not g.bands:
+            rows.append(dict(base, dia_min_in='', dia_max_in='', Sy_ksi='', Su_ksi='', max_temp_F='',
+                             missing_flags='NO_STRENGTH_DATA;NO_ALLOWABLE_DATA'))
+        for b in g.bands:
+            missing = list(b.strength_flags)
+            if b.temps is None:
+                missing.append('NO_ALLOWABLE_DATA')
+            row = dict(base, dia_min_in=b.dia_min, dia_max_in=b.dia_max, Sy_ksi=b.sy, Su_ksi=b.su,
+                       max_temp_F=b.max_temp, missing_flags=';'.join(missing))
+            for temp in table.temp_columns:
+                if b.max_temp is not None and temp > b.max_temp:
+                    row[f'T{temp}F'] = ''
+                else:
+                    row[f'T{temp}F'] = b.temp_map.get(temp, 'NOT_AVAILABLE')
+            rows.append(row)
+    return rows
+
+
+def write_all_in_one_clean(table, out_dir):
+    rows = clean_rows(table)
+    columns = CLEAN_COLUMNS + [f'T{t}F' for t in table.temp_columns]
+    csv_path = out_dir / 'Bolt_AllInOne_Clean.csv'
+    with csv_path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for r in rows:
+            writer.writerow(r)
+    # Plain text table: spec columns + first 10 temps to keep it readable
+    text_path = out_dir / 'Bolt_AllInOne_Clean.txt'
+    note = 'NOTE: Temps are in 50F steps. For inputs that are not a 50F increment, round UP to the next 50F.'
+    text_path.write_text(text_table(rows, columns[:20], (note, '')), encoding='utf-8')
+    return [csv_path, text_path]
+
+
+def write_nut_list(table, out_dir):
+    path = out_dir / 'Nut_Grades_List.csv'
+    with path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['nut_grade'])
+        for n in table.nuts:
+            writer.writerow([n])
+    return [path]
+
+
+# Output name -> writer(table, out_dir) returning the paths written. New formats
+# only need a writer here; the normalized table is built once for all of them.
+OUTPUTS = {
+    'strength': write_strength,
+    'allowable': write_allowable,
+    'missing': write_missing,
+    'all_in_one': write_all_in_one,
+    'all_in_one_clean': write_all_in_one_clean,
+    'nuts': write_nut_list,
+}
+
+_tables = {}
+
+
+def load_table(ref=None):
+    ref = ref if ref is not None else load_reference()
+    table = _tables.get(ref.digest)
+    if table is None:
+        with span('bolt_table'):
+            table = _tables[ref.digest] = BoltTable(ref)
+    return table
+
+
+def generate(names=None, ref=None, out_dir=OUT_DIR):
+    table = load_table(ref)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(exist_ok=True)
+    paths = []
+    for name in (names or OUTPUTS):
+        with span('write:' + name):
+            paths.extend(OUTPUTS[name](table, out_dir))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the bolt grade reports from one pass over flange_reference.json.')
+    parser.add_argument('--only', action='append', choices=list(OUTPUTS),
+                        help='write just this output; repeat for several (default: all)')
+    add_arguments(parser)
+    args = parser.parse_args()
+    with session('bolt_reports', args.profile, args.timings):
+        paths = generate(args.only)
+    print('Wrote:', *paths)
+
+
+if __name__ == '__main__':
+    main()
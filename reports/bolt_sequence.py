@@ -0,0 +1,143 @@
+import argparse, json
+from functools import lru_cache
+
+from reference_data import REFERENCE_PATH, load_reference
+
+# Bolts are numbered 1..N clockwise from ~12 o'clock (tightening.boltNumbering).
+PATTERNS = ('star', 'legacy')
+TOOLS = (1, 2, 4)
+
+
+@lru_cache(maxsize=None)
+def spread_order(n):
+    # 0..n-1 in bit-reversed order (values >= n dropped), the spacing rule
+    # behind FlangeMath.generateBoltSequence.
+    bits = max(n - 1, 0).bit_length()
+    order = []
+    for i in range(1 << bits):
+        rev = int(format(i, f'0{bits}b')[::-1], 2) if bits else 0
+        if rev < n:
+            order.append(rev)
+    return tuple(order)
+
+
+def _check_count(count, multiple=2):
+    if count < 4 or count % multiple:
+        raise ValueError(f'bolt count must be a multiple of {multiple} and at least 4, got {count}')
+
+
+@lru_cache(maxsize=1024)
+def star_sequence(count):
+    # Port of FlangeMath.generateBoltSequence: the odd bolts in spread order, then the evens.
+    _check_count(count)
+    order = spread_order(count // 2)
+    return tuple(2 * o + 1 for o in order) + tuple(2 * o + 2 for o in order)
+
+
+@lru_cache(maxsize=1024)
+def legacy_sequence(count):
+    # Legacy PCC-1 cross pattern: each step tightens a bolt, the one opposite
+    # (180 deg), then the pair at 90/270 deg; quarter offsets advance in
+    # spread order. Counts not divisible by 4 tighten opposite pairs only.
+    _check_count(count)
+    return tuple(b for group in tool_steps(count, 4 if count % 4 == 0 else 2) for b in group)
+
+
+@lru_cache(maxsize=1024)
+def tool_steps(count, tools):
+    # Simultaneous tightening with `tools` wrenches spaced evenly around the
+    # flange: every step is a tuple of bolts tightened together, in the order
+    # the tools are applied (0, 180, 90, 270 deg for four tools).
+    if tools not in TOOLS:
+        raise ValueError(f'tools must be one of {TOOLS}, got {tools}')
+    if tools == 1:
+        return tuple((b,) for b in star_sequence(count))
+    _check_count(count, tools)
+    if tools == 2:
+        half = count // 2
+        return tuple((p + 1, p + 1 + half) for p in spread_order(half))
+    quarter = count // 4
+    return tuple((p + 1, p + 1 + 2 * quarter, p + 1 + quarter, p + 1 + 3 * quarter)
+                 for p in spread_order(quarter))
+
+
+def sequence(count, pattern='star'):
+    if pattern == 'star':
+        return star_sequence(count)
+    if pattern == 'legacy':
+        return legacy_sequence(count)
+    raise ValueError(f'unknown pattern {pattern!r}; expected one of {PATTERNS}')
+
+
+def validate(stored, pattern='star'):
+    # Compare a {count: [bolts]} table against the generator. Returns
+    # (count, problem) pairs; empty when the table matches.
+    problems = []
+    for count, bolts in sorted(stored.items()):
+        bolts = list(bolts)
+        if sorted(bolts) != list(range(1, count + 1)):
+            problems.append((count, 'not a permutation of 1..N'))
+            continue
+        try:
+            expected = list(sequence(count, pattern))
+        except ValueError as e:
+            problems.append((count, str(e)))
+            continue
+        if bolts != expected:
+            at = next(i for i, (a, b) in enumerate(zip(bolts, expected)) if a != b)
+            problems.append((count, f'differs from the {pattern} pattern at step {at + 1}'))
+    return problems
+
+
+def write_table(path=REFERENCE_PATH, min_count=4, max_count=88):
+    # Regenerates tightening.sequenceLookup.sequenceByBoltCount (star pattern,
+    # which the app's FlangeMath fallback reproduces) and the stated count range.
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    tightening = data['flange_helper_reference_data'].setdefault('tightening', {})
+    lookup = tightening.setdefault('sequenceLookup', {})
+    lookup['sequenceByBoltCount'] = {
+        str(n): list(star_sequence(n)) for n in range(min_count, max_count + 1, 2)
+    }
+    tightening['boltCountRange'] = {'minEven': min_count, 'maxEven': max_count, 'step': 2}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+    return len(lookup['sequenceByBoltCount'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate, check or regenerate bolt tightening sequences.')
+    parser.add_argument('counts', type=int, nargs='*', help='bolt counts to print')
+    parser.add_argument('--pattern', choices=PATTERNS, default='star')
+    parser.add_argument('--tools', type=int, choices=TOOLS, default=1, help='wrenches used simultaneously')
+    parser.add_argument('--check', action='store_true', help='validate the stored sequence table')
+    parser.add_argument('--write', action='store_true', help='regenerate the stored sequence table')
+    parser.add_argument('--max-count', type=int, default=None, help='largest bolt count for --write')
+    args = parser.parse_args()
+
+    if args.write:
+        ref = load_reference()
+        max_count = args.max_count or max(ref.sequences, default=88)
+        n = write_table(REFERENCE_PATH, max_count=max_count)
+        print(f'Wrote {n} sequences (4..{max_count}) to {REFERENCE_PATH}')
+    if args.check:
+        problems = validate(load_reference(use_cache=False).sequences)
+        for count, problem in problems:
+            print(f'{count} bolts: {problem}')
+        if problems:
+            raise SystemExit(1)
+        print('Sequence table OK')
+    for count in args.counts:
+        try:
+            if args.tools == 1:
+                print(f'{count}:', ', '.join(map(str, sequence(count, args.pattern))))
+            else:
+                steps = tool_steps(count, args.tools)
+                print(f'{count} ({args.tools} tools):', ' | '.join('-'.join(map(str, s)) for s in steps))
+        except ValueError as exc:
+            parser.error(str(exc))
+
+
+if __name__ == '__main__':
+    main()
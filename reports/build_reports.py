@@ -0,0 +1,139 @@
+import argparse, hashlib, json, runpy, sys
+from fnmatch import fnmatch
+from pathlib import Path
+
+from instrument import add_arguments, session, span
+from reference_data import CACHE_DIR, load_reference
+
+REPORTS_DIR = Path('reports')
+MANIFEST_PATH = CACHE_DIR / 'report_manifest.json'
+
+BOLT_INPUTS = ('grades', 'strength/*', 'allowable/*')
+THREAD_INPUTS = ('diameters', 'thread_series', 'tpi', 'tensile_area')
+
+# script -> (outputs relative to the repo root, reference subtrees read, helper modules imported)
+TARGETS = {
+    'gen_bolt_report.py': (
+        ['reports/Bolt_Strength_RoomTemp.csv', 'reports/Bolt_AllowableStress_Temp.csv', 'reports/Bolt_Missing_Data.txt'],
+        BOLT_INPUTS,
+        ['reference_data.py', 'bolt_reports.py'],
+    ),
+    'gen_bolt_all_in_one.py': (
+        ['reports/Bolt_AllInOne.csv', 'reports/Bolt_AllInOne.txt'],
+        BOLT_INPUTS,
+        ['reference_data.py', 'bolt_reports.py'],
+    ),
+    'gen_bolt_all_in_one_clean.py': (
+        ['reports/Bolt_AllInOne_Clean.csv', 'reports/Bolt_AllInOne_Clean.txt'],
+        BOLT_INPUTS,
+        ['reference_data.py', 'bolt_reports.py'],
+    ),
+    'gen_nut_list.py': (
+        ['reports/Nut_Grades_List.csv'],
+        ('nuts',),
+        ['reference_data.py', 'bolt_reports.py'],
+    ),
+    'gen_torque_matrix.py': (
+        ['reports/Torque_Matrix_20.csv'],
+        BOLT_INPUTS + THREAD_INPUTS + ('pass_logic', 'gaskets'),
+        ['reference_data.py', 'range_index.py', 'torque_engine.py', 'torque_book.py'],
+    ),
+    'gasket_torque.py': (
+        ['reports/gasket_cards'],
+        BOLT_INPUTS + THREAD_INPUTS + ('pass_logic', 'gaskets'),
+        ['reference_data.py', 'range_index.py', 'torque_engine.py', 'torque_book.py'],
+    ),
+    'flange_tables.py': (
+        ['reports/.cache/flange_tables.bin'],
+        BOLT_INPUTS + THREAD_INPUTS,
+        ['reference_data.py', 'range_index.py', 'torque_engine.py'],
+    ),
+}
+
+
+def _code_digest(files):
+    h = hashlib.sha256()
+    for name in files:
+        h.update(name.encode('utf-8'))
+        h.update((REPORTS_DIR / name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def target_inputs(script, fingerprints):
+    _, patterns, helpers = TARGETS[script]
+    inputs = {k: v for k, v in sorted(fingerprints.items()) if any(fnmatch(k, p) for p in patterns)}
+    inputs['code'] = _code_digest([script] + helpers)
+    return inputs
+
+
+def changed_keys(old, new):
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+
+
+def plan(ref, manifest, force=False):
+    # Yields (script, reason, inputs) for every target whose inputs changed
+    # since the last recorded build or whose outputs are missing.
+    for script, (outputs, _, _) in TARGETS.items():
+        inputs = target_inputs(script, ref.fingerprints)
+        previous = manifest.get(script, {})
+        if force:
+            reason = 'forced'
+        elif not previous:
+            reason = 'no previous build'
+        elif any(not Path(o).exists() for o in outputs):
+            reason = 'missing output'
+        else:
+            changed = changed_keys(previous, inputs)
+            if not changed:
+                continue
+            reason = 'changed: ' + ', '.join(changed)
+        yield script, reason, inputs
+
+
+def run_script(script):
+    argv = sys.argv
+    sys.argv = [str(REPORTS_DIR / script)]
+    try:
+        runpy.run_path(sys.argv[0], run_name='__main__')
+    finally:
+        sys.argv = argv
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild only the reports whose reference inputs changed.')
+    parser.add_argument('--force', action='store_true', help='rebuild every report')
+    parser.add_argument('--dry-run', action='store_true', help='list what would be rebuilt')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with session('build_reports', args.profile, args.timings):
+        ref = load_reference()
+        manifest = load_manifest()
+        rebuilt = 0
+        for script, reason, inputs in plan(ref, manifest, args.force):
+            print(f'{script}: {reason}')
+            if args.dry_run:
+                continue
+            with span('run:' + script):
+                run_script(script)
+            manifest[script] = inputs
+            save_manifest(manifest)
+            rebuilt += 1
+    print(f'{rebuilt} of {len(TARGETS)} reports rebuilt' if not args.dry_run else 'Dry run; nothing rebuilt')
+
+
+if __name__ == '__main__':
+    main()
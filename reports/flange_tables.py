@@ -0,0 +1,167 @@
+import argparse, hashlib, json, struct
+from pathlib import Path
+
+import numpy as np
+
+from range_index import load_index
+from reference_data import CACHE_DIR, REFERENCE_PATH, load_reference
+from torque_engine import TEMP_STEP_F, temperature_grid, thread_table
+
+# Binary layout (little-endian):
+#   b'FHTB' | uint32 format version | uint32 header length | UTF-8 JSON header
+#   padded to 8 bytes | raw arrays at the offsets listed in the header.
+# Every array is dense and fixed-width; NaN marks missing or PLACEHOLDER data.
+# Kept out of the app assets until the app has a loader for it.
+TABLES_PATH = CACHE_DIR / 'flange_tables.bin'
+MAGIC = b'FHTB'
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct('<4sII')
+
+
+def compile_tables(ref=None, step=TEMP_STEP_F):
+    ref = ref if ref is not None else load_reference()
+    index = load_index(ref)
+    grades = ref.grades
+    diameters = ref.diameter_options
+    series = ref.thread_series
+    temps = temperature_grid(ref, step)
+
+    def num(value):
+        return float(value) if isinstance(value, (int, float)) else np.nan
+
+    sy = np.full((len(grades), len(diameters)), np.nan)
+    su = np.full_like(sy, np.nan)
+    allowable = np.full((len(grades), len(diameters), len(temps)), np.nan)
+    used_temp = np.full(allowable.shape, np.nan, dtype='<f4')
+    for g, grade in enumerate(grades):
+        for d, dia_key in enumerate(diameters):
+            dia = ref.diameter_in[dia_key]
+            sy[g, d] = num(index.lookup_sy(grade, dia))
+            match = next((r for r in ref.strength.get(grade, []) if r.contains(dia)), None)
+            su[g, d] = num(match.su) if match is not None else np.nan
+            for t, temp in enumerate(temps):
+                s, used = index.lookup_allowable(grade, dia, int(temp))
+                allowable[g, d, t] = num(s)
+                used_temp[g, d, t] = num(used)
+
+    tpi = np.full((len(series), len(diameters)), np.nan)
+    as_in2 = np.full_like(tpi, np.nan)
+    for s, name in enumerate(series):
+        for d, dia_key in enumerate(diameters):
+            tpi[s, d], as_in2[s, d] = thread_table(ref, name, dia_key)
+
+    meta = {
+        'source_sha256': ref.digest,
+        'grades': grades,
+        'diameters': diameters,
+        'diameter_in': [ref.diameter_in[d] for d in diameters],
+        'thread_series': series,
+        'temp_start_F': int(temps[0]),
+        'temp_step_F': step,
+        'temp_count': len(temps),
+    }
+    arrays = {
+        'sy_ksi': sy,
+        'su_ksi': su,
+        'allowable_ksi': allowable,
+        'allowable_used_temp_F': used_temp,
+        'tpi': tpi,
+        'as_in2': as_in2,
+    }
+    return meta, arrays
+
+
+def write_tables(path=TABLES_PATH, ref=None, step=TEMP_STEP_F):
+    meta, arrays = compile_tables(ref, step)
+    layout = []
+    offset = 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        arrays[name] = values
+        layout.append({'name': name, 'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset})
+        offset += -(-values.nbytes // 8) * 8
+    header = json.dumps(dict(meta, arrays=layout), separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(_PREAMBLE.size + len(header)) % 8)
+    data_start = _PREAMBLE.size + len(header)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for entry in layout:
+            values = arrays[entry['name']]
+            f.write(values.tobytes())
+            f.write(b'\0' * (-values.nbytes % 8))
+    return path, data_start + offset
+
+
+class FlangeTables:
+    # Memory-mapped view of a compiled tables file; lookups are plain array
+    # indexing. Opening fails when the file was compiled from a different
+    # flange_reference.json than reference_path (None skips the check).
+
+    def __init__(self, path=TABLES_PATH, reference_path=REFERENCE_PATH):
+        self.path = Path(path)
+        with self.path.open('rb') as f:
+            magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f'{self.path} is not a version {FORMAT_VERSION} flange tables file')
+            self.meta = json.loads(f.read(header_len).decode('utf-8'))
+        if reference_path is not None:
+            digest = hashlib.sha256(Path(reference_path).read_bytes()).hexdigest()
+            if self.meta['source_sha256'] != digest:
+                raise ValueError(f'{self.path} is stale: it was compiled from a different {reference_path}; '
+                                 'rerun python reports/flange_tables.py')
+        data_start = _PREAMBLE.size + header_len
+        self.arrays = {
+            entry['name']: np.memmap(self.path, dtype=entry['dtype'], mode='r',
+                                     offset=data_start + entry['offset'], shape=tuple(entry['shape']))
+            for entry in self.meta['arrays']
+        }
+        self._grade_ids = {g: i for i, g in enumerate(self.meta['grades'])}
+        self._dia_ids = {d: i for i, d in enumerate(self.meta['diameters'])}
+        self._series_ids = {s: i for i, s in enumerate(self.meta['thread_series'])}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def grade_id(self, grade):
+        return self._grade_ids[grade]
+
+    def dia_id(self, dia_key):
+        return self._dia_ids[dia_key]
+
+    def series_id(self, series):
+        return self._series_ids[series]
+
+    def temp_index(self, temp_f):
+        # Round up to the next grid temperature like the app; -1 when above the grid.
+        start = self.meta['temp_start_F']
+        step = self.meta['temp_step_F']
+        idx = np.maximum(np.ceil((np.asarray(temp_f, dtype=float) - start) / step), 0).astype(int)
+        return np.where(idx < self.meta['temp_count'], idx, -1)
+
+    def allowable(self, grade_id, dia_id, temp_f):
+        t = self.temp_index(temp_f)
+        s = self.arrays['allowable_ksi'][grade_id, dia_id, np.maximum(t, 0)]
+        return np.where(t >= 0, s, np.nan)
+
+    def sy(self, grade_id, dia_id):
+        return self.arrays['sy_ksi'][grade_id, dia_id]
+
+    def thread(self, series_id, dia_id):
+        return self.arrays['tpi'][series_id, dia_id], self.arrays['as_in2'][series_id, dia_id]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile flange_reference.json into dense binary lookup tables.')
+    parser.add_argument('--out', type=Path, default=TABLES_PATH)
+    parser.add_argument('--step', type=int, default=TEMP_STEP_F, help='temperature grid step in F')
+    args = parser.parse_args()
+    path, size = write_tables(args.out, step=args.step)
+    print('Wrote:', path, f'({size} bytes)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+import argparse, csv, hashlib, json
+from fnmatch import fnmatch
+from pathlib import Path
+
+import numpy as np
+
+from instrument import add_arguments, session, span
+from reference_data import CACHE_DIR, load_reference
+from torque_book import cells
+from torque_engine import LUBE_K, compute_torque, factorial_axes, pass_pcts
+
+# Gasket-specific torque windows: every gasket type that allows a calculated
+# torque x grade x (series, diameter) x temperature x lube, at the low end,
+# default and high end of its boltStressPctYield window. The table is built
+# once per reference content and kept in reports/.cache/gasket_torque/.
+
+TABLE_VERSION = 1
+TABLE_DIR = CACHE_DIR / 'gasket_torque'
+# Reference subtrees the windows depend on; other edits reuse the cached table.
+TABLE_INPUTS = (
+    'grades', 'strength/*', 'allowable/*', 'diameters', 'thread_series', 'tpi', 'tensile_area', 'gaskets',
+)
+CARD_COLUMNS = (
+    'gasket_id', 'grade', 'diameter_in', 'thread_series', 'working_temp_F', 'used_temp_F', 'Sy_or_allowable_ksi',
+    'lube', 'K', 'pct_min', 'pct_default', 'pct_max', 'torque_min_ftlb', 'torque_default_ftlb', 'torque_max_ftlb',
+    'pass1_ftlb', 'pass2_ftlb', 'pass3_ftlb',
+)
+
+
+class GasketTable:
+    # torque[gasket, grade, thread, temp, lube, window] in ft-lb, NaN where no
+    # strength is tabulated. The *_pos dicts map axis labels to positions.
+    __slots__ = (
+        'key', 'gaskets', 'labels', 'pct', 'grades', 'threads', 'temps', 'lubes', 'K',
+        'strength', 'used_temp', 'torque', 'gasket_pos', 'grade_pos', 'thread_pos', 'lube_pos',
+    )
+
+    def __init__(self, key, gaskets, labels, pct, grades, threads, temps, lubes, K, strength, used_temp, torque):
+        self.key = key
+        self.gaskets = gaskets
+        self.labels = labels
+        self.pct = pct
+        self.grades = grades
+        self.threads = threads
+        self.temps = temps
+        self.lubes = lubes
+        self.K = K
+        self.strength = strength
+        self.used_temp = used_temp
+        self.torque = torque
+        # The form stores the gasket label, so both id and label resolve.
+        self.gasket_pos = {name: i for i, pair in enumerate(zip(gaskets, labels)) for name in pair}
+        self.grade_pos = {g: i for i, g in enumerate(grades)}
+        self.thread_pos = {(s, d): i for i, (s, d) in enumerate(threads)}
+        self.lube_pos = {l: i for i, l in enumerate(lubes)}
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in (
+            'gaskets', 'labels', 'pct', 'grades', 'threads', 'temps', 'lubes', 'K', 'strength', 'used_temp', 'torque',
+        )}
+
+
+def calculated_gaskets(ref):
+    # Gaskets whose torque the app may calculate; RTJ and other
+    # specified-torque-only types have no pct window.
+    return [g for g in ref.gasket_types
+            if g.allow_calculated_torque and g.pct_default is not None and len(g.pct_allowed) == 2]
+
+
+def table_key(ref, lubes):
+    inputs = {k: v for k, v in sorted(ref.fingerprints.items()) if any(fnmatch(k, p) for p in TABLE_INPUTS)}
+    payload = json.dumps([TABLE_VERSION, inputs, [(l, LUBE_K[l]) for l in lubes]])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_table(ref, lubes, key=''):
+    gaskets = calculated_gaskets(ref)
+    axes = factorial_axes(ref, lubes=lubes, pcts=[1.0])
+    grades, threads, temps = axes['grade'], axes['thread'], axes['temp']
+    # Torque is linear in pct yield, so the book is computed once at pct=1
+    # and every gasket window is a scale of it.
+    gi, ti, tempi = (a.ravel() for a in np.indices((len(grades), len(threads), len(temps))))
+    base = compute_torque(grades[gi], threads[ti, 1], threads[ti, 0], temps[tempi],
+                          np.ones(len(gi)), np.ones(len(gi)), ref)
+    shape = (len(grades), len(threads), len(temps))
+    unit = base['target_torque_ftlb'].reshape(shape)
+    pct = np.array([(g.pct_allowed[0], g.pct_default, g.pct_allowed[1]) for g in gaskets], dtype=float).reshape(-1, 3)
+    torque = (unit[None, :, :, :, None, None]
+              * axes['K'][None, None, None, None, :, None]
+              * pct[:, None, None, None, None, :])
+    return GasketTable(
+        key,
+        np.array([g.id for g in gaskets], dtype=str),
+        np.array([g.label for g in gaskets], dtype=str),
+        pct, grades, threads, temps, axes['lube'], axes['K'],
+        base['Sy_or_allowable_ksi'].reshape(shape), base['used_temp_F'].reshape(shape), torque,
+    )
+
+
+def _read_table(path, key):
+    try:
+        with np.load(path) as data:
+            return GasketTable(key, **{name: data[name] for name in data.files})
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_table(path, table):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + '.tmp.npz')
+        np.savez(tmp, **table.arrays())
+        tmp.replace(path)
+    except OSError:
+        pass
+
+
+_tables = {}
+
+
+def load_table(ref=None, lubes=None, use_cache=True):
+    ref = ref if ref is not None else load_reference()
+    lubes = list(lubes if lubes is not None else LUBE_K)
+    key = table_key(ref, lubes)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+    path = TABLE_DIR / (key + '.npz')
+    table = _read_table(path, key) if use_cache else None
+    if table is None:
+        table = build_table(ref, lubes, key)
+        if use_cache:
+            _write_table(path, table)
+    _tables[key] = table
+    return table
+
+
+def lookup(table, gasket, grade, dia_key, series, temp, lube):
+    # Vectorized window lookup -> (n, 3) min/default/max ft-lb, NaN for unknown
+    # labels. Temperatures snap up to the next grid step, i.e. the allowable
+    # of an equal or hotter row.
+    gasket, grade, dia_key, series, lube = (np.asarray(a, dtype=str) for a in (gasket, grade, dia_key, series, lube))
+    temp = np.asarray(temp, dtype=float)
+
+    def positions(index, values):
+        names, codes = np.unique(values, return_inverse=True)
+        return np.array([index.get(n, -1) for n in names.tolist()], dtype=int)[codes]
+
+    g = positions(table.gasket_pos, gasket)
+    b = positions(table.grade_pos, grade)
+    pairs = np.char.add(np.char.add(series, '|'), dia_key)
+    t = positions({f'{s}|{d}': i for (s, d), i in table.thread_pos.items()}, pairs)
+    l = positions(table.lube_pos, lube)
+    tp = np.searchsorted(table.temps, temp, side='left')
+    ok = (g >= 0) & (b >= 0) & (t >= 0) & (l >= 0) & (tp < len(table.temps)) & ~np.isnan(temp)
+    out = np.full((len(temp), 3), np.nan)
+    out[ok] = table.torque[g[ok], b[ok], t[ok], tp[ok], l[ok]]
+    return out
+
+
+def card_rows(table, gasket_index, ref, grades=None, lubes=None):
+    # Column dict for one gasket's card, grade-major like the torque book;
+    # torques to 0.1 ft-lb (the app shows whole ft-lb).
+    bi = [i for i, g in enumerate(table.grades) if grades is None or g in grades]
+    li = [i for i, l in enumerate(table.lubes) if lubes is None or l in lubes]
+    b, t, tp, l = (a.ravel() for a in np.meshgrid(bi, np.arange(len(table.threads)), np.arange(len(table.temps)), li,
+                                                  indexing='ij'))
+    torque = table.torque[gasket_index, b, t, tp, l]
+    p1, p2, p3 = (np.round(torque[:, 1] * p, 1) for p in pass_pcts(ref))
+    torque = np.round(torque, 1)
+    pct = table.pct[gasket_index]
+    n = len(b)
+    return {
+        'gasket_id': np.full(n, table.gaskets[gasket_index]),
+        'grade': table.grades[b],
+        'diameter_in': table.threads[t, 1],
+        'thread_series': table.threads[t, 0],
+        'working_temp_F': table.temps[tp].astype(float),
+        'used_temp_F': table.used_temp[b, t, tp],
+        'Sy_or_allowable_ksi': table.strength[b, t, tp],
+        'lube': table.lubes[l],
+        'K': table.K[l],
+        'pct_min': np.full(n, pct[0]),
+        'pct_default': np.full(n, pct[1]),
+        'pct_max': np.full(n, pct[2]),
+        'torque_min_ftlb': torque[:, 0],
+        'torque_default_ftlb': torque[:, 1],
+        'torque_max_ftlb': torque[:, 2],
+        'pass1_ftlb': p1,
+        'pass2_ftlb': p2,
+        'pass3_ftlb': p3,
+    }
+
+
+def write_card(path, columns):
+    with Path(path).open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CARD_COLUMNS)
+        writer.writerows(zip(*(cells(name, np.asarray(columns[name])) for name in CARD_COLUMNS)))
+
+
+def write_cards(args):
+    ref = load_reference()
+    with span('load_table'):
+        table = load_table(ref, use_cache=not args.no_cache)
+    wanted = args.gasket or list(table.gaskets)
+    known = {name for g in ref.gasket_types for name in (g.id, g.label)}
+    for g in ref.gasket_types:
+        if g.id not in table.gasket_pos and (g.id in wanted or g.label in wanted):
+            print(f'{g.id}: specified target torque required; no card')
+    args.out.mkdir(parents=True, exist_ok=True)
+    for name in wanted:
+        i = table.gasket_pos.get(name)
+        if i is None:
+            if name not in known:
+                print(f'{name}: unknown gasket type')
+            continue
+        path = args.out / f'{table.gaskets[i]}.csv'
+        with span('write_card'):
+            write_card(path, card_rows(table, i, ref, args.grade, args.lube))
+        print('Wrote:', path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write gasket-specific torque window cards.')
+    parser.add_argument('--gasket', nargs='*', help='gasket ids or labels (default: every calculated-torque gasket)')
+    parser.add_argument('--grade', nargs='*', help='bolt grades to include (default: all)')
+    parser.add_argument('--lube', nargs='*', choices=list(LUBE_K), help='lubricants to include (default: all)')
+    parser.add_argument('--out', type=Path, default=Path('reports') / 'gasket_cards')
+    parser.add_argument('--no-cache', action='store_true', help='rebuild the window table')
+    add_arguments(parser)
+    args = parser.parse_args()
+    with session('gasket_torque', args.profile, args.timings):
+        write_cards(args)
+
+
+if __name__ == '__main__':
+    main()
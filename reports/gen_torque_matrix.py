@@ -1,15 +1,12 @@
-import json, csv
+import argparse, csv
 from pathlib import Path
 
-root = Path('app/src/main/assets/flange_reference.json')
-with root.open('r', encoding='utf-8') as f:
-    data = json.load(f)['flange_helper_reference_data']
+from instrument import add_arguments, session
+from reference_data import load_reference
+from torque_book import DEFAULT_CHUNK_ROWS, SINKS, cells, write_book
+from torque_engine import compute_torque
 
-fasteners = data['fasteners']
-tpi_lookup = fasteners['tpi_lookup']
-as_lookup = fasteners['tensileStressArea_As_in2_lookup']
-strength_lookup = fasteners['boltGrades']['strength_Sy_Su_min_ksi']
-allowable_lookup = fasteners['boltGrades'].get('allowableStress_S_ksi_atTemp', {})
+ref = load_reference()
 
 scenarios = [
     {"grade":"A193_B7", "dia":"1", "series":"8UN", "temp":600, "pct":0.50, "lube":"Dry", "k":0.27},
@@ -41,92 +38,87 @@ scenarios = [
 ]
 
 
-def parse_diameter(value):
-    if '-' in value and '/' in value:
-        whole, frac = value.split('-')
-        num, den = frac.split('/')
-        return float(whole) + float(num) / float(den)
-    if '/' in value:
-        num, den = value.split('/')
-        return float(num) / float(den)
-    return float(value)
-
-
-def lookup_sy(grade, dia):
-    ranges = strength_lookup.get(grade, [])
-    for r in ranges:
-        if dia >= r['diaMin_in'] and dia <= r['diaMax_in']:
-            sy = r.get('Sy')
-            return sy if isinstance(sy, (int, float)) else None
-    return None
-
-
-def lookup_allowable(grade, dia, temp):
-    ranges = allowable_lookup.get(grade, [])
-    if not ranges:
-        return None, None
-    for r in ranges:
-        if dia >= r['diaMin_in'] and dia <= r['diaMax_in']:
-            temps = r.get('temps', [])
-            # direct match
-            for t in temps:
-                if temp >= t['tMin'] and temp <= t['tMax']:
-                    return t['S'], t['tMax']
-            # round up to next highest
-            candidates = [t for t in temps if t['tMax'] >= temp]
-            if candidates:
-                chosen = sorted(candidates, key=lambda x: x['tMax'])[0]
-                return chosen['S'], chosen['tMax']
-    return None, None
-
-
-rows = []
-for idx, sc in enumerate(scenarios, start=1):
-    dia_key = sc['dia']
-    d_in = parse_diameter(dia_key)
-    series = sc['series']
-    tpi = tpi_lookup.get(series, {}).get(dia_key)
-    as_in2 = as_lookup.get(series, {}).get(dia_key)
-    if as_in2 is None and tpi is not None:
-        term = d_in - (0.9743 / tpi)
-        as_in2 = 0.7854 * term * term
-
-    sy = lookup_sy(sc['grade'], d_in)
-    allow_s, used_temp = lookup_allowable(sc['grade'], d_in, sc['temp'])
-    strength_used = allow_s if allow_s is not None else sy
-
-    pct = sc['pct']
-    f = as_in2 * (strength_used * 1000.0) * pct if (as_in2 and strength_used) else None
-    torque = (sc['k'] * d_in * f) / 12.0 if f is not None else None
-
-    rows.append({
-        'scenario': idx,
-        'grade': sc['grade'],
-        'diameter_in': dia_key,
-        'thread_series': series,
-        'tpi': tpi,
-        'As_in2': as_in2,
-        'working_temp_F': sc['temp'],
-        'used_temp_F': used_temp,
-        'Sy_or_allowable_ksi': strength_used,
-        'pct_yield': pct,
-        'bolt_load_F_lbf': f,
-        'lube': sc['lube'],
-        'K': sc['k'],
-        'target_torque_ftlb': torque,
-        'pass1_30pct_ftlb': (torque * 0.30) if torque is not None else None,
-        'pass2_60pct_ftlb': (torque * 0.60) if torque is not None else None,
-        'pass3_100pct_ftlb': torque,
-    })
-
-out_dir = Path('reports')
-out_dir.mkdir(exist_ok=True)
-
-csv_path = out_dir / 'Torque_Matrix_20.csv'
-with csv_path.open('w', newline='', encoding='utf-8') as f:
-    writer = csv.writer(f)
-    writer.writerow(list(rows[0].keys()))
-    for r in rows:
-        writer.writerow([r[k] for k in r.keys()])
-
-print('Wrote:', csv_path)
+def scenario_rows():
+    book = compute_torque(
+        [sc['grade'] for sc in scenarios],
+        [sc['dia'] for sc in scenarios],
+        [sc['series'] for sc in scenarios],
+        [sc['temp'] for sc in scenarios],
+        [sc['pct'] for sc in scenarios],
+        [sc['k'] for sc in scenarios],
+        ref,
+    )
+    cols = {name: cells(name, values) for name, values in book.items()}
+    rows = []
+    for i, sc in enumerate(scenarios):
+        rows.append({
+            'scenario': i + 1,
+            'grade': sc['grade'],
+            'diameter_in': sc['dia'],
+            'thread_series': sc['series'],
+            'tpi': cols['tpi'][i],
+            'As_in2': cols['As_in2'][i],
+            'working_temp_F': sc['temp'],
+            'used_temp_F': cols['used_temp_F'][i],
+            'Sy_or_allowable_ksi': cols['Sy_or_allowable_ksi'][i],
+            'pct_yield': sc['pct'],
+            'bolt_load_F_lbf': cols['bolt_load_F_lbf'][i],
+            'lube': sc['lube'],
+            'K': sc['k'],
+            'target_torque_ftlb': cols['target_torque_ftlb'][i],
+            'pass1_30pct_ftlb': cols['pass1_ftlb'][i],
+            'pass2_60pct_ftlb': cols['pass2_ftlb'][i],
+            'pass3_100pct_ftlb': cols['pass3_ftlb'][i],
+        })
+    return rows
+
+
+def write_scenarios(out_dir):
+    rows = scenario_rows()
+    csv_path = out_dir / 'Torque_Matrix_20.csv'
+    with csv_path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(rows[0].keys()))
+        for r in rows:
+            writer.writerow([r[k] for k in r.keys()])
+    return csv_path
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f'must be a positive integer, got {text}')
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate torque tables from flange_reference.json.')
+    parser.add_argument('--full', action='store_true',
+                        help='write the full-factorial torque book instead of the 20 sample scenarios')
+    parser.add_argument('--format', dest='formats', action='append', choices=sorted(SINKS),
+                        help='torque book output format; repeat for several (default: csv)')
+    parser.add_argument('--chunk-size', type=_positive_int, default=DEFAULT_CHUNK_ROWS,
+                        help='rows computed and written per chunk in --full mode')
+    parser.add_argument('--workers', type=_positive_int, default=1,
+                        help='process pool size for --full mode (output is identical to a serial run)')
+    parser.add_argument('--shard', choices=('grade', 'band'), default='grade',
+                        help='split work per grade or per grade x thread series/diameter')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    out_dir = Path('reports')
+    out_dir.mkdir(exist_ok=True)
+    with session('gen_torque_matrix', args.profile, args.timings):
+        if not args.full:
+            print('Wrote:', write_scenarios(out_dir))
+            return
+        paths, rows = write_book(out_dir / 'Torque_Book', args.formats or ['csv'], ref, args.chunk_size,
+                                 workers=args.workers, shard=args.shard)
+    print('Wrote:', *paths, f'({rows} rows)')
+
+
+if __name__ == '__main__':
+    main()
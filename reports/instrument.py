@@ -0,0 +1,149 @@
+import cProfile, json, os, sys, time
+from pathlib import Path
+
+# Named timing spans and counters for the reports pipeline. Spans nest by
+# call order ('build_reports/run:gen_bolt_report.py/bolt_table/range_match')
+# and are aggregated per path, so wrapping a loop body costs two
+# perf_counter() calls per iteration. Process-pool workers are not recorded;
+# their time shows up in the parent's span around the pool.
+
+TIMINGS_DIR = Path('reports') / '.cache' / 'timings'
+
+
+class _Recorder:
+    __slots__ = ('spans', 'counters', 'stack', 'started', 'active')
+
+    def __init__(self):
+        self.reset()
+        self.active = 0
+
+    def reset(self):
+        self.spans = {}  # path -> [calls, total seconds, child seconds]
+        self.counters = {}
+        self.stack = []
+        self.started = time.perf_counter()
+
+
+_recorder = _Recorder()
+
+
+class span:
+    # with span('parse_json'): ...
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _recorder.stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = _recorder.stack
+        path = '/'.join(stack)
+        stack.pop()
+        spans = _recorder.spans
+        entry = spans.get(path)
+        if entry is None:
+            entry = spans[path] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if stack:
+            # the parent is still open, so its entry may not exist yet
+            spans.setdefault('/'.join(stack), [0, 0.0, 0.0])[2] += elapsed
+        return False
+
+
+def count(name, n=1):
+    _recorder.counters[name] = _recorder.counters.get(name, 0) + n
+
+
+def summary():
+    spans = [
+        {'name': path, 'calls': calls, 'total_s': round(total, 6), 'self_s': round(total - child, 6)}
+        for path, (calls, total, child) in _recorder.spans.items()
+    ]
+    spans.sort(key=lambda s: s['name'])
+    return {
+        'script': Path(sys.argv[0]).name,
+        'argv': sys.argv[1:],
+        'pid': os.getpid(),
+        'finished': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'wall_s': round(time.perf_counter() - _recorder.started, 6),
+        'spans': spans,
+        'counters': dict(sorted(_recorder.counters.items())),
+    }
+
+
+def folded(data):
+    # Collapsed stacks ('a;b;c <microseconds>' of self time) for flamegraph.pl
+    # or speedscope.
+    return ''.join(f'{s["name"].replace("/", ";")} {round(s["self_s"] * 1e6)}\n'
+                   for s in data['spans'] if s['self_s'] > 0)
+
+
+def report(data):
+    width = max((len(s['name']) for s in data['spans']), default=4)
+    lines = [f'{"span".ljust(width)}  {"calls":>8}  {"total s":>9}  {"self s":>9}']
+    lines += [f'{s["name"].ljust(width)}  {s["calls"]:>8}  {s["total_s"]:>9.4f}  {s["self_s"]:>9.4f}'
+              for s in data['spans']]
+    lines += [f'{name}: {value}' for name, value in data['counters'].items()]
+    return '\n'.join(lines)
+
+
+def add_arguments(parser):
+    parser.add_argument('--profile', type=Path, metavar='OUT.prof',
+                        help='write cProfile stats here, span stacks to OUT.folded, and print a stage table')
+    parser.add_argument('--timings', type=Path, metavar='OUT.json', help='write the timing summary as JSON here')
+
+
+class session:
+    # Wraps a script's main(). The outermost session resets the recorder and,
+    # when --timings or --profile is given, also appends the summary as one line
+    # to reports/.cache/timings/<name>.jsonl; nested sessions (build_reports
+    # running a script) are plain spans.
+    __slots__ = ('name', 'profile', 'timings', '_span', '_profiler', '_outer')
+
+    def __init__(self, name, profile=None, timings=None):
+        self.name = name
+        self.profile = profile
+        self.timings = timings
+
+    def __enter__(self):
+        self._outer = _recorder.active == 0
+        if self._outer:
+            _recorder.reset()
+        _recorder.active += 1
+        self._profiler = cProfile.Profile() if self.profile else None
+        if self._profiler is not None:
+            self._profiler.enable()
+        self._span = span(self.name).__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._span.__exit__(*exc)
+        if self._profiler is not None:
+            self._profiler.disable()
+        _recorder.active -= 1
+        if self._profiler is not None or self.timings:
+            self._write(summary(), log=self._outer)
+        return False
+
+    def _write(self, data, log=True):
+        if log:
+            try:
+                TIMINGS_DIR.mkdir(parents=True, exist_ok=True)
+                with (TIMINGS_DIR / f'{self.name}.jsonl').open('a', encoding='utf-8') as f:
+                    f.write(json.dumps(data, separators=(',', ':')) + '\n')
+            except OSError:
+                pass
+        if self.timings:
+            Path(self.timings).write_text(json.dumps(data, indent=2), encoding='utf-8')
+        if self._profiler is not None:
+            path = Path(self.profile)
+            self._profiler.dump_stats(path)
+            path.with_suffix('.folded').write_text(folded(data), encoding='utf-8')
+            print(report(data))
+            print(f'Profile: {path} (python -m pstats, snakeviz, flameprof), spans: {path.with_suffix(".folded")}')
@@ -0,0 +1,277 @@
+import argparse, csv, json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from jobs_data import diameter_key, grade_key, iter_jobs, job_forms, nut_factor, parse_number, parse_percent
+from reference_data import load_reference
+from torque_engine import compute_torque
+
+DEFAULT_TOLERANCE = 0.05
+DEFAULT_TEMP_F = 100  # the form's default when workingTempF is blank
+APP_TEMP_F = 100  # FlangeFormScreen computes torque at a fixed 100 F and saves it as roundedTempF
+DEFAULT_PCT = 0.5
+BATCH_FORMS = 5_000
+
+FORM_COLUMNS = (
+    'file', 'job_id', 'job_number', 'form_id', 'description', 'gasket_type', 'grade', 'diameter',
+    'thread_series', 'working_temp_F', 'basis_temp_F', 'method', 'pct_yield', 'K', 'recorded_ftlb', 'expected_ftlb',
+    'deviation_pct', 'status',
+)
+JOB_COLUMNS = (
+    'file', 'job_id', 'job_number', 'location', 'forms', 'checked', 'deviations', 'temp_above_basis',
+    'not_computable', 'specified', 'max_abs_deviation_pct',
+)
+# Torques are recomputed at the temperature the app used (basis_temp_F).
+# ok: recorded torque within tolerance of the recomputed value
+# deviation: outside tolerance; not_computable: missing grade/diameter/As/strength/K
+# temp_above_basis: torque matches, but the working temperature is above the
+# basis temperature, so the allowable at temperature was not applied
+# specified: specified torque used, nothing to recompute; no_recorded: no calculated torque saved
+STATUSES = ('ok', 'deviation', 'temp_above_basis', 'not_computable', 'specified', 'no_recorded')
+CHECKED = ('ok', 'deviation', 'temp_above_basis')
+
+
+def _plain(value):
+    # whole numbers print without '.0' in the CSV
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def form_inputs(form):
+    temp = parse_number(form.get('workingTempF', ''))
+    basis = parse_number(form.get('roundedTempF', ''))
+    load = parse_number(form.get('targetBoltLoadF', ''))
+    pct = parse_percent(form.get('pctYieldTarget', ''))
+    if form.get('torqueMethod') == 'SPECIFIED_TORQUE':
+        method = 'SPECIFIED_TORQUE'
+    elif load is not None:
+        method = 'USER_INPUT'
+    else:
+        method = 'YIELD_PERCENT'
+    return {
+        'grade': grade_key(form.get('fastenerSpec', ''), form.get('fastenerClass', '')),
+        'diameter': diameter_key(form.get('fastenerDiameter', '')),
+        'thread_series': form.get('threadSeries', ''),
+        'working_temp_F': temp if temp is not None else DEFAULT_TEMP_F,
+        'basis_temp_F': basis if basis is not None else APP_TEMP_F,
+        'method': method,
+        'pct_yield': pct if pct is not None else DEFAULT_PCT,
+        'bolt_load': load,
+        'K': nut_factor(form),
+        'recorded_ftlb': parse_number(form.get('calculatedTargetTorque', '')),
+    }
+
+
+def expected_torque(inputs, ref):
+    # Recomputes target torque for a batch of form inputs in one vectorized
+    # engine call at the app's basis temperature; user-entered bolt loads
+    # bypass the strength lookup.
+    k = np.array([i['K'] if i['K'] is not None else np.nan for i in inputs], dtype=float)
+    out = compute_torque(
+        np.array([i['grade'] or '' for i in inputs], dtype=str),
+        np.array([i['diameter'] for i in inputs], dtype=str),
+        np.array([i['thread_series'] for i in inputs], dtype=str),
+        np.array([i['basis_temp_F'] for i in inputs], dtype=float),
+        np.array([i['pct_yield'] for i in inputs], dtype=float),
+        k, ref,
+    )['target_torque_ftlb']
+    d_in = np.array([ref.diameter_in.get(i['diameter'], np.nan) for i in inputs], dtype=float)
+    load = np.array([i['bolt_load'] if i['bolt_load'] is not None else np.nan for i in inputs], dtype=float)
+    user = np.array([i['method'] == 'USER_INPUT' for i in inputs], dtype=bool)
+    return np.where(user, k * d_in * load / 12.0, out)
+
+
+def check_forms(batch, ref, tolerance):
+    # batch: [(file, job, form)] -> form result rows
+    inputs = [form_inputs(form) for _, _, form in batch]
+    expected = expected_torque(inputs, ref)
+    rows = []
+    for (file, job, form), i, exp in zip(batch, inputs, expected.tolist()):
+        recorded = i['recorded_ftlb']
+        deviation = None
+        if i['method'] == 'SPECIFIED_TORQUE':
+            status = 'specified'
+        elif exp != exp or exp <= 0:
+            status = 'not_computable'
+        elif recorded is None:
+            status = 'no_recorded'
+        else:
+            deviation = (recorded - exp) / exp
+            # the app saves the calculated torque rounded to whole ft-lb
+            if abs(deviation) > tolerance and abs(recorded - exp) > 0.5:
+                status = 'deviation'
+            elif i['working_temp_F'] > i['basis_temp_F']:
+                status = 'temp_above_basis'
+            else:
+                status = 'ok'
+        rows.append({
+            'file': file,
+            'job_id': job.get('id', ''),
+            'job_number': job.get('number', ''),
+            'form_id': form.get('id', ''),
+            'description': form.get('description', ''),
+            'gasket_type': form.get('gasketType', ''),
+            'grade': i['grade'] or '',
+            'diameter': i['diameter'],
+            'thread_series': i['thread_series'],
+            'working_temp_F': _plain(i['working_temp_F']),
+            'basis_temp_F': _plain(i['basis_temp_F']),
+            'method': i['method'],
+            'pct_yield': i['pct_yield'],
+            'K': i['K'],
+            'recorded_ftlb': _plain(recorded),
+            'expected_ftlb': round(exp, 1) if exp == exp else None,
+            'deviation_pct': round(deviation * 100, 2) if deviation is not None else None,
+            'status': status,
+        })
+    return rows
+
+
+def _job_summary(file, job):
+    return {
+        'file': file, 'job_id': job.get('id', ''), 'job_number': job.get('number', ''),
+        'location': job.get('location', ''), 'forms': 0, 'checked': 0, 'deviations': 0, 'temp_above_basis': 0,
+        'not_computable': 0, 'specified': 0, 'max_abs_deviation_pct': None,
+    }
+
+
+def _add_to_summary(summary, row):
+    summary['forms'] += 1
+    status = row['status']
+    if status in CHECKED:
+        summary['checked'] += 1
+        dev = abs(row['deviation_pct'])
+        if summary['max_abs_deviation_pct'] is None or dev > summary['max_abs_deviation_pct']:
+            summary['max_abs_deviation_pct'] = dev
+    if status == 'deviation':
+        summary['deviations'] += 1
+    elif status in ('temp_above_basis', 'not_computable', 'specified'):
+        summary[status] += 1
+
+
+def analyze_file(path, ref=None, tolerance=DEFAULT_TOLERANCE, batch_forms=BATCH_FORMS):
+    # Streams one jobs.json; forms are checked in vectorized batches, so memory
+    # is bounded by the batch size rather than the file size.
+    ref = ref if ref is not None else load_reference()
+    file = str(path)
+    rows, summaries, batch, owners = [], [], [], []
+
+    def flush():
+        if batch:
+            for row, summary in zip(check_forms(batch, ref, tolerance), owners):
+                rows.append(row)
+                _add_to_summary(summary, row)
+        batch.clear()
+        owners.clear()
+
+    for job in iter_jobs(path):
+        summary = _job_summary(file, job)
+        summaries.append(summary)
+        for form in job_forms(job):
+            if isinstance(form, dict):
+                batch.append((file, job, form))
+                owners.append(summary)
+                if len(batch) >= batch_forms:
+                    flush()
+    flush()
+    return rows, summaries
+
+
+def fleet_summary(rows, summaries, tolerance):
+    by_status = {s: 0 for s in STATUSES}
+    by_grade = {}
+    for row in rows:
+        by_status[row['status']] += 1
+        if row['status'] == 'deviation':
+            by_grade[row['grade'] or '(unknown)'] = by_grade.get(row['grade'] or '(unknown)', 0) + 1
+    devs = np.array([abs(r['deviation_pct']) for r in rows if r['deviation_pct'] is not None], dtype=float)
+    worst = sorted((r for r in rows if r['status'] == 'deviation'), key=lambda r: -abs(r['deviation_pct']))[:10]
+    return {
+        'files': len({s['file'] for s in summaries}),
+        'jobs': len(summaries),
+        'forms': len(rows),
+        'tolerance_pct': tolerance * 100,
+        'by_status': by_status,
+        'deviations_by_grade': dict(sorted(by_grade.items())),
+        'abs_deviation_pct': {
+            'mean': round(float(devs.mean()), 2) if len(devs) else None,
+            'p95': round(float(np.percentile(devs, 95)), 2) if len(devs) else None,
+            'max': round(float(devs.max()), 2) if len(devs) else None,
+        },
+        'worst': [{k: r[k] for k in ('file', 'job_number', 'form_id', 'grade', 'diameter', 'recorded_ftlb',
+                                     'expected_ftlb', 'deviation_pct')} for r in worst],
+    }
+
+
+_worker = {}
+
+
+def _init_worker(ref, tolerance):
+    _worker.update(ref=ref, tolerance=tolerance)
+
+
+def _analyze(path):
+    return analyze_file(path, _worker['ref'], _worker['tolerance'])
+
+
+def analyze(paths, ref=None, tolerance=DEFAULT_TOLERANCE, workers=1):
+    # One task per file; results come back in input order.
+    ref = ref if ref is not None else load_reference()
+    if workers <= 1:
+        _init_worker(ref, tolerance)
+        results = map(_analyze, paths)
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ref, tolerance)) as pool:
+            results = list(pool.map(_analyze, paths))
+    rows, summaries = [], []
+    for file_rows, file_summaries in results:
+        rows.extend(file_rows)
+        summaries.extend(file_summaries)
+    return rows, summaries
+
+
+def _write_csv(path, columns, rows):
+    with Path(path).open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def job_files(paths):
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(path.rglob('jobs*.json'))
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute and check target torques across exported jobs.json files.')
+    parser.add_argument('paths', nargs='+', help='jobs.json files or directories searched for jobs*.json')
+    parser.add_argument('--out', type=Path, default=Path('reports'), help='output directory')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE * 100, help='allowed deviation in percent')
+    parser.add_argument('--workers', type=int, default=1, help='process pool size (one file per task)')
+    parser.add_argument('--all-forms', action='store_true', help='list every form, not only deviations')
+    args = parser.parse_args()
+
+    files = list(job_files(args.paths))
+    tolerance = args.tolerance / 100.0
+    rows, summaries = analyze(files, tolerance=tolerance, workers=args.workers)
+    fleet = fleet_summary(rows, summaries, tolerance)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    listed = rows if args.all_forms else [r for r in rows if r['status'] in ('deviation', 'temp_above_basis',
+                                                                            'not_computable')]
+    _write_csv(args.out / 'Job_Form_Checks.csv', FORM_COLUMNS, listed)
+    _write_csv(args.out / 'Job_Summary.csv', JOB_COLUMNS, summaries)
+    (args.out / 'Fleet_Summary.json').write_text(json.dumps(fleet, indent=2), encoding='utf-8')
+
+    print(f"{fleet['files']} files, {fleet['jobs']} jobs, {fleet['forms']} forms: "
+          + ', '.join(f'{n} {s}' for s, n in fleet['by_status'].items()))
+    print('Wrote:', args.out / 'Job_Form_Checks.csv', args.out / 'Job_Summary.csv', args.out / 'Fleet_Summary.json')
+
+
+if __name__ == '__main__':
+    main()
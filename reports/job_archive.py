@@ -0,0 +1,236 @@
+import argparse, csv, hashlib, json, sqlite3, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from jobs_data import (FORM_BOOL_FIELDS, FORM_LONG_FIELDS, FORM_TEXT_FIELDS, JOB_FIELDS, diameter_key, grade_key,
+                       iter_jobs, job_forms, parse_number)
+
+ARCHIVE_PATH = Path('reports') / 'job_archive.sqlite'
+SCHEMA_VERSION = 1
+BATCH_ROWS = 2_000
+
+# Derived columns: numeric working temperature and the reference grade key,
+# so temperature ranges and grade filters hit indexes instead of parsing text.
+DERIVED_COLUMNS = ('workingTempNum', 'gradeKey', 'source')
+FORM_COLUMNS = FORM_TEXT_FIELDS + FORM_LONG_FIELDS + FORM_BOOL_FIELDS + ('photoUris',) + DERIVED_COLUMNS
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS imports (
+    sha256 TEXT PRIMARY KEY, path TEXT, importedAt INTEGER, jobs INTEGER, forms INTEGER, skipped INTEGER
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY, number TEXT, location TEXT, dateMillis INTEGER, source TEXT
+);
+CREATE TABLE IF NOT EXISTS forms (
+    {', '.join(f'{c} TEXT' for c in FORM_TEXT_FIELDS)},
+    {', '.join(f'{c} INTEGER' for c in FORM_LONG_FIELDS + FORM_BOOL_FIELDS)},
+    photoUris TEXT, workingTempNum REAL, gradeKey TEXT, source TEXT,
+    PRIMARY KEY (jobId, id)
+);
+CREATE INDEX IF NOT EXISTS forms_job ON forms (jobId);
+CREATE INDEX IF NOT EXISTS forms_date ON forms (dateMillis);
+CREATE INDEX IF NOT EXISTS forms_spec ON forms (fastenerSpec, fastenerDiameter, workingTempNum);
+CREATE INDEX IF NOT EXISTS forms_grade ON forms (gradeKey, fastenerDiameter, workingTempNum);
+CREATE INDEX IF NOT EXISTS forms_gasket ON forms (gasketType);
+CREATE INDEX IF NOT EXISTS forms_class ON forms (flangeClass);
+CREATE INDEX IF NOT EXISTS jobs_date ON jobs (dateMillis);
+'''
+
+
+def connect(path=ARCHIVE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if version is None:
+        conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.commit()
+    elif int(version[0]) != SCHEMA_VERSION:
+        raise SystemExit(f'{path} has schema version {version[0]}, expected {SCHEMA_VERSION}')
+    return conn
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with Path(path).open('rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def form_row(job, form, source):
+    # Normalizes one FlangeFormItem with JobStorage.loadJobs defaults
+    # (optString -> '', optLong -> 0, optBoolean -> false).
+    row = [str(form.get(c, '') if form.get(c) is not None else '') for c in FORM_TEXT_FIELDS]
+    if not row[1]:
+        row[1] = str(job.get('id', ''))
+    row += [int(form.get(c) or 0) for c in FORM_LONG_FIELDS]
+    row += [1 if form.get(c) else 0 for c in FORM_BOOL_FIELDS]
+    row.append(json.dumps(form.get('photoUris') or []))
+    row.append(parse_number(form.get('workingTempF', '')))
+    row.append(grade_key(form.get('fastenerSpec', ''), form.get('fastenerClass', '')))
+    row.append(source)
+    return row
+
+
+def _upsert(table, columns, key):
+    # Later imports win; a row is only rewritten when a column other than the
+    # key and source changed, so rowcount = inserted + actually updated rows.
+    data = [c for c in columns if c not in key and c != 'source']
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in columns)} "
+        f"WHERE ({', '.join(data)}) IS NOT ({', '.join(f'excluded.{c}' for c in data)})"
+    )
+
+
+def import_file(conn, path):
+    # A file already imported (same SHA-256) is skipped. Jobs and forms already
+    # archived under the same id / (jobId, id) are replaced by the newer
+    # export's values (pass initials, signatures, torques). Returns
+    # (jobs, forms, forms updated, forms unchanged).
+    digest = _file_digest(path)
+    if conn.execute('SELECT 1 FROM imports WHERE sha256 = ?', (digest,)).fetchone():
+        return None
+    source = str(path)
+    insert_job = _upsert('jobs', JOB_FIELDS + ('source',), ('id',))
+    insert_form = _upsert('forms', FORM_COLUMNS, ('jobId', 'id'))
+    jobs = forms = written = 0
+    batch = []
+    with conn:
+        before = conn.execute('SELECT COUNT(*) FROM forms').fetchone()[0]
+        for job in iter_jobs(path):
+            jobs += 1
+            conn.execute(insert_job, (str(job.get('id', '')), str(job.get('number', '')),
+                                      str(job.get('location', '')), int(job.get('dateMillis') or 0), source))
+            for form in job_forms(job):
+                if isinstance(form, dict):
+                    batch.append(form_row(job, form, source))
+                    if len(batch) >= BATCH_ROWS:
+                        written += conn.executemany(insert_form, batch).rowcount
+                        forms += len(batch)
+                        batch = []
+        if batch:
+            written += conn.executemany(insert_form, batch).rowcount
+            forms += len(batch)
+        updated = written - (conn.execute('SELECT COUNT(*) FROM forms').fetchone()[0] - before)
+        conn.execute('INSERT INTO imports VALUES (?, ?, ?, ?, ?, ?)',
+                     (digest, source, int(time.time() * 1000), jobs, forms, forms - written))
+    return jobs, forms, updated, forms - written
+
+
+def _millis(value):
+    # Accepts epoch millis or an ISO date (YYYY-MM-DD, UTC).
+    if value is None:
+        return None
+    if str(value).isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(str(value)).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _select(grade=None, spec=None, diameter=None, gasket=None, flange_class=None, job_id=None,
+            min_temp=None, max_temp=None, since=None, until=None, limit=None):
+    where, params = [], []
+    for column, value in (('f.gradeKey', grade), ('f.fastenerSpec', spec), ('f.gasketType', gasket),
+                          ('f.flangeClass', flange_class), ('f.jobId', job_id)):
+        if value is not None:
+            where.append(f'{column} = ?')
+            params.append(value)
+    if diameter is not None:
+        where.append('f.fastenerDiameter = ?')
+        params.append(diameter_key(diameter))
+    if min_temp is not None:
+        where.append('f.workingTempNum >= ?')
+        params.append(float(min_temp))
+    if max_temp is not None:
+        where.append('f.workingTempNum <= ?')
+        params.append(float(max_temp))
+    if since is not None:
+        where.append('f.dateMillis >= ?')
+        params.append(_millis(since))
+    if until is not None:
+        where.append('f.dateMillis < ?')
+        params.append(_millis(until))
+    sql = ('SELECT j.number AS jobNumber, j.location AS jobLocation, f.* FROM forms f '
+           'LEFT JOIN jobs j ON j.id = f.jobId')
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY f.dateMillis, f.jobId, f.id'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(int(limit))
+    return sql, params
+
+
+def query(conn, **filters):
+    # Filters: grade, spec, diameter, gasket, flange_class, job_id, min_temp,
+    # max_temp, since, until (exclusive), limit. Each maps to an indexed column.
+    # Returns sqlite3.Row records with the job number/location joined in.
+    sql, params = _select(**filters)
+    return conn.execute(sql, params).fetchall()
+
+
+def explain(conn, **filters):
+    # SQLite's plan for the same filters, to confirm which index is used.
+    sql, params = _select(**filters)
+    return [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive exported jobs.json files in SQLite and query them.')
+    parser.add_argument('--db', type=Path, default=ARCHIVE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    add = sub.add_parser('import', help='import jobs.json exports (already imported files are skipped, newer forms replace older)')
+    add.add_argument('paths', nargs='+', type=Path)
+
+    find = sub.add_parser('query', help='print matching forms as CSV')
+    find.add_argument('--grade', help='reference grade key, e.g. A193_B7')
+    find.add_argument('--spec', help='fastener spec as entered, e.g. "A193 B7"')
+    find.add_argument('--diameter', help='e.g. 1-1/2')
+    find.add_argument('--gasket')
+    find.add_argument('--flange-class')
+    find.add_argument('--job-id')
+    find.add_argument('--min-temp', type=float)
+    find.add_argument('--max-temp', type=float)
+    find.add_argument('--since', help='YYYY-MM-DD or epoch millis')
+    find.add_argument('--until', help='YYYY-MM-DD or epoch millis (exclusive)')
+    find.add_argument('--limit', type=int)
+    find.add_argument('--out', type=Path, help='CSV path (default: stdout)')
+    find.add_argument('--explain', action='store_true', help='print the query plan instead of rows')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == 'import':
+        for path in args.paths:
+            result = import_file(conn, path)
+            if result is None:
+                print(f'{path}: already imported')
+            else:
+                jobs, forms, updated, unchanged = result
+                print(f'{path}: {jobs} jobs, {forms} forms ({updated} updated, {unchanged} already archived unchanged)')
+        return
+
+    filters = dict(grade=args.grade, spec=args.spec, diameter=args.diameter, gasket=args.gasket,
+                   flange_class=args.flange_class, job_id=args.job_id, min_temp=args.min_temp,
+                   max_temp=args.max_temp, since=args.since, until=args.until, limit=args.limit)
+    if args.explain:
+        print('\n'.join(explain(conn, **filters)))
+        return
+    rows = query(conn, **filters)
+    out = args.out.open('w', newline='', encoding='utf-8') if args.out else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(rows[0].keys() if rows else ['jobNumber', 'jobLocation'] + list(FORM_COLUMNS))
+        writer.writerows(tuple(r) for r in rows)
+    finally:
+        if args.out:
+            out.close()
+    print(f'{len(rows)} forms', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,487 @@
+import argparse, hashlib, io, os, re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from bolt_sequence import star_sequence
+from jobs_data import diameter_key, iter_jobs, job_forms, parse_number, parse_percent
+from nut_pairing import NUT_PAIRING_PATH, bolt_key, evaluate, load_pairing, nut_key
+from pdf_writer import PdfWriter, fit_text, image_object, text_width, wrap_text
+from reference_data import CACHE_DIR, parse_diameter
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Batch port of PdfExporter.exportJobToPdf: one PDF per job, one page per form
+# plus a photo page when the form has photos, same coordinates and fields.
+
+PAGE_WIDTH, PAGE_HEIGHT, MARGIN = 612, 792, 36
+PDF_PHOTO_MAX_EDGE_PX = 1600
+MODES = ('email', 'full')  # PdfExportMode.EMAIL_FRIENDLY / FULL_RES
+OUT_DIR = Path('reports') / 'job_pdfs'
+IMAGE_CACHE_DIR = CACHE_DIR / 'pdf_images'
+IMAGE_CACHE_VERSION = 1
+STORAGE_DIR = 'flange_helper'  # JobStorage.STORAGE_DIR under the app's filesDir
+GRAY = 0x88 / 255  # android.graphics.Color.GRAY
+NUT_NOTE = ('Selected nut is not the commonly paired type for this stud material/grade. '
+            'Proceed only if facility spec allows.')
+
+TITLE, HEADER, LABEL, VALUE = (16, 'bold'), (12, 'bold'), (10, 'regular'), (10, 'bold')
+
+
+def _text(form, key):
+    value = form.get(key)
+    return '' if value is None else str(value)
+
+
+def _fmt(value, places=0):
+    # Java String.format rounds half-up on the shortest decimal form.
+    q = Decimal(1).scaleb(-places)
+    return str(Decimal(repr(float(value))).quantize(q, rounding=ROUND_HALF_UP))
+
+
+def format_date(millis):
+    # JobDateUtils.formatDate ("MMM d, yyyy", device local time)
+    d = datetime.fromtimestamp(millis / 1000.0)
+    return f'{d:%b} {d.day}, {d.year}'
+
+
+def _unit(value, places, unit):
+    number = parse_number(value) if isinstance(value, str) else value
+    return f'{_fmt(number, places)}{unit}' if number is not None else None
+
+
+def _tpi(value):
+    return _unit(value, 0, ' threads/in') or value
+
+
+def _area(value):
+    return _unit(value, 4, ' in^2') or value
+
+
+def _ksi(value):
+    return _unit(value, 1, ' ksi') or ''
+
+
+def _force(value):
+    return _unit(value, 0, ' lbf') or ''
+
+
+def _torque(value):
+    return _unit(value, 0, ' ft-lb') or ''
+
+
+def _k(value):
+    k = parse_number(value)
+    return f'K={_fmt(k, 2)}' if k is not None else value
+
+
+def _percent(value):
+    return f'{_fmt(value * 100.0)}%' if value is not None else ''
+
+
+def _method(value):
+    return {'YIELD_PERCENT': '% of yield', 'USER_INPUT': 'Use F directly',
+            'SPECIFIED_TORQUE': 'Specified torque'}.get(value, value)
+
+
+def _inches(value):
+    return f'{value} in' if value.strip() else ''
+
+
+def _pass_line(form, n):
+    initials = _text(form, f'pass{n}Initials')
+    target = parse_number(_text(form, 'specifiedTargetTorque'))
+    if target is None:
+        target = parse_number(_text(form, 'calculatedTargetTorque'))
+    if target is None:
+        return initials
+    if n <= 2:
+        low, high = (0.20, 0.30) if n == 1 else (0.50, 0.70)
+        text = f'{_fmt(low * 100)}-{_fmt(high * 100)}% ({_fmt(target * low)}-{_fmt(target * high)} ft-lb)'
+    else:
+        text = f'100% ({_fmt(target)} ft-lb)'
+    return f'{text} {initials}' if initials.strip() else text
+
+
+def _diameter_in(value):
+    try:
+        return parse_diameter(diameter_key(value))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _bolt_order(text):
+    # FlangeMath.generateBoltSequence: empty for odd counts or fewer than 4
+    try:
+        count = int(text)
+    except ValueError:
+        return None
+    try:
+        return star_sequence(count)
+    except ValueError:
+        return ()
+
+
+def form_fields(form, index):
+    # Left and right column (label, value) pairs, computed as PdfExporter does.
+    as_in2 = parse_number(_text(form, 'asUsed'))
+    strength = parse_number(_text(form, 'strengthKsiUsed'))
+    pct = parse_percent(_text(form, 'pctYieldTarget'))
+    stress = strength * pct if strength is not None and pct is not None else None
+    calc_load = stress * 1000.0 * as_in2 if as_in2 is not None and stress is not None else None
+    load = parse_number(_text(form, 'targetBoltLoadF'))
+    load = load if load is not None else calc_load
+    d_in = _diameter_in(_text(form, 'fastenerDiameter'))
+    k = parse_number(_text(form, 'kUsed'))
+    calc_torque = k * d_in * load / 12.0 if load is not None and d_in is not None and k is not None else None
+    calculated = _text(form, 'calculatedTargetTorque')
+    if not calculated.strip():
+        calculated = _fmt(calc_torque) if calc_torque is not None else ''
+    yes_no = lambda key: 'Yes' if form.get(key) else 'No'
+    cal = int(form.get('wrenchCalDateMillis') or 0)
+    left = [
+        ('Form #', str(index + 1)),
+        ('Flange Desc', _text(form, 'description')),
+        ('Service Type', _text(form, 'serviceType')),
+        ('Gasket Type', _text(form, 'gasketType')),
+        ('Flange Class', _text(form, 'flangeClass')),
+        ('Pipe Size', _text(form, 'pipeSize')),
+        ('Custom I.D.', _text(form, 'customInnerDiameter')),
+        ('Custom O.D.', _text(form, 'customOuterDiameter')),
+        ('Thickness', _text(form, 'customThickness')),
+        ('Flange Face', _text(form, 'flangeFace')),
+        ('Bolt Holes', _text(form, 'boltHoles')),
+        ('Face Condition', _text(form, 'flangeFaceCondition')),
+        ('Parallel', _text(form, 'flangeParallel')),
+        ('Fastener Type', _text(form, 'fastenerType')),
+        ('Fastener Spec', _text(form, 'fastenerSpec')),
+        ('Fastener Class', _text(form, 'fastenerClass')),
+        ('Fastener Length', _inches(_text(form, 'fastenerLength'))),
+        ('Fastener Dia', _inches(_text(form, 'fastenerDiameter'))),
+        ('Thread Series', _text(form, 'threadSeries')),
+        ('Nut Spec', _text(form, 'nutSpec')),
+        ('Washer Used', yes_no('washerUsed')),
+    ]
+    right = [
+        ('Wrench S/N', _text(form, 'wrenchSerials')),
+        ('Wrench Cal', format_date(cal) if cal > 0 else ''),
+        ('Lubricated', yes_no('torqueWet')),
+        ('Lubricant', _text(form, 'lubricantType')),
+        ('Method', _method(_text(form, 'torqueMethod'))),
+        ('Target Bolt Stress', _ksi(stress)),
+        ('Yield %', _percent(pct)),
+        ('TPI', _tpi(_text(form, 'tpiUsed'))),
+        ('As', _area(_text(form, 'asUsed'))),
+        ('S Value', _ksi(_text(form, 'strengthKsiUsed'))),
+        ('Target Bolt Load F', _force(load)),
+        ('Nut factor (K)', _k(_text(form, 'kUsed'))),
+        ('Calc Torque', _torque(calculated)),
+        ('Specified', _torque(_text(form, 'specifiedTargetTorque'))),
+        ('Nut Override Ack', yes_no('nutOverrideAcknowledged')),
+    ] + [(f'Pass{n}', _pass_line(form, n)) for n in range(1, 5)]
+    return left, right
+
+
+def resolve_media(uri, media_root):
+    # JobStorage.fileFromContentUri against a copy of the app's flange_helper
+    # directory (photos/, signatures/); plain paths are used as they are.
+    if not uri.strip():
+        return None
+    parsed = urlparse(uri)
+    root = Path(media_root) if media_root else None
+    if parsed.scheme in ('', 'file'):
+        path = Path(unquote(parsed.path) if parsed.scheme else uri)
+        if root is not None and not path.exists():
+            parts = path.parts
+            if STORAGE_DIR in parts:
+                return root.joinpath(*parts[parts.index(STORAGE_DIR) + 1:])
+        return path
+    if parsed.scheme != 'content' or root is None:
+        return None
+    segments = [unquote(s) for s in parsed.path.split('/') if s]
+    if len(segments) > 1 and segments[0] in ('photos', 'signatures', 'exports'):
+        return root.joinpath(*segments)
+    if STORAGE_DIR in segments:
+        rest = segments[segments.index(STORAGE_DIR) + 1:]
+        return root.joinpath(*rest) if rest else None
+    return None
+
+
+def _encode_image(path, max_edge):
+    with Image.open(path) as im:
+        fmt = im.format
+        scale = max_edge and max(im.size) > max_edge
+        if fmt == 'JPEG' and im.mode in ('RGB', 'L') and not scale:
+            space = 'DeviceRGB' if im.mode == 'RGB' else 'DeviceGray'
+            return image_object(im.width, im.height, space, Path(path).read_bytes(), jpeg=True)
+        im.load()
+        if im.mode in ('RGBA', 'LA', 'P', 'PA') or 'transparency' in im.info:
+            # drawn onto a white page
+            rgba = im.convert('RGBA')
+            im = Image.new('RGB', rgba.size, 'white')
+            im.paste(rgba, mask=rgba.getchannel('A'))
+        elif im.mode not in ('RGB', 'L'):
+            im = im.convert('RGB')
+        if scale:
+            # PdfExporter.scaleBitmapMaxEdge (filtered createScaledBitmap)
+            ratio = max_edge / max(im.size)
+            im = im.resize((max(1, int(im.width * ratio)), max(1, int(im.height * ratio))), Image.BILINEAR)
+        space = 'DeviceRGB' if im.mode == 'RGB' else 'DeviceGray'
+        if fmt == 'JPEG':
+            buf = io.BytesIO()
+            im.save(buf, 'JPEG', quality=90)
+            return image_object(im.width, im.height, space, buf.getvalue(), jpeg=True)
+        return image_object(im.width, im.height, space, im.tobytes())
+
+
+@lru_cache(maxsize=64)
+def _image_body(path, size, mtime_ns, max_edge, cache_dir):
+    # Decoded/downscaled images are kept as finished PDF objects on disk,
+    # keyed by file identity and target size, so reruns and the other worker
+    # processes skip decoding; the LRU keeps signatures reused across forms.
+    key = hashlib.sha256(f'{IMAGE_CACHE_VERSION}|{path}|{size}|{mtime_ns}|{max_edge}'.encode()).hexdigest()
+    cached = Path(cache_dir) / f'{key}.obj' if cache_dir else None
+    if cached is not None and cached.exists():
+        return cached.read_bytes()
+    try:
+        body = _encode_image(path, max_edge)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    if cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f'.{os.getpid()}.tmp')
+        tmp.write_bytes(body)
+        os.replace(tmp, cached)
+    return body
+
+
+def image_body(path, max_edge=None, cache_dir=IMAGE_CACHE_DIR):
+    if Image is None:
+        raise SystemExit('Pillow is required for photos and signatures (pip install pillow)')
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return _image_body(str(Path(path).resolve()), st.st_size, st.st_mtime_ns, max_edge,
+                       str(cache_dir) if cache_dir else None)
+
+
+class JobRenderer:
+    __slots__ = ('pairing', 'media_root', 'mode', 'cache_dir')
+
+    def __init__(self, pairing=None, media_root=None, mode='email', cache_dir=IMAGE_CACHE_DIR):
+        self.pairing, self.media_root, self.mode, self.cache_dir = pairing, media_root, mode, cache_dir
+
+    def _image(self, writer, page, uri, rect, max_edge=None):
+        # Missing or undecodable images leave the box empty, like loadBitmap returning null.
+        path = resolve_media(uri, self.media_root)
+        if path is None:
+            return
+        body = image_body(path, max_edge, self.cache_dir)
+        if body is not None:
+            page.image(writer.image((str(path), max_edge), lambda: body), *rect)
+
+    def _signature(self, writer, page, x, y, header, print_name, sign_uri, date_millis):
+        # PdfExporter.drawSignatureSection / drawSignatureBlock / drawSignatureBox
+        def block(y, label, value):
+            page.text(x, y, f'{label}:', *LABEL)
+            if value.strip():
+                page.text(x + 50, y, value, *VALUE)
+            else:
+                page.line(x + 40, y + 2, x + 220, y + 2)
+
+        page.text(x, y, header, *HEADER)
+        y += 14
+        block(y, 'Print', print_name)
+        y += 18
+        left, top = x + 40, y - 12
+        page.text(x, y, 'Sign:', *LABEL)
+        page.rect(left, top, left + 220, top + 50)
+        if sign_uri.strip():
+            self._image(writer, page, sign_uri, (left + 3, top + 3, left + 217, top + 47))
+        y += 50 + 8
+        block(y, 'Date', format_date(date_millis) if date_millis > 0 else '')
+        return y + 18
+
+    def form_page(self, writer, job, form, index):
+        page = writer.new_page()
+        y = MARGIN + 22
+        title = 'FLANGE TORQUE REPORT'
+        width = text_width(title, *TITLE)
+        title_x = max((PAGE_WIDTH - width) / 2, MARGIN)
+        page.text(title_x, y, title, *TITLE)
+        page.line(title_x, y + 4, title_x + width, y + 4)
+        y += 26
+        page.text(MARGIN, y, f"Job: {_text(job, 'number')}", *LABEL)
+        page.text(MARGIN + 200, y, f"Location: {_text(job, 'location')}", *LABEL)
+        page.text(MARGIN + 420, y, f"Date: {format_date(int(job.get('dateMillis') or 0))}", *LABEL)
+        y += 26
+
+        left_x, right_x = MARGIN, PAGE_WIDTH // 2 + 10
+        column_width = PAGE_WIDTH // 2 - MARGIN - 12
+        value_offset, right_value_offset = 130, 150
+        value_width = column_width - value_offset
+        right_value_width = PAGE_WIDTH - right_x - MARGIN - right_value_offset
+        left, right = form_fields(form, index)
+
+        y += 8
+        data_top = y - 8
+        for i in range(max(len(left), len(right))):
+            if i < len(left):
+                label, value = left[i]
+                page.text(left_x, y, label, *LABEL)
+                page.text(left_x + value_offset, y, fit_text(value if value.strip() else '-', *VALUE, value_width), *VALUE)
+                y += 14
+            if i < len(right):
+                # drawn after the left row advanced y, as in PdfExporter
+                label, value = right[i]
+                page.text(right_x, y, label, *LABEL)
+                page.text(right_x + right_value_offset, y,
+                          fit_text(value if value.strip() else '-', *VALUE, right_value_width), *VALUE)
+        data_bottom = y + 4
+        page.rect(left_x - 6, data_top, left_x + column_width + 6, data_bottom)
+        page.rect(right_x - 6, data_top, PAGE_WIDTH - MARGIN + 6, data_bottom)
+
+        y += 18
+        pairing = evaluate(self.pairing, bolt_key(_text(form, 'fastenerSpec'), _text(form, 'fastenerClass')),
+                           nut_key(_text(form, 'nutSpec')))
+        if pairing and pairing['warnings']:
+            for line in wrap_text(f'Nut Warning: {NUT_NOTE}', *VALUE, PAGE_WIDTH - MARGIN * 2):
+                y += 12
+                page.text(MARGIN, y, line, *VALUE)
+            y += 8
+        else:
+            y += 4
+        y = self._signature(writer, page, left_x, y, 'Contractor Representative', _text(form, 'contractorPrintName'),
+                            _text(form, 'contractorSignUri'), int(form.get('contractorDateMillis') or 0))
+        y += 16
+        y = self._signature(writer, page, left_x, y, 'Facility Representative', _text(form, 'facilityPrintName'),
+                            _text(form, 'facilitySignUri'), int(form.get('facilityDateMillis') or 0))
+        y += 18
+        order = _bolt_order(_text(form, 'boltHoles'))
+        if order is not None:
+            note = ("Starting at the 12 o'clock position and moving clockwise, "
+                    f"mark each bolt in this order: {', '.join(map(str, order))} ... "
+                    'Tightening order: sequential 1, 2, 3, 4 ...')
+            for line in wrap_text(note, *LABEL, PAGE_WIDTH - 2 * MARGIN):
+                page.text(left_x, y, line, *LABEL)
+                y += 12
+        writer.add_page(page)
+
+    def photo_page(self, writer, photos):
+        page = writer.new_page()
+        page.text(MARGIN, MARGIN + 14, 'Flange Photos', 14, 'bold')
+        grid_top = MARGIN + 30
+        cell_w = (PAGE_WIDTH - 2 * MARGIN) // 2
+        cell_h = (PAGE_HEIGHT - grid_top - MARGIN) // 2
+        max_edge = PDF_PHOTO_MAX_EDGE_PX if self.mode == 'email' else None
+        for i, uri in enumerate(photos[:4]):
+            left, top = MARGIN + (i % 2) * cell_w, grid_top + (i // 2) * cell_h
+            page.rect(left, top, left + cell_w, top + cell_h, gray=GRAY)
+            self._image(writer, page, uri, (left + 8, top + 8, left + cell_w - 8, top + cell_h - 8), max_edge)
+        writer.add_page(page)
+
+    def render(self, job, path):
+        # Pages go to disk as they are finished; returns the page count.
+        with PdfWriter(path, PAGE_WIDTH, PAGE_HEIGHT) as writer:
+            for index, form in enumerate(f for f in job_forms(job) if isinstance(f, dict)):
+                self.form_page(writer, job, form, index)
+                photos = [str(p) for p in form.get('photoUris') or []]
+                if photos:
+                    self.photo_page(writer, photos)
+            return writer.page_count
+
+
+def pdf_name(job):
+    # PdfExporter file name: Job_<number>_<yyyyMMdd>.pdf
+    number = re.sub(r'[^A-Za-z0-9_-]', '_', _text(job, 'number').strip() or 'job')
+    day = datetime.fromtimestamp(int(job.get('dateMillis') or 0) / 1000.0)
+    return f'Job_{number}_{day:%Y%m%d}.pdf'
+
+
+def render_tasks(paths, out_dir):
+    # (job, output path) for every job with forms; repeated names get a suffix
+    # instead of overwriting each other.
+    seen = set()
+    for path in paths:
+        for job in iter_jobs(path):
+            if not any(isinstance(f, dict) for f in job_forms(job)):
+                continue  # exportJobToPdf returns null for jobs without forms
+            name = pdf_name(job)
+            n = 1
+            while name in seen:
+                n += 1
+                name = f'{pdf_name(job)[:-4]}_{n}.pdf'
+            seen.add(name)
+            yield job, Path(out_dir) / name
+
+
+_worker = {}
+
+
+def _init_worker(renderer):
+    _worker['renderer'] = renderer
+
+
+def _render(task):
+    job, path = task
+    return path, _worker['renderer'].render(job, path)
+
+
+def render_all(tasks, renderer, workers=1):
+    # Yields (path, pages) as jobs finish. With a pool, at most 2 x workers
+    # jobs are in flight, so a large jobs.json is never held in memory whole.
+    if workers <= 1:
+        _init_worker(renderer)
+        yield from map(_render, tasks)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(renderer,)) as pool:
+        pending = set()
+        for task in tasks:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (f.result() for f in done)
+            pending.add(pool.submit(_render, task))
+        for f in wait(pending).done:
+            yield f.result()
+
+
+def _positive_int(text):
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f'must be a positive integer, got {text}')
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render job PDF reports (PdfExporter layout) from jobs.json exports.')
+    parser.add_argument('paths', nargs='+', type=Path, help='jobs.json files')
+    parser.add_argument('--media', type=Path, help="copy of the app's flange_helper directory (photos/, signatures/)")
+    parser.add_argument('--out', type=Path, default=OUT_DIR, help='output directory')
+    parser.add_argument('--mode', choices=MODES, default='email', help='email: photos capped at 1600 px; full: original')
+    parser.add_argument('--workers', type=_positive_int, default=os.cpu_count() or 1, help='jobs rendered in parallel')
+    parser.add_argument('--pairing', type=Path, default=NUT_PAIRING_PATH)
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the image cache')
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    renderer = JobRenderer(load_pairing(args.pairing), args.media, args.mode, None if args.no_cache else IMAGE_CACHE_DIR)
+    files = pages = 0
+    for path, n in render_all(render_tasks(args.paths, args.out), renderer, args.workers):
+        files += 1
+        pages += n
+        print(f'{path} ({n} pages)')
+    print(f'Wrote {files} PDFs, {pages} pages to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import json, re
+from pathlib import Path
+
+# Readers for jobs.json as written by JobStorage.saveJobs: a JSON array of
+# jobs {id, number, location, dateMillis, forms: [FlangeFormItem fields]}.
+
+JOB_FIELDS = ('id', 'number', 'location', 'dateMillis')
+
+# FlangeFormItem fields in JobStorage order, grouped by JSON type.
+FORM_TEXT_FIELDS = (
+    'id', 'jobId', 'description', 'serviceType', 'gasketType', 'wrenchSerials', 'lubricantType',
+    'flangeClass', 'pipeSize', 'customInnerDiameter', 'customOuterDiameter', 'customThickness',
+    'flangeFace', 'boltHoles', 'flangeFaceCondition', 'flangeParallel', 'fastenerType',
+    'fastenerSpec', 'fastenerClass', 'fastenerLength', 'fastenerDiameter', 'threadSeries',
+    'nutSpec', 'workingTempF', 'roundedTempF', 'torqueMethod', 'targetBoltLoadF', 'pctYieldTarget',
+    'tpiUsed', 'asUsed', 'strengthKsiUsed', 'kUsed', 'calculatedTargetTorque',
+    'specifiedTargetTorque', 'pass1Initials', 'pass2Initials', 'pass3Initials', 'pass4Initials',
+    'contractorPrintName', 'contractorSignUri', 'facilityPrintName', 'facilitySignUri',
+)
+FORM_LONG_FIELDS = ('dateMillis', 'wrenchCalDateMillis', 'contractorDateMillis', 'facilityDateMillis')
+FORM_BOOL_FIELDS = (
+    'torqueDry', 'torqueWet', 'nutOverrideAcknowledged', 'washerUsed',
+    'pass1Confirmed', 'pass2Confirmed', 'pass3Confirmed', 'pass4Confirmed',
+)
+
+# FlangeFormScreen.gradeKeyForSpec; A453 Grade 660 appends the class letter.
+APP_GRADE_KEYS = {
+    'A193 B7': 'A193_B7',
+    'A193 B16': 'A193_B16',
+    'A193 B8 (304)': 'A193_B8_Class1_304',
+    'A193 B8M (316)': 'A193_B8M_Class1_316',
+    'A320 L7': 'A320_L7',
+    'A193 B7M': 'A193_B7M',
+    'A320 L7M': 'A320_L7M',
+}
+
+# FlangeFormScreen.lubricantOptions values -> nut factor K; dry torque uses 0.27.
+APP_LUBE_K = {
+    'Unlubricated (K 0.27)': 0.27,
+    'Moly paste (K 0.11)': 0.11,
+    'Never-Seez Regular (K 0.13)': 0.13,
+    'Copper/Nickel anti-seize (K 0.15)': 0.15,
+    'High-temp blends (K 0.17)': 0.17,
+}
+DRY_K = 0.27
+
+_READ_CHARS = 1 << 20
+_WS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(path, read_chars=_READ_CHARS):
+    # Yields the elements (objects) of a top-level JSON array one at a time,
+    # holding at most one element plus one read buffer in memory. A blank
+    # file is empty, like JobStorage.loadJobs.
+    decoder = json.JSONDecoder()
+    with Path(path).open('r', encoding='utf-8-sig') as f:
+        buf, pos, started = '', 0, False
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if pos >= len(buf):
+                more = f.read(read_chars)
+                if not more:
+                    if started:
+                        raise ValueError(f'{path}: unterminated JSON array')
+                    return
+                buf, pos = more, 0
+                continue
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError(f'{path}: expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # element cut off by the read boundary: extend and retry
+                more = f.read(read_chars)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield value
+            pos = end
+
+
+def iter_jobs(path):
+    for job in iter_json_array(path):
+        if isinstance(job, dict):
+            yield job
+
+
+def job_forms(job):
+    forms = job.get('forms')
+    return forms if isinstance(forms, list) else []
+
+
+def grade_key(spec, fastener_class):
+    if spec == 'A453 Grade 660':
+        return f'A453_660_Class{fastener_class}' if fastener_class.strip() else None
+    return APP_GRADE_KEYS.get(spec)
+
+
+def diameter_key(value):
+    # FlangeMath.normalizeDiameterKey
+    return str(value).replace(' (in.)', '').strip()
+
+
+def parse_number(text):
+    try:
+        return float(str(text).strip())
+    except ValueError:
+        return None
+
+
+def parse_percent(text):
+    # FlangeFormScreen.parsePercentValue: values above 1 are percentages.
+    value = parse_number(text)
+    if value is None:
+        return None
+    return value / 100.0 if value > 1.0 else value
+
+
+def nut_factor(form):
+    if form.get('torqueWet'):
+        return APP_LUBE_K.get(form.get('lubricantType', ''))
+    return DRY_K
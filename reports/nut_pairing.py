@@ -0,0 +1,297 @@
+import argparse, csv, json
+from pathlib import Path
+
+import numpy as np
+
+from instrument import add_arguments, session, span
+from job_analytics import job_files
+from jobs_data import APP_GRADE_KEYS, iter_jobs, job_forms
+
+# Port of NutPairingConfig.kt over app/src/main/assets/nut_pairing.json,
+# plus a compiled bolt x nut matrix for checking whole inventories.
+
+NUT_PAIRING_PATH = Path('app/src/main/assets/nut_pairing.json')
+
+# PdfExporter.mapNutKey: form nutSpec text -> pairing nut key.
+APP_NUT_KEYS = {
+    'A194 2H': 'A194_2H',
+    'A194 2HM': 'A194_2HM',
+    'A194 4': 'A194_4',
+    'A194 4M': 'A194_4M',
+    'A194 7': 'A194_7',
+    'A194 7M': 'A194_7M',
+    'A194 8 (304)': 'A194_8_304',
+    'A194 8M (316)': 'A194_8M_316',
+}
+
+# PdfExporter.mapBoltSpecKey: form fastenerSpec text -> (spec, grade, class).
+APP_BOLT_KEYS = {
+    'A193 B7': ('SA-193', 'B7', None),
+    'A193 B7M': ('SA-193', 'B7M', None),
+    'A193 B16': ('SA-193', 'B16', None),
+    'A193 B8 (304)': ('SA-193', 'B8', None),
+    'A193 B8M (316)': ('SA-193', 'B8M', None),
+    'A320 L7': ('SA-320', 'L7', None),
+    'A320 L7M': ('SA-320', 'L7M', None),
+}
+
+
+def bolt_key(spec, fastener_class=''):
+    if spec == 'A453 Grade 660':
+        return ('SA-453', '660', f'Class {fastener_class}') if fastener_class.strip() else None
+    return APP_BOLT_KEYS.get(spec)
+
+
+def nut_key(nut_spec):
+    return APP_NUT_KEYS.get(nut_spec)
+
+
+def _warnings(items):
+    return [{
+        'if_nut_is': w.get('ifNutIs') or None,
+        'if_nut_not_in_recommended': bool(w.get('ifNutNotInRecommended', False)),
+        'if_bolt_is_stainless': bool(w.get('ifBoltIsStainless', False)),
+        'severity': w.get('severity', ''),
+        'message_key': w.get('messageKey', ''),
+    } for w in items or ()]
+
+
+def load_pairing(path=NUT_PAIRING_PATH):
+    # -> {'rules': {(spec, grade, class): rule}, 'messages': {key: text}}
+    with Path(path).open('r', encoding='utf-8') as f:
+        root = json.load(f)
+    rules = {}
+    for rule in root.get('pairingRules', []):
+        bolt = rule['bolt']
+        key = (bolt.get('spec', ''), bolt.get('grade', ''), bolt.get('class') or None)
+        # evaluate() takes the first matching rule, as the Kotlin firstOrNull does
+        rules.setdefault(key, {
+            'recommended': [(n.get('nut', ''), n.get('label', '')) for n in rule.get('recommendedNuts', [])],
+            'mismatch': _warnings(rule.get('mismatchWarnings')),
+            'special': _warnings(rule.get('specialWarnings')),
+            'bolt_property': _warnings(rule.get('boltPropertyWarnings')),
+        })
+    return {'rules': rules, 'messages': dict(root.get('messageCatalog', {}))}
+
+
+def evaluate(config, bolt, nut):
+    # NutPairingConfig.evaluate: None when the bolt has no rule, otherwise
+    # {'recommended', 'warnings': [(severity, message)], 'requires_ack'}.
+    if config is None or bolt is None:
+        return None
+    spec, grade, klass = bolt
+    rule = config['rules'].get((spec, grade, klass or None))
+    if rule is None:
+        return None
+    messages = config['messages']
+    mismatch = bool(nut) and nut not in {n for n, _ in rule['recommended']}
+    stainless = 'B8' in grade.upper()
+    warnings = [(w['severity'], messages.get(w['message_key'], w['message_key']))
+                for w in rule['bolt_property'] if w['if_bolt_is_stainless'] and stainless]
+    warnings += [(w['severity'], messages.get(w['message_key'], w['message_key']))
+                 for w in rule['special'] if w['if_nut_is'] is not None and w['if_nut_is'] == nut]
+    warnings += [(w['severity'], messages.get(w['message_key'], w['message_key']))
+                 for w in rule['mismatch'] if w['if_nut_not_in_recommended'] and mismatch]
+    return {
+        'recommended': rule['recommended'],
+        'warnings': warnings,
+        'requires_ack': mismatch or any(s.lower() == 'high' for s, _ in warnings),
+    }
+
+
+# Matrix cell codes; check() maps rows to CHECK_STATUSES.
+CELL_OK, CELL_WARNING, CELL_OVERRIDE, CELL_NO_RULE = range(4)
+CHECK_STATUSES = (
+    'ok', 'warning', 'violation', 'override_acknowledged', 'no_rule', 'unknown_bolt', 'unknown_nut',
+    'missing_bolt', 'missing_nut',
+)
+# Rows that pass material verification without anyone looking at them.
+PASSING = ('ok', 'warning')
+INVENTORY_COLUMNS = ('fastenerSpec', 'fastenerClass', 'nutSpec', 'nutOverrideAcknowledged')
+CHECK_COLUMNS = (
+    'source', 'record', *INVENTORY_COLUMNS, 'bolt', 'nut', 'status', 'recommended_nuts', 'messages',
+)
+A453_CLASSES = 'ABCD'
+_GRADE_LABELS = {key: label for label, key in APP_GRADE_KEYS.items()}
+
+
+class PairingMatrix:
+    # evaluate() precomputed for every bolt x nut key: cell[b, n] is a CELL_*
+    # code, recommended[b, n] marks the rule's recommended nuts and
+    # messages[b, n] the joined warning text. Nut column 0 is 'no nut'.
+    __slots__ = ('bolts', 'nuts', 'cell', 'recommended', 'messages', 'bolt_pos', 'nut_pos')
+
+    def __init__(self, bolts, nuts, cell, recommended, messages):
+        self.bolts = bolts
+        self.nuts = nuts
+        self.cell = cell
+        self.recommended = recommended
+        self.messages = messages
+        self.bolt_pos = {b: i for i, b in enumerate(bolts)}
+        self.nut_pos = {n: i for i, n in enumerate(nuts)}
+
+    def recommended_nuts(self, b):
+        return [self.nuts[n] for n in np.flatnonzero(self.recommended[b])]
+
+
+def compile_matrix(config):
+    bolts = set(config['rules']) | set(APP_BOLT_KEYS.values())
+    bolts |= {('SA-453', '660', f'Class {c}') for c in A453_CLASSES}
+    bolts = sorted(bolts, key=lambda b: (b[0], b[1], b[2] or ''))
+    nuts = set(APP_NUT_KEYS.values()) | {n for r in config['rules'].values() for n, _ in r['recommended']}
+    nuts = [''] + sorted(nuts)
+    cell = np.full((len(bolts), len(nuts)), CELL_NO_RULE, dtype=np.uint8)
+    recommended = np.zeros(cell.shape, dtype=bool)
+    messages = np.full(cell.shape, '', dtype=object)
+    for b, bolt in enumerate(bolts):
+        for n, nut in enumerate(nuts):
+            result = evaluate(config, bolt, nut)
+            if result is None:
+                continue
+            recommended[b, n] = bool(nut) and nut in {key for key, _ in result['recommended']}
+            messages[b, n] = '; '.join(f'{severity}: {text}' for severity, text in result['warnings'])
+            if result['requires_ack']:
+                cell[b, n] = CELL_OVERRIDE
+            else:
+                cell[b, n] = CELL_WARNING if result['warnings'] else CELL_OK
+    return PairingMatrix(bolts, nuts, cell, recommended, messages)
+
+
+def resolve_bolt(spec, fastener_class=''):
+    # Form text ('A193 B7', 'A453 Grade 660' + class) or a reference grade
+    # key ('A193_B7', 'A453_660_ClassB') -> pairing bolt key, else None.
+    key = bolt_key(spec, fastener_class)
+    if key is None and spec.startswith('A453_660_Class') and spec[-1:] in A453_CLASSES:
+        key = ('SA-453', '660', f'Class {spec[-1]}')
+    return key if key is not None else APP_BOLT_KEYS.get(_GRADE_LABELS.get(spec))
+
+
+def resolve_nut(nut_spec):
+    # Form text ('A194 2H') or a pairing key ('A194_2H').
+    return nut_key(nut_spec) or (nut_spec if nut_spec in APP_NUT_KEYS.values() else None)
+
+
+def _codes(values, resolve):
+    # Resolve each distinct value once; returns (keys per distinct value, codes per row).
+    names, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return [resolve(name) for name in names.tolist()], codes
+
+
+def check(matrix, specs, classes, nuts, acknowledged):
+    # Vectorized pairing check over inventory columns -> dict of row arrays
+    # ('bolt', 'nut', 'status', 'recommended_nuts', 'messages').
+    specs = np.char.strip(np.asarray(specs, dtype=str))
+    classes = np.char.strip(np.asarray(classes, dtype=str))
+    nuts = np.char.strip(np.asarray(nuts, dtype=str))
+    acknowledged = np.asarray(acknowledged, dtype=bool)
+    n = len(specs)
+
+    bolt_keys, bolt_codes = _codes(np.char.add(np.char.add(specs, '|'), classes),
+                                   lambda name: resolve_bolt(*name.split('|', 1)))
+    bolt_lut = np.array([matrix.bolt_pos.get(k, -1) for k in bolt_keys], dtype=int)
+    b = bolt_lut[bolt_codes]
+    nut_keys, nut_codes = _codes(nuts, resolve_nut)
+    nut_lut = np.array([matrix.nut_pos.get(k, -1) for k in nut_keys], dtype=int)
+    u = nut_lut[nut_codes]
+
+    known = (b >= 0) & (u >= 0)
+    cell = np.full(n, CELL_NO_RULE, dtype=np.uint8)
+    cell[known] = matrix.cell[b[known], u[known]]
+    status = np.select(
+        [specs == '', nuts == '', b < 0, u < 0, cell == CELL_NO_RULE, cell == CELL_OK, cell == CELL_WARNING,
+         acknowledged],
+        ['missing_bolt', 'missing_nut', 'unknown_bolt', 'unknown_nut', 'no_rule', 'ok', 'warning',
+         'override_acknowledged'],
+        'violation',
+    ).astype(object)
+
+    bolt_label = np.array([' '.join(p for p in k if p) if k else '' for k in bolt_keys], dtype=object)
+    nut_label = np.array([k or '' for k in nut_keys], dtype=object)
+    recommended = np.array([', '.join(matrix.recommended_nuts(i)) for i in range(len(matrix.bolts))] + [''],
+                           dtype=object)
+    messages = np.full(n, '', dtype=object)
+    messages[known] = matrix.messages[b[known], u[known]]
+    return {
+        'bolt': bolt_label[bolt_codes],
+        'nut': nut_label[nut_codes],
+        'status': status,
+        'recommended_nuts': recommended[b],  # b == -1 picks the trailing ''
+        'messages': messages,
+    }
+
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def read_inventory_csv(path):
+    # CSV with fastenerSpec and nutSpec (+ optional fastenerClass,
+    # nutOverrideAcknowledged, and an id/tag column used as the record name).
+    with Path(path).open(newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    missing = [c for c in ('fastenerSpec', 'nutSpec') if rows and c not in rows[0]]
+    if missing:
+        raise SystemExit(f'{path}: missing columns {missing}')
+    id_column = next((c for c in ('id', 'tag', 'record') if rows and c in rows[0]), None)
+    return {
+        'source': [str(path)] * len(rows),
+        'record': [r[id_column] if id_column else str(i + 2) for i, r in enumerate(rows)],
+        'fastenerSpec': [r['fastenerSpec'] or '' for r in rows],
+        'fastenerClass': [r.get('fastenerClass') or '' for r in rows],
+        'nutSpec': [r['nutSpec'] or '' for r in rows],
+        'nutOverrideAcknowledged': [_flag(r.get('nutOverrideAcknowledged', '')) for r in rows],
+    }
+
+
+def read_inventory_jobs(path):
+    out = {name: [] for name in ('source', 'record', *INVENTORY_COLUMNS)}
+    for job in iter_jobs(path):
+        for form in job_forms(job):
+            if not isinstance(form, dict):
+                continue
+            out['source'].append(str(path))
+            out['record'].append(f'{job.get("number", "")}/{form.get("id", "")}')
+            for name in ('fastenerSpec', 'fastenerClass', 'nutSpec'):
+                out[name].append(str(form.get(name) or ''))
+            out['nutOverrideAcknowledged'].append(bool(form.get('nutOverrideAcknowledged')))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check bolt/nut pairings for a whole inventory.')
+    parser.add_argument('paths', nargs='+', type=Path,
+                        help='jobs.json exports, directories searched for jobs*.json, or CSV files with '
+                             'fastenerSpec, fastenerClass, nutSpec columns')
+    parser.add_argument('--pairing', type=Path, default=NUT_PAIRING_PATH)
+    parser.add_argument('--out', type=Path, default=Path('reports') / 'Nut_Pairing_Check.csv')
+    parser.add_argument('--all', action='store_true', help='write passing rows too')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    counts = dict.fromkeys(CHECK_STATUSES, 0)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with session('nut_pairing', args.profile, args.timings), args.out.open('w', newline='', encoding='utf-8') as f:
+        with span('compile_matrix'):
+            matrix = compile_matrix(load_pairing(args.pairing))
+        writer = csv.writer(f)
+        writer.writerow(CHECK_COLUMNS)
+        for path in job_files(args.paths):
+            with span('read'):
+                rows = read_inventory_csv(path) if path.suffix.lower() == '.csv' else read_inventory_jobs(path)
+            with span('check'):
+                result = check(matrix, rows['fastenerSpec'], rows['fastenerClass'], rows['nutSpec'],
+                               rows['nutOverrideAcknowledged'])
+            rows.update(result)
+            keep = np.ones(len(result['status']), dtype=bool) if args.all else ~np.isin(result['status'], PASSING)
+            for status in CHECK_STATUSES:
+                counts[status] += int((result['status'] == status).sum())
+            with span('write'):
+                columns = [np.asarray(rows[name], dtype=object)[keep] for name in CHECK_COLUMNS]
+                writer.writerows(zip(*columns))
+
+    print(', '.join(f'{n} {status}' for status, n in counts.items() if n))
+    print('Wrote:', args.out)
+
+
+if __name__ == '__main__':
+    main()
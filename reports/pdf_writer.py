@@ -0,0 +1,196 @@
+import zlib
+from pathlib import Path
+
+# Minimal PDF 1.4 writer for the report renderers. Objects are written to the
+# file as soon as a page is finished, so memory holds one page plus the
+# object offsets, not the whole document. Only what the reports draw is
+# supported: Helvetica / Helvetica-Bold text (standard 14 fonts, not
+# embedded), lines, rectangles and prebuilt image XObjects. Coordinates are
+# top-left based like android.graphics.Canvas; text y is the baseline.
+
+FONTS = {'regular': ('F1', 'Helvetica'), 'bold': ('F2', 'Helvetica-Bold')}
+
+# AFM advance widths (1/1000 em) for ' '..'~'; other characters use 556.
+_WIDTHS = {
+    'regular': (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+        556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556, 1015, 667, 667, 722, 722, 667, 611, 778,
+        722, 278, 500, 667, 556, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278,
+        278, 278, 469, 556, 333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    'bold': (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278, 556, 556, 556, 556,
+        556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611, 975, 722, 722, 722, 722, 667, 611, 778,
+        722, 278, 556, 722, 611, 833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333,
+        278, 333, 584, 556, 333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+}
+
+
+def text_width(text, size, font='regular'):
+    widths = _WIDTHS[font]
+    return sum(widths[o - 32] if 32 <= (o := ord(c)) <= 126 else 556 for c in text) * size / 1000.0
+
+
+def fit_text(text, size, font, max_width):
+    # PdfExporter.fitText: trim and append '...' until it fits.
+    if text_width(text, size, font) <= max_width:
+        return text
+    for end in range(len(text), 0, -1):
+        candidate = text[:end].rstrip() + '...'
+        if text_width(candidate, size, font) <= max_width:
+            return candidate
+    return text[:1] + '...'
+
+
+def wrap_text(text, size, font, max_width):
+    # PdfExporter.wrapText: greedy word wrap on single spaces.
+    lines, current = [], ''
+    for word in text.split(' '):
+        candidate = word if not current.strip() else f'{current} {word}'
+        if text_width(candidate, size, font) <= max_width:
+            current = candidate
+        else:
+            if current.strip():
+                lines.append(current)
+            current = word
+    if current.strip():
+        lines.append(current)
+    return lines
+
+
+def _pdf_string(text):
+    raw = text.encode('cp1252', errors='replace')
+    return b'(' + raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _num(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+class Page:
+    __slots__ = ('width', 'height', '_ops', 'images')
+
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self._ops = []
+        self.images = {}
+
+    def _y(self, y):
+        return self.height - y
+
+    def text(self, x, y, text, size, font='regular'):
+        name = FONTS[font][0]
+        self._ops.append(b'BT /%s %s Tf %s %s Td %s Tj ET' % (
+            name.encode(), _num(size).encode(), _num(x).encode(), _num(self._y(y)).encode(), _pdf_string(text)))
+
+    def line(self, x1, y1, x2, y2, width=1, gray=0):
+        self._ops.append(f'{_num(gray)} G {_num(width)} w {_num(x1)} {_num(self._y(y1))} m '
+                         f'{_num(x2)} {_num(self._y(y2))} l S'.encode())
+
+    def rect(self, left, top, right, bottom, width=1, gray=0):
+        self._ops.append(f'{_num(gray)} G {_num(width)} w {_num(left)} {_num(self._y(bottom))} '
+                         f'{_num(right - left)} {_num(bottom - top)} re S'.encode())
+
+    def image(self, obj, left, top, right, bottom):
+        # Stretched to fill the rectangle, like Canvas.drawBitmap(bitmap, null, dst, null).
+        name = self.images.setdefault(obj, f'Im{obj}')
+        self._ops.append(f'q {_num(right - left)} 0 0 {_num(bottom - top)} {_num(left)} {_num(self._y(bottom))} cm '
+                         f'/{name} Do Q'.encode())
+
+    def content(self):
+        return b'\n'.join(self._ops)
+
+
+class PdfWriter:
+    __slots__ = ('path', '_f', '_offsets', '_pages', '_images', 'width', 'height')
+
+    # Objects 1-4 are reserved for the catalog, page tree and the two fonts;
+    # they are written in close() once the page list is known.
+    _CATALOG, _PAGES, _FONT1, _FONT2 = 1, 2, 3, 4
+
+    def __init__(self, path, width=612, height=792):
+        self.path = Path(path)
+        self.width, self.height = width, height
+        self._f = self.path.open('wb')
+        self._f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._offsets = {}
+        self._pages = []
+        self._images = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+            self.path.unlink(missing_ok=True)
+
+    def _next_id(self):
+        return max(self._offsets, default=self._FONT2) + 1
+
+    def _write(self, body, num=None):
+        num = num if num is not None else self._next_id()
+        self._offsets[num] = self._f.tell()
+        self._f.write(b'%d 0 obj\n' % num + body + b'\nendobj\n')
+        return num
+
+    def _stream(self, data):
+        data = zlib.compress(data)
+        return b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(data) + data + b'\nendstream'
+
+    def image(self, key, build):
+        # Writes an image XObject once per document; `build()` returns its
+        # complete object body (dictionary + stream) and is only called for
+        # keys not seen before in this file.
+        obj = self._images.get(key)
+        if obj is None:
+            obj = self._images[key] = self._write(build())
+        return obj
+
+    def new_page(self):
+        return Page(self.width, self.height)
+
+    def add_page(self, page):
+        content = self._write(self._stream(page.content()))
+        xobjects = b''.join(b'/%s %d 0 R ' % (name.encode(), obj) for obj, name in page.images.items())
+        resources = b'/Font << /F1 %d 0 R /F2 %d 0 R >>' % (self._FONT1, self._FONT2)
+        if xobjects:
+            resources += b' /XObject << ' + xobjects + b'>>'
+        self._pages.append(self._write(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources << %s >> /Contents %d 0 R >>'
+            % (self._PAGES, self.width, self.height, resources, content)))
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def close(self):
+        for num, (_, base) in zip((self._FONT1, self._FONT2), FONTS.values()):
+            self._write(b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>'
+                        % base.encode(), num)
+        kids = b' '.join(b'%d 0 R' % p for p in self._pages)
+        self._write(b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._pages)), self._PAGES)
+        self._write(b'<< /Type /Catalog /Pages %d 0 R >>' % self._PAGES, self._CATALOG)
+        size = max(self._offsets) + 1
+        xref = self._f.tell()
+        self._f.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        for num in range(1, size):
+            self._f.write(b'%010d 00000 n \n' % self._offsets.get(num, 0))
+        self._f.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (size, self._CATALOG, xref))
+        self._f.close()
+
+
+def image_object(width, height, color_space, data, jpeg=False):
+    # Object body for an 8-bit image XObject: JPEG bytes pass through as
+    # DCTDecode, raw samples are Flate-compressed.
+    head = b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /%s /BitsPerComponent 8' % (
+        width, height, color_space.encode())
+    if jpeg:
+        return head + b' /Filter /DCTDecode /Length %d >>\nstream\n' % len(data) + data + b'\nendstream'
+    data = zlib.compress(data)
+    return head + b' /Filter /FlateDecode /Length %d >>\nstream\n' % len(data) + data + b'\nendstream'
@@ -0,0 +1,103 @@
+from bisect import bisect_left
+
+from reference_data import load_reference
+
+
+class IntervalIndex:
+    # Piecewise-constant lookup over closed [lo, hi] intervals. Every distinct
+    # endpoint becomes a breakpoint; the answer is resolved once at each
+    # breakpoint and once for each open gap between breakpoints (in_gap[0] is
+    # below the first point, in_gap[-1] above the last), so a query is a
+    # single bisect instead of a scan.
+    __slots__ = ('points', 'at_point', 'in_gap')
+
+    def __init__(self, intervals, resolve):
+        points = sorted({p for lo, hi in intervals for p in (lo, hi)})
+        self.points = points
+        self.at_point = [resolve(p) for p in points]
+        if points:
+            mids = [points[0] - 1.0]
+            mids += [(a + b) / 2.0 for a, b in zip(points, points[1:])]
+            mids.append(points[-1] + 1.0)
+        else:
+            mids = [0.0]
+        self.in_gap = [resolve(m) for m in mids]
+
+    def lookup(self, x):
+        i = bisect_left(self.points, x)
+        if i < len(self.points) and self.points[i] == x:
+            return self.at_point[i]
+        return self.in_gap[i]
+
+
+def _temp_index(temps):
+    # Same rule as the reports: a band containing the temperature wins,
+    # otherwise round up to the band with the lowest tMax at or above it.
+    def resolve(temp):
+        for t in temps:
+            if t.tmin <= temp <= t.tmax:
+                return t.s, t.tmax
+        best = None
+        for t in temps:
+            if t.tmax >= temp and (best is None or t.tmax < best.tmax):
+                best = t
+        return (best.s, best.tmax) if best is not None else None
+
+    return IntervalIndex([(t.tmin, t.tmax) for t in temps], resolve)
+
+
+def _dia_index(ranges, value):
+    # Each slot holds every matching range in file order so overlapping
+    # bands keep first-match semantics.
+    def resolve(dia):
+        return tuple(value(r) for r in ranges if r.contains(dia))
+
+    return IntervalIndex([(r.dia_min, r.dia_max) for r in ranges], resolve)
+
+
+class StrengthIndex:
+    __slots__ = ('digest', 'sy', 'allowable')
+
+    def __init__(self, ref):
+        self.digest = ref.digest
+        self.sy = {g: _dia_index(rs, lambda r: r.sy) for g, rs in ref.strength.items()}
+        self.allowable = {g: _dia_index(rs, lambda r: _temp_index(r.temps)) for g, rs in ref.allowable.items()}
+
+    def lookup_sy(self, grade, dia):
+        index = self.sy.get(grade)
+        if index is None:
+            return None
+        matches = index.lookup(dia)
+        if not matches:
+            return None
+        sy = matches[0]
+        return sy if isinstance(sy, (int, float)) else None
+
+    def lookup_allowable(self, grade, dia, temp):
+        index = self.allowable.get(grade)
+        if index is None:
+            return None, None
+        for temp_index in index.lookup(dia):
+            hit = temp_index.lookup(temp)
+            if hit is not None:
+                return hit
+        return None, None
+
+    def lookup_strength(self, grade, dia, temp):
+        # Allowable stress at temperature when a band covers it, else room-temp
+        # Sy. A PLACEHOLDER allowable is not computable (None), like the app.
+        allow_s, used_temp = self.lookup_allowable(grade, dia, temp)
+        if used_temp is not None:
+            return (allow_s if isinstance(allow_s, (int, float)) else None), used_temp
+        return self.lookup_sy(grade, dia), None
+
+
+_indexes = {}
+
+
+def load_index(ref=None):
+    ref = ref if ref is not None else load_reference()
+    index = _indexes.get(ref.digest)
+    if index is None:
+        index = _indexes[ref.digest] = StrengthIndex(ref)
+    return index
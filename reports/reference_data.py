@@ -0,0 +1,238 @@
+import hashlib, json, pickle
+from pathlib import Path
+
+from instrument import count, span
+
+REFERENCE_PATH = Path('app/src/main/assets/flange_reference.json')
+CACHE_DIR = Path('reports') / '.cache'
+# Bump when the record classes below change shape so stale pickles are ignored.
+CACHE_VERSION = 2
+
+
+class StrengthRange:
+    __slots__ = ('dia_min', 'dia_max', 'sy', 'su')
+
+    def __init__(self, dia_min, dia_max, sy, su):
+        self.dia_min = dia_min
+        self.dia_max = dia_max
+        self.sy = sy
+        self.su = su
+
+    def contains(self, dia):
+        return self.dia_min <= dia <= self.dia_max
+
+
+class TempBand:
+    __slots__ = ('tmin', 'tmax', 's')
+
+    def __init__(self, tmin, tmax, s):
+        self.tmin = tmin
+        self.tmax = tmax
+        self.s = s
+
+
+class AllowableRange:
+    __slots__ = ('dia_min', 'dia_max', 'temps')
+
+    def __init__(self, dia_min, dia_max, temps):
+        self.dia_min = dia_min
+        self.dia_max = dia_max
+        self.temps = temps
+
+    def contains(self, dia):
+        return self.dia_min <= dia <= self.dia_max
+
+
+class GasketType:
+    __slots__ = (
+        'id', 'label', 'category', 'allow_calculated_torque', 'target_method',
+        'pct_default', 'pct_allowed', 'specified_torque_required',
+        'warnings', 'retorque_recommended', 'retorque_timing',
+    )
+
+    def __init__(self, id, label, category, allow_calculated_torque, target_method,
+                 pct_default, pct_allowed, specified_torque_required,
+                 warnings, retorque_recommended, retorque_timing):
+        self.id = id
+        self.label = label
+        self.category = category
+        self.allow_calculated_torque = allow_calculated_torque
+        self.target_method = target_method
+        self.pct_default = pct_default
+        self.pct_allowed = pct_allowed
+        self.specified_torque_required = specified_torque_required
+        self.warnings = warnings
+        self.retorque_recommended = retorque_recommended
+        self.retorque_timing = retorque_timing
+
+
+class Reference:
+    __slots__ = (
+        'version', 'digest', 'diameter_options', 'diameter_in', 'thread_series',
+        'tpi', 'tensile_area', 'grades', 'strength', 'allowable', 'nut_grades',
+        'gasket_types', 'pass_logic', 'sequences', 'fingerprints',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+
+def parse_diameter(value):
+    if '-' in value and '/' in value:
+        whole, frac = value.split('-')
+        num, den = frac.split('/')
+        return float(whole) + float(num) / float(den)
+    if '/' in value:
+        num, den = value.split('/')
+        return float(num) / float(den)
+    return float(value)
+
+
+def is_placeholder(value):
+    return isinstance(value, str) and 'PLACEHOLDER' in value
+
+
+def _fingerprint(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def subtree_fingerprints(root):
+    # Short content hashes of the parts of the JSON each report depends on,
+    # keyed like 'strength/A193_B7', so callers can tell exactly what changed.
+    fasteners = root['fasteners']
+    bolt_grades = fasteners['boltGrades']
+    out = {
+        'grades': _fingerprint(bolt_grades.get('options', [])),
+        'diameters': _fingerprint(fasteners.get('diameterOptions_in', [])),
+        'thread_series': _fingerprint(fasteners.get('threadSeriesOptions', [])),
+        'tpi': _fingerprint(fasteners.get('tpi_lookup', {})),
+        'tensile_area': _fingerprint(fasteners.get('tensileStressArea_As_in2_lookup', {})),
+        'nuts': _fingerprint(fasteners.get('nutGrades', {})),
+        'gaskets': _fingerprint(root.get('gasket_logic', {})),
+        'pass_logic': _fingerprint(root.get('torque_calculation', {})),
+        'sequences': _fingerprint(root.get('tightening', {})),
+    }
+    for grade, ranges in bolt_grades.get('strength_Sy_Su_min_ksi', {}).items():
+        out['strength/' + grade] = _fingerprint(ranges)
+    for grade, ranges in bolt_grades.get('allowableStress_S_ksi_atTemp', {}).items():
+        out['allowable/' + grade] = _fingerprint(ranges)
+    return out
+
+
+def _strength_ranges(raw):
+    return [
+        StrengthRange(r.get('diaMin_in', 0.0), r.get('diaMax_in', 0.0), r.get('Sy'), r.get('Su'))
+        for r in raw
+    ]
+
+
+def _allowable_ranges(raw):
+    return [
+        AllowableRange(
+            r.get('diaMin_in', 0.0),
+            r.get('diaMax_in', 0.0),
+            [TempBand(t.get('tMin'), t.get('tMax'), t.get('S')) for t in r.get('temps', [])],
+        )
+        for r in raw
+    ]
+
+
+def _gasket_type(raw):
+    defaults = raw.get('defaults', {})
+    retorque = raw.get('retorque', {})
+    return GasketType(
+        raw.get('id'),
+        raw.get('label'),
+        raw.get('category'),
+        raw.get('allowCalculatedTorque', True),
+        raw.get('target_method'),
+        defaults.get('boltStressPctYield_default'),
+        tuple(defaults.get('boltStressPctYield_allowed', ())),
+        defaults.get('specifiedTargetTorque_required', False),
+        tuple(raw.get('warnings', ())),
+        retorque.get('recommended'),
+        retorque.get('timing'),
+    )
+
+
+def build_reference(data, digest=''):
+    root = data['flange_helper_reference_data']
+    fasteners = root['fasteners']
+    bolt_grades = fasteners['boltGrades']
+    diameter_options = list(fasteners.get('diameterOptions_in', []))
+    sequences = root.get('tightening', {}).get('sequenceLookup', {}).get('sequenceByBoltCount', {})
+    return Reference(
+        version=root.get('version'),
+        digest=digest,
+        diameter_options=diameter_options,
+        diameter_in={d: parse_diameter(d) for d in diameter_options},
+        thread_series=list(fasteners.get('threadSeriesOptions', [])),
+        tpi=fasteners['tpi_lookup'],
+        tensile_area=fasteners['tensileStressArea_As_in2_lookup'],
+        grades=list(bolt_grades.get('options', [])),
+        strength={g: _strength_ranges(rs) for g, rs in bolt_grades.get('strength_Sy_Su_min_ksi', {}).items()},
+        allowable={g: _allowable_ranges(rs) for g, rs in bolt_grades.get('allowableStress_S_ksi_atTemp', {}).items()},
+        nut_grades=list(fasteners.get('nutGrades', {}).get('options', [])),
+        gasket_types=[_gasket_type(g) for g in root.get('gasket_logic', {}).get('gasket_types', [])],
+        pass_logic=root.get('torque_calculation', {}).get('pass_logic', {}),
+        sequences={int(k): v for k, v in sequences.items()},
+        fingerprints=subtree_fingerprints(root),
+    )
+
+
+def _cache_path(path):
+    return CACHE_DIR / (Path(path).stem + '.pickle')
+
+
+def _read_cache(cache_path, digest):
+    try:
+        with cache_path.open('rb') as f:
+            version, cached_digest, ref = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION or cached_digest != digest:
+        return None
+    return ref
+
+
+def _write_cache(cache_path, ref):
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix('.tmp')
+        with tmp.open('wb') as f:
+            pickle.dump((CACHE_VERSION, ref.digest, ref), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(cache_path)
+    except OSError:
+        pass
+
+
+_loaded = {}
+
+
+def load_reference(path=REFERENCE_PATH, use_cache=True):
+    path = Path(path)
+    with span('load_reference'):
+        with span('read'):
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+
+        key = str(path.resolve())
+        ref = _loaded.get(key)
+        if ref is not None and ref.digest == digest:
+            count('reference_memo_hits')
+            return ref
+
+        cache_path = _cache_path(path)
+        with span('cache_read'):
+            ref = _read_cache(cache_path, digest) if use_cache else None
+        if ref is None:
+            count('reference_parses')
+            with span('parse_json'):
+                data = json.loads(raw.decode('utf-8'))
+            with span('build_reference'):
+                ref = build_reference(data, digest)
+            if use_cache:
+                _write_cache(cache_path, ref)
+        _loaded[key] = ref
+        return ref
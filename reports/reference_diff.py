@@ -0,0 +1,471 @@
+import argparse, csv, hashlib, json, os
+from pathlib import Path
+
+import numpy as np
+
+from instrument import add_arguments, count, session, span
+from job_analytics import expected_torque, form_inputs, job_files
+from jobs_data import iter_jobs, job_forms
+from reference_data import CACHE_DIR, REFERENCE_PATH, load_reference
+from torque_book import cells
+from torque_engine import compute_torque, factorial_axes, factorial_shape, lookup_strength, thread_table
+
+# Structural diff of two flange_reference.json versions (per grade, diameter
+# band and temperature band rather than text) and its impact: only the torque
+# book cells whose strength or thread data differ are recomputed, and only the
+# historical forms on an affected grade/diameter or thread are re-evaluated,
+# found through a per-file form index cached in reports/.cache/form_index.
+
+INDEX_VERSION = 2
+INDEX_DIR = CACHE_DIR / 'form_index'
+OUT_DIR = Path('reports') / 'reference_impact'
+
+# Subtrees diffed only by fingerprint; they feed pass torques, gasket
+# windows, nut checks and sequences rather than target torque.
+OTHER_SUBTREES = ('gaskets', 'pass_logic', 'nuts', 'sequences')
+
+CHANGE_COLUMNS = ('section', 'key', 'dia_min_in', 'dia_max_in', 'tmin_F', 'tmax_F', 'field', 'change', 'old', 'new')
+CELL_COLUMNS = (
+    'book_row', 'grade', 'diameter_in', 'thread_series', 'working_temp_F', 'pct_yield', 'lube', 'K',
+    'old_used_temp_F', 'new_used_temp_F', 'old_strength_ksi', 'new_strength_ksi',
+    'old_torque_ftlb', 'new_torque_ftlb', 'delta_ftlb', 'delta_pct',
+)
+FORM_COLUMNS = (
+    'source', 'job_number', 'form_id', 'grade', 'diameter', 'thread_series', 'working_temp_F', 'basis_temp_F',
+    'method',
+    'recorded_ftlb', 'old_expected_ftlb', 'new_expected_ftlb', 'delta_ftlb', 'delta_pct',
+)
+
+
+def _change(section, key, field, change, old=None, new=None, dia=(None, None), temp=(None, None)):
+    return {'section': section, 'key': key, 'dia_min_in': dia[0], 'dia_max_in': dia[1],
+            'tmin_F': temp[0], 'tmax_F': temp[1], 'field': field, 'change': change, 'old': old, 'new': new}
+
+
+def _keyed(items, key):
+    # first entry per key wins, like the first-match range lookups
+    out = {}
+    for item in items:
+        out.setdefault(key(item), item)
+    return out
+
+
+def _diff_values(section, key, old, new, field, **where):
+    if old is None and new is None:
+        return []
+    if old is None:
+        return [_change(section, key, field, 'added', new=new, **where)]
+    if new is None:
+        return [_change(section, key, field, 'removed', old=old, **where)]
+    return [_change(section, key, field, 'changed', old, new, **where)] if old != new else []
+
+
+def _diff_strength(grade, old, new):
+    old = _keyed(old, lambda r: (r.dia_min, r.dia_max))
+    new = _keyed(new, lambda r: (r.dia_min, r.dia_max))
+    out = []
+    for dia in sorted(set(old) | set(new)):
+        o, n = old.get(dia), new.get(dia)
+        if o is None or n is None:
+            out.append(_change('strength', grade, 'band', 'added' if o is None else 'removed', dia=dia))
+            continue
+        out += _diff_values('strength', grade, o.sy, n.sy, 'Sy', dia=dia)
+        out += _diff_values('strength', grade, o.su, n.su, 'Su', dia=dia)
+    return out
+
+
+def _diff_allowable(grade, old, new):
+    old = _keyed(old, lambda r: (r.dia_min, r.dia_max))
+    new = _keyed(new, lambda r: (r.dia_min, r.dia_max))
+    out = []
+    for dia in sorted(set(old) | set(new)):
+        o, n = old.get(dia), new.get(dia)
+        if o is None or n is None:
+            out.append(_change('allowable', grade, 'band', 'added' if o is None else 'removed', dia=dia))
+            continue
+        o_temps = _keyed(o.temps, lambda t: (t.tmin, t.tmax))
+        n_temps = _keyed(n.temps, lambda t: (t.tmin, t.tmax))
+        for temp in sorted(set(o_temps) | set(n_temps), key=lambda t: tuple(-np.inf if v is None else v for v in t)):
+            old_s = o_temps[temp].s if temp in o_temps else None
+            new_s = n_temps[temp].s if temp in n_temps else None
+            if temp not in o_temps or temp not in n_temps:
+                out.append(_change('allowable', grade, 'S', 'added' if temp not in o_temps else 'removed',
+                                   old_s, new_s, dia=dia, temp=temp))
+            else:
+                out += _diff_values('allowable', grade, old_s, new_s, 'S', dia=dia, temp=temp)
+    return out
+
+
+def _diff_lookup(section, old, new):
+    out = []
+    for series in sorted(set(old) | set(new)):
+        o, n = old.get(series, {}), new.get(series, {})
+        for dia in sorted(set(o) | set(n)):
+            out += _diff_values(section, f'{series} {dia}', o.get(dia), n.get(dia), section)
+    return out
+
+
+def diff_references(old, new):
+    # -> list of change dicts (CHANGE_COLUMNS). Grades are compared only where
+    # their subtree fingerprints differ.
+    changes = []
+    for grade in sorted(set(old.grades) | set(new.grades)):
+        if grade not in old.grades or grade not in new.grades:
+            changes.append(_change('grades', grade, 'grade', 'added' if grade not in old.grades else 'removed'))
+    for grade in sorted(set(old.strength) | set(new.strength)):
+        if old.fingerprints.get('strength/' + grade) != new.fingerprints.get('strength/' + grade):
+            changes += _diff_strength(grade, old.strength.get(grade, []), new.strength.get(grade, []))
+    for grade in sorted(set(old.allowable) | set(new.allowable)):
+        if old.fingerprints.get('allowable/' + grade) != new.fingerprints.get('allowable/' + grade):
+            changes += _diff_allowable(grade, old.allowable.get(grade, []), new.allowable.get(grade, []))
+    for dia in sorted(set(old.diameter_in) | set(new.diameter_in), key=lambda d: new.diameter_in.get(d, old.diameter_in.get(d))):
+        changes += _diff_values('diameters', dia, old.diameter_in.get(dia), new.diameter_in.get(dia), 'diameter_in')
+    if old.fingerprints['tpi'] != new.fingerprints['tpi']:
+        changes += _diff_lookup('tpi', old.tpi, new.tpi)
+    if old.fingerprints['tensile_area'] != new.fingerprints['tensile_area']:
+        changes += _diff_lookup('tensile_area', old.tensile_area, new.tensile_area)
+    for name in OTHER_SUBTREES:
+        if old.fingerprints.get(name) != new.fingerprints.get(name):
+            changes.append(_change(name, name, '(subtree)', 'changed'))
+    return changes
+
+
+def _thread_values(ref, series, dia):
+    return (*thread_table(ref, series, dia), ref.diameter_in.get(dia, np.nan))
+
+
+def _differs(a, b):
+    # NaN-aware inequality
+    return ~((a == b) | (np.isnan(a) & np.isnan(b)))
+
+
+def affected_pairs(changes, old, new):
+    # (grades with every diameter affected, {(grade, diameter key)}) from the
+    # strength/allowable changes: a diameter is affected when a changed band
+    # covers it in either version.
+    whole = {c['key'] for c in changes if c['section'] == 'grades'}
+    pairs = set()
+    for c in changes:
+        if c['section'] not in ('strength', 'allowable'):
+            continue
+        lo, hi = c['dia_min_in'], c['dia_max_in']
+        for ref in (old, new):
+            pairs.update((c['key'], d) for d, v in ref.diameter_in.items() if lo <= v <= hi)
+    return whole, pairs
+
+
+def affected_threads(old, new, threads):
+    # (series, diameter key) pairs whose TPI, As or diameter value differ.
+    out = set()
+    for series, dia in threads:
+        o = np.array(_thread_values(old, series, dia))
+        n = np.array(_thread_values(new, series, dia))
+        if _differs(o, n).any():
+            out.add((series, dia))
+    return out
+
+
+def affected_cells(old, new, changes, axes=None):
+    # Recomputes only the torque book rows (new reference axes) whose strength
+    # lookup or thread data differ between the versions. Returns CELL_COLUMNS
+    # arrays plus a summary of the axes the two books do not share.
+    axes = axes if axes is not None else factorial_axes(new)
+    old_axes = factorial_axes(old)
+    threads = [tuple(t) for t in axes['thread'].tolist()]
+    whole, pairs = affected_pairs(changes, old, new)
+    thread_changed = affected_threads(old, new, threads)
+
+    gi, ti = [], []
+    for g, grade in enumerate(axes['grade'].tolist()):
+        for t, (series, dia) in enumerate(threads):
+            if grade in whole or (grade, dia) in pairs or (series, dia) in thread_changed:
+                gi.append(g)
+                ti.append(t)
+    count('candidate_pairs', len(gi))
+    temps = axes['temp']
+    gi = np.repeat(np.array(gi, dtype=int), len(temps))
+    ti = np.repeat(np.array(ti, dtype=int), len(temps))
+    tempi = np.tile(np.arange(len(temps)), len(gi) // max(len(temps), 1))
+    grade = axes['grade'][gi]
+    dia = axes['thread'][ti, 1]
+    series = axes['thread'][ti, 0]
+
+    # strength depends on grade x diameter x temperature only, so compare
+    # there before expanding over pct yield and lube
+    with span('strength_diff'):
+        old_s, old_used = lookup_strength(grade, dia, temps[tempi], old)
+        new_s, new_used = lookup_strength(grade, dia, temps[tempi], new)
+        thread_hit = np.array([(s, d) in thread_changed for s, d in zip(series.tolist(), dia.tolist())], dtype=bool)
+        keep = _differs(old_s, new_s) | _differs(old_used, new_used) | thread_hit
+    rows = {'gi': gi, 'ti': ti, 'tempi': tempi, 'old_s': old_s, 'new_s': new_s, 'old_used': old_used,
+            'new_used': new_used}
+    rows = {name: values[keep] for name, values in rows.items()}
+
+    n_pl = len(axes['pct']) * len(axes['lube'])
+    rows = {name: np.repeat(values, n_pl) for name, values in rows.items()}
+    rows['pi'] = np.tile(np.repeat(np.arange(len(axes['pct'])), len(axes['lube'])), int(keep.sum()))
+    rows['li'] = np.tile(np.arange(len(axes['lube'])), int(keep.sum()) * len(axes['pct']))
+    count('candidate_cells', len(rows['gi']))
+
+    with span('torque_recompute'):
+        # the strengths are already looked up; hand them to compute_torque as is
+        inputs = (axes['grade'][rows['gi']], axes['thread'][rows['ti'], 1], axes['thread'][rows['ti'], 0],
+                  temps[rows['tempi']], axes['pct'][rows['pi']], axes['K'][rows['li']])
+        rows['old_t'] = compute_torque(*inputs, old, lookup=lambda *_: (rows['old_s'], rows['old_used']))[
+            'target_torque_ftlb']
+        rows['new_t'] = compute_torque(*inputs, new, lookup=lambda *_: (rows['new_s'], rows['new_used']))[
+            'target_torque_ftlb']
+    # candidates whose torque is the same (e.g. not computable in either) drop out
+    changed = _differs(rows['old_t'], rows['new_t'])
+    r = {name: values[changed] for name, values in rows.items()}
+    count('changed_cells', len(r['gi']))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = r['new_t'] - r['old_t']
+        delta_pct = np.where(r['old_t'] > 0, delta / r['old_t'] * 100.0, np.nan)
+
+    index = (r['gi'], r['ti'], r['tempi'], r['pi'], r['li'])
+    out = {
+        'book_row': np.ravel_multi_index(index, factorial_shape(axes)) if len(r['gi']) else r['gi'],
+        'grade': axes['grade'][r['gi']],
+        'diameter_in': axes['thread'][r['ti'], 1],
+        'thread_series': axes['thread'][r['ti'], 0],
+        'working_temp_F': temps[r['tempi']],
+        'pct_yield': axes['pct'][r['pi']],
+        'lube': axes['lube'][r['li']],
+        'K': axes['K'][r['li']],
+        'old_used_temp_F': r['old_used'],
+        'new_used_temp_F': r['new_used'],
+        'old_strength_ksi': r['old_s'],
+        'new_strength_ksi': r['new_s'],
+        'old_torque_ftlb': r['old_t'],
+        'new_torque_ftlb': r['new_t'],
+        'delta_ftlb': delta,
+        'delta_pct': delta_pct,
+    }
+    axes_changes = {
+        name: (sorted(set(_axis(old_axes, name)) - set(_axis(axes, name))),
+               sorted(set(_axis(axes, name)) - set(_axis(old_axes, name))))
+        for name in ('grade', 'thread', 'temp', 'pct', 'lube')
+    }
+    return out, {name: v for name, v in axes_changes.items() if v[0] or v[1]}
+
+
+def _axis(axes, name):
+    values = axes[name].tolist()
+    return [tuple(v) for v in values] if name == 'thread' else values
+
+
+class FormIndex:
+    # The form inputs of one jobs.json as columns, sorted by grade|diameter so
+    # the forms on a grade/diameter pair are a contiguous slice (starts/ends).
+    __slots__ = ('source', 'pair', 'job_number', 'form_id', 'grade', 'diameter', 'thread_series',
+                 'working_temp_F', 'basis_temp_F', 'method', 'pct_yield', 'bolt_load', 'K', 'recorded_ftlb')
+
+    def __init__(self, **columns):
+        for name in self.__slots__:
+            setattr(self, name, columns[name])
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __len__(self):
+        return len(self.pair)
+
+    def candidates(self, whole, pairs, threads):
+        # Row numbers of forms on an affected grade, grade/diameter pair or
+        # thread; forms on a specified torque never change.
+        keys = [f'{g}|{d}' for g, d in sorted(pairs)]
+        hit = np.zeros(len(self), dtype=bool)
+        for lo, hi in zip(np.searchsorted(self.pair, keys, 'left'), np.searchsorted(self.pair, keys, 'right')):
+            hit[lo:hi] = True
+        hit |= np.isin(self.grade, list(whole))
+        if threads:
+            keys = np.char.add(np.char.add(self.thread_series, '|'), self.diameter)
+            hit |= np.isin(keys, [f'{s}|{d}' for s, d in threads])
+        return np.flatnonzero(hit & (self.method != 'SPECIFIED_TORQUE'))
+
+    def inputs(self, rows):
+        # rows -> form_inputs()-style dicts for job_analytics.expected_torque
+        return [
+            {'grade': self.grade[i], 'diameter': self.diameter[i], 'thread_series': self.thread_series[i],
+             'working_temp_F': float(self.working_temp_F[i]), 'basis_temp_F': float(self.basis_temp_F[i]),
+             'method': self.method[i],
+             'pct_yield': float(self.pct_yield[i]),
+             'bolt_load': None if np.isnan(self.bolt_load[i]) else float(self.bolt_load[i]),
+             'K': None if np.isnan(self.K[i]) else float(self.K[i])}
+            for i in rows.tolist()
+        ]
+
+
+def build_form_index(path):
+    rows = []
+    for job in iter_jobs(path):
+        for form in job_forms(job):
+            if isinstance(form, dict):
+                rows.append((str(job.get('number', '')), str(form.get('id', '')), form_inputs(form)))
+    number = lambda v: v if v is not None else np.nan
+    grade = np.array([i['grade'] or '' for _, _, i in rows], dtype=str)
+    diameter = np.array([i['diameter'] for _, _, i in rows], dtype=str)
+    pair = np.char.add(np.char.add(grade, '|'), diameter)
+    order = np.argsort(pair, kind='stable')
+    columns = {
+        'source': np.full(len(rows), str(path)),
+        'pair': pair,
+        'job_number': np.array([r[0] for r in rows], dtype=str),
+        'form_id': np.array([r[1] for r in rows], dtype=str),
+        'grade': grade,
+        'diameter': diameter,
+        'thread_series': np.array([str(i['thread_series']) for _, _, i in rows], dtype=str),
+        'working_temp_F': np.array([i['working_temp_F'] for _, _, i in rows], dtype=float),
+        'basis_temp_F': np.array([i['basis_temp_F'] for _, _, i in rows], dtype=float),
+        'method': np.array([i['method'] for _, _, i in rows], dtype=str),
+        'pct_yield': np.array([i['pct_yield'] for _, _, i in rows], dtype=float),
+        'bolt_load': np.array([number(i['bolt_load']) for _, _, i in rows], dtype=float),
+        'K': np.array([number(i['K']) for _, _, i in rows], dtype=float),
+        'recorded_ftlb': np.array([number(i['recorded_ftlb']) for _, _, i in rows], dtype=float),
+    }
+    return FormIndex(**{name: values[order] for name, values in columns.items()})
+
+
+def form_index_key(path):
+    st = os.stat(path)
+    payload = json.dumps([INDEX_VERSION, str(Path(path).resolve()), st.st_size, st.st_mtime_ns])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_form_index(path, use_cache=True):
+    # Rebuilt when the jobs.json changes size or mtime.
+    cache = INDEX_DIR / (form_index_key(path) + '.npz')
+    if use_cache:
+        try:
+            with np.load(cache) as data:
+                return FormIndex(**{name: data[name] for name in data.files})
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+    with span('build_form_index'):
+        index = build_form_index(path)
+    if use_cache:
+        try:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache.with_name(cache.stem + '.tmp.npz')
+            np.savez(tmp, **index.arrays())
+            tmp.replace(cache)
+        except OSError:
+            pass
+    return index
+
+
+def affected_forms(index, old, new, whole, pairs, threads):
+    rows = index.candidates(whole, pairs, threads)
+    count('candidate_forms', len(rows))
+    inputs = index.inputs(rows)
+    old_t = expected_torque(inputs, old) if len(rows) else np.empty(0)
+    new_t = expected_torque(inputs, new) if len(rows) else np.empty(0)
+    keep = _differs(old_t, new_t)
+    rows, old_t, new_t = rows[keep], old_t[keep], new_t[keep]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = new_t - old_t
+        delta_pct = np.where(old_t > 0, delta / old_t * 100.0, np.nan)
+    return {
+        'source': index.source[rows],
+        'job_number': index.job_number[rows],
+        'form_id': index.form_id[rows],
+        'grade': index.grade[rows],
+        'diameter': index.diameter[rows],
+        'thread_series': index.thread_series[rows],
+        'working_temp_F': index.working_temp_F[rows],
+        'basis_temp_F': index.basis_temp_F[rows],
+        'method': index.method[rows],
+        'recorded_ftlb': index.recorded_ftlb[rows],
+        'old_expected_ftlb': np.round(old_t, 1),
+        'new_expected_ftlb': np.round(new_t, 1),
+        'delta_ftlb': np.round(delta, 1),
+        'delta_pct': np.round(delta_pct, 2),
+    }
+
+
+def _write_columns(path, names, columns):
+    with Path(path).open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        # old/new_used_temp_F print like used_temp_F
+        writer.writerows(zip(*(cells(name[4:] if name.endswith('used_temp_F') else name, np.asarray(columns[name]))
+                               for name in names)))
+
+
+def _write_changes(path, changes):
+    with Path(path).open('w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, CHANGE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(changes)
+
+
+def _summary(old, new, changes, book, axes_changes, forms):
+    lines = [f'Reference {old.version} ({old.digest[:12]}) -> {new.version} ({new.digest[:12]})']
+    sections = {}
+    for c in changes:
+        sections[c['section']] = sections.get(c['section'], 0) + 1
+    lines.append('Changes: ' + (', '.join(f'{n} {s}' for s, n in sections.items()) or 'none'))
+    for name in OTHER_SUBTREES:
+        if name in sections:
+            lines.append(f'  {name} changed: target torque unaffected, pass torques/gasket windows may differ')
+    for name, (removed, added) in axes_changes.items():
+        lines.append(f'Torque book {name} axis: {len(removed)} removed, {len(added)} added')
+    if len(book['delta_ftlb']):
+        worst = np.nanmax(np.abs(book['delta_pct'])) if np.isfinite(book['delta_pct']).any() else np.nan
+        lines.append(f'Torque book: {len(book["delta_ftlb"])} cells changed in '
+                     f'{len(set(book["grade"].tolist()))} grades, max |delta| {worst:.2f}%')
+    else:
+        lines.append('Torque book: no cells changed')
+    if forms is not None:
+        lines.append(f'Historical forms: {len(forms["form_id"])} expected torques changed')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Diff two flange_reference.json versions and report the torque impact.')
+    parser.add_argument('old', type=Path, help='previous flange_reference.json (e.g. from git show)')
+    parser.add_argument('new', type=Path, nargs='?', default=REFERENCE_PATH)
+    parser.add_argument('--jobs', type=Path, nargs='+', default=[], help='jobs.json exports or directories searched for jobs*.json')
+    parser.add_argument('--out', type=Path, default=OUT_DIR)
+    parser.add_argument('--no-cache', action='store_true', help='rebuild the form indexes')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with session('reference_diff', args.profile, args.timings):
+        # the old file would share the new one's parse cache slot, so skip it
+        old = load_reference(args.old, use_cache=False)
+        new = load_reference(args.new)
+        with span('diff'):
+            changes = diff_references(old, new)
+        with span('torque_book'):
+            book, axes_changes = affected_cells(old, new, changes)
+        forms = None
+        if args.jobs:
+            whole, pairs = affected_pairs(changes, old, new)
+            threads = affected_threads(old, new, [(s, d) for s in new.thread_series for d in new.diameter_options])
+            parts = []
+            for path in job_files(args.jobs):
+                with span('forms'):
+                    index = load_form_index(path, not args.no_cache)
+                    parts.append(affected_forms(index, old, new, whole, pairs, threads))
+            forms = {name: np.concatenate([p[name] for p in parts]) if parts else np.empty(0)
+                     for name in FORM_COLUMNS}
+
+        args.out.mkdir(parents=True, exist_ok=True)
+        with span('write'):
+            _write_changes(args.out / 'changes.csv', changes)
+            for name in ('old_strength_ksi', 'new_strength_ksi', 'old_torque_ftlb', 'new_torque_ftlb', 'delta_ftlb'):
+                book[name] = np.round(book[name], 3)
+            book['delta_pct'] = np.round(book['delta_pct'], 2)
+            _write_columns(args.out / 'torque_cells.csv', CELL_COLUMNS, book)
+            if forms is not None:
+                _write_columns(args.out / 'forms.csv', FORM_COLUMNS, forms)
+            summary = _summary(old, new, changes, book, axes_changes, forms)
+            (args.out / 'summary.txt').write_text(summary + '\n', encoding='utf-8')
+    print(summary)
+    print('Wrote:', args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+import csv, io, json, math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from instrument import count, span
+from reference_data import load_reference
+from torque_engine import COLUMNS, factorial_axes, factorial_shape, factorial_slice, torque_book
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_CHUNK_ROWS = 50_000
+INTEGRAL_COLUMNS = {'tpi', 'used_temp_F', 'working_temp_F', 'basis_temp_F'}
+TEXT_COLUMNS = {'grade', 'diameter_in', 'thread_series', 'lube'}
+
+
+def cells(name, values):
+    # NaN -> None (blank in CSV); whole-number TPI/temps print without '.0'.
+    out = values.tolist()
+    for i, v in enumerate(out):
+        if isinstance(v, float):
+            if math.isnan(v):
+                out[i] = None
+            elif name in INTEGRAL_COLUMNS and v.is_integer():
+                out[i] = int(v)
+    return out
+
+
+def book_size(axes):
+    return int(np.prod(factorial_shape(axes)))
+
+
+def chunk_plan(axes, chunk_rows=DEFAULT_CHUNK_ROWS, shard='grade'):
+    # Row ranges of the book, never crossing a shard boundary: one grade
+    # ('grade') or one grade x thread series/diameter pair ('band'). Serial and
+    # parallel runs share this plan, which keeps their output byte-identical.
+    shape = factorial_shape(axes)
+    total = book_size(axes)
+    if total == 0:
+        return
+    block = int(np.prod(shape[1:] if shard == 'grade' else shape[2:]))
+    for block_start in range(0, total, block):
+        block_stop = block_start + block
+        for start in range(block_start, block_stop, chunk_rows):
+            yield start, min(start + chunk_rows, block_stop)
+
+
+def iter_book_chunks(ref=None, chunk_rows=DEFAULT_CHUNK_ROWS, axes=None, shard='grade'):
+    # Yields the full-factorial book as column dicts of at most chunk_rows rows,
+    # so memory stays bounded by the chunk size rather than the book size.
+    ref = ref if ref is not None else load_reference()
+    axes = axes if axes is not None else factorial_axes(ref)
+    for start, stop in chunk_plan(axes, chunk_rows, shard):
+        yield torque_book(factorial_slice(axes, start, stop), ref)
+
+
+class CsvSink:
+    suffix = '.csv'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._f = self.path.open('w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._f)
+        self._writer.writerow(COLUMNS)
+
+    @staticmethod
+    def encode(chunk):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(zip(*(cells(name, chunk[name]) for name in COLUMNS)))
+        return buf.getvalue()
+
+    def write(self, chunk):
+        self.write_encoded(self.encode(chunk))
+
+    def write_encoded(self, text):
+        self._f.write(text)
+
+    def close(self):
+        self._f.close()
+
+    def discard(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class ParquetSink:
+    suffix = '.parquet'
+
+    def __init__(self, path):
+        if pq is None:
+            raise SystemExit('Parquet output needs pyarrow (pip install pyarrow)')
+        self.path = Path(path)
+        self._writer = None
+
+    @staticmethod
+    def encode(chunk):
+        return pa.table({name: chunk[name] for name in COLUMNS})
+
+    def write(self, chunk):
+        self.write_encoded(self.encode(chunk))
+
+    def write_encoded(self, table):
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def discard(self):
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+class ColumnSink:
+    # Compact binary layout: one raw little-endian file per column plus
+    # schema.json. Text columns are stored as uint16 codes into a category list.
+    # Read back with read_columns(), which memory-maps each file.
+    suffix = '.columns'
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._files = {name: (self.path / name).open('wb') for name in COLUMNS}
+        self._categories = {name: {} for name in COLUMNS if name in TEXT_COLUMNS}
+        self._rows = 0
+
+    @staticmethod
+    def encode(chunk):
+        return {name: chunk[name] for name in COLUMNS}
+
+    def write(self, chunk):
+        self.write_encoded(chunk)
+
+    def write_encoded(self, chunk):
+        for name in COLUMNS:
+            values = chunk[name]
+            if name in TEXT_COLUMNS:
+                codes = self._categories[name]
+                uniques, inverse = np.unique(values, return_inverse=True)
+                lut = np.array([codes.setdefault(str(u), len(codes)) for u in uniques], dtype='<u2')
+                values = lut[inverse]
+            else:
+                values = np.asarray(values, dtype='<f8')
+            values.tofile(self._files[name])
+        self._rows += len(chunk[COLUMNS[0]])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        schema = {
+            'rows': self._rows,
+            'columns': [
+                {'name': name, 'dtype': '<u2' if name in TEXT_COLUMNS else '<f8',
+                 'categories': list(self._categories[name]) if name in TEXT_COLUMNS else None}
+                for name in COLUMNS
+            ],
+        }
+        (self.path / 'schema.json').write_text(json.dumps(schema, indent=2), encoding='utf-8')
+
+    def discard(self):
+        # removes only the column files this sink created
+        for name, f in self._files.items():
+            f.close()
+            (self.path / name).unlink(missing_ok=True)
+        if not any(self.path.iterdir()):
+            self.path.rmdir()
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink, 'columns': ColumnSink}
+
+
+def read_columns(path):
+    path = Path(path)
+    schema = json.loads((path / 'schema.json').read_text(encoding='utf-8'))
+    out = {}
+    for col in schema['columns']:
+        if schema['rows'] == 0:
+            values = np.empty(0, dtype=col['dtype'])
+        else:
+            values = np.memmap(path / col['name'], dtype=col['dtype'], mode='r', shape=(schema['rows'],))
+        if col['categories'] is not None:
+            values = np.array(col['categories'], dtype=str)[values]
+        out[col['name']] = values
+    return out
+
+
+_worker = {}
+
+
+def _init_worker(ref, axes, formats):
+    # Runs once per pool process: the parsed reference and axes arrive pickled
+    # here instead of each task re-reading flange_reference.json.
+    _worker.update(ref=ref, axes=axes, formats=formats)
+
+
+def _encode_chunk(bounds):
+    chunk = torque_book(factorial_slice(_worker['axes'], *bounds), _worker['ref'])
+    with span('encode'):
+        return len(chunk['grade']), [SINKS[fmt].encode(chunk) for fmt in _worker['formats']]
+
+
+def _encoded_chunks(ref, axes, formats, plan, workers):
+    if workers <= 1:
+        _init_worker(ref, axes, formats)
+        for bounds in plan:
+            yield _encode_chunk(bounds)
+        return
+    # Results are consumed in submission order with a bounded window of
+    # in-flight chunks, so output order matches the serial run and memory
+    # stays proportional to workers x chunk size.
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(ref, axes, formats)) as pool:
+        pending = deque()
+        for bounds in plan:
+            pending.append(pool.submit(_encode_chunk, bounds))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_book(out_base, formats=('csv',), ref=None, chunk_rows=DEFAULT_CHUNK_ROWS, axes=None,
+               workers=1, shard='grade'):
+    ref = ref if ref is not None else load_reference()
+    axes = axes if axes is not None else factorial_axes(ref)
+    sinks = []
+    try:
+        for fmt in formats:
+            sinks.append(SINKS[fmt](Path(str(out_base) + SINKS[fmt].suffix)))
+    except BaseException:
+        # a later sink could not open (e.g. Parquet without pyarrow): leave no
+        # header-only files from the ones already opened
+        for sink in sinks:
+            sink.discard()
+        raise
+    rows = 0
+    try:
+        plan = chunk_plan(axes, chunk_rows, shard)
+        chunks = _encoded_chunks(ref, axes, list(formats), plan, workers)
+        while True:
+            # with workers > 1 this is the wait for the pool, not the compute
+            with span('compute_encode'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            n, payloads = chunk
+            with span('write'):
+                for sink, payload in zip(sinks, payloads):
+                    sink.write_encoded(payload)
+            count('book_chunks')
+            rows += n
+    finally:
+        for sink in sinks:
+            sink.close()
+    return [sink.path for sink in sinks], rows
@@ -0,0 +1,258 @@
+import numpy as np
+
+from instrument import count, span
+from range_index import load_index
+from reference_data import load_reference
+
+# Nut factors offered by the app's lubricant dropdown (FlangeFormScreen.lubricantOptions).
+LUBE_K = {
+    'Dry': 0.27,
+    'Moly paste': 0.11,
+    'Never-Seez Regular': 0.13,
+    'Copper/Nickel anti-seize': 0.15,
+    'High-temp blends': 0.17,
+}
+
+TEMP_STEP_F = 50
+
+COLUMNS = (
+    'grade', 'diameter_in', 'thread_series', 'tpi', 'As_in2', 'working_temp_F', 'used_temp_F',
+    'Sy_or_allowable_ksi', 'pct_yield', 'bolt_load_F_lbf', 'lube', 'K', 'target_torque_ftlb',
+    'pass1_ftlb', 'pass2_ftlb', 'pass3_ftlb',
+)
+
+
+def _num(value):
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def thread_table(ref, series, dia_key):
+    # TPI and tensile stress area for one series/diameter; As falls back to
+    # 0.7854 * (D - 0.9743/TPI)^2 when only the TPI is tabulated.
+    tpi = ref.tpi.get(series, {}).get(dia_key)
+    as_in2 = ref.tensile_area.get(series, {}).get(dia_key)
+    if as_in2 is None and tpi is not None:
+        term = ref.diameter_in.get(dia_key, 0.0) - (0.9743 / tpi)
+        as_in2 = 0.7854 * term * term
+    return _num(tpi), _num(as_in2)
+
+
+def pass_pcts(ref):
+    logic = ref.pass_logic
+    return logic.get('pass1_default', 0.3), logic.get('pass2_default', 0.6), logic.get('pass3', 1.0)
+
+
+def _groups(codes):
+    # Yield (code, row indices) for each distinct code without a Python-level row loop.
+    if not len(codes):
+        return
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    for start, end in zip(starts, ends):
+        yield sorted_codes[start], order[start:end]
+
+
+_temp_arrays = {}
+
+
+def _split_hits(values):
+    s = np.array([_num(v[0]) if v is not None else np.nan for v in values])
+    used = np.array([float(v[1]) if v is not None else np.nan for v in values])
+    return s, used
+
+
+def _lookup_temps(temp_index, temps):
+    arrays = _temp_arrays.get(temp_index)
+    if arrays is None:
+        arrays = _temp_arrays[temp_index] = (
+            np.array(temp_index.points, dtype=float),
+            *_split_hits(temp_index.at_point),
+            *_split_hits(temp_index.in_gap),
+        )
+    points, at_s, at_used, gap_s, gap_used = arrays
+    i = np.searchsorted(points, temps, side='left')
+    if not len(points):
+        return gap_s[i], gap_used[i]
+    at_i = np.minimum(i, len(points) - 1)
+    exact = points[at_i] == temps
+    return np.where(exact, at_s[at_i], gap_s[i]), np.where(exact, at_used[at_i], gap_used[i])
+
+
+def lookup_strength(grade, dia_key, temp, ref=None):
+    # Vectorized Sy / allowable lookup. Returns (strength_ksi, used_temp_F)
+    # with NaN where nothing is tabulated; allowable at temperature wins over Sy,
+    # and a PLACEHOLDER allowable stays NaN rather than falling back to Sy.
+    ref = ref if ref is not None else load_reference()
+    index = load_index(ref)
+    grade = np.asarray(grade)
+    dia_key = np.asarray(dia_key)
+    temp = np.asarray(temp, dtype=float)
+    n = len(temp)
+    strength = np.full(n, np.nan)
+    used = np.full(n, np.nan)
+
+    grade_names, grade_codes = np.unique(grade, return_inverse=True)
+    dia_names, dia_codes = np.unique(dia_key, return_inverse=True)
+    pair_codes = grade_codes * len(dia_names) + dia_codes
+    for code, rows in _groups(pair_codes):
+        g = str(grade_names[code // len(dia_names)])
+        d = ref.diameter_in.get(str(dia_names[code % len(dia_names)]))
+        if d is None:
+            continue
+        allow_s = np.full(len(rows), np.nan)
+        allow_used = np.full(len(rows), np.nan)
+        dia_index = index.allowable.get(g)
+        for temp_index in (dia_index.lookup(d) if dia_index is not None else ()):
+            s, u = _lookup_temps(temp_index, temp[rows])
+            fill = np.isnan(allow_used) & ~np.isnan(u)
+            allow_s[fill] = s[fill]
+            allow_used[fill] = u[fill]
+        sy = index.lookup_sy(g, d)
+        strength[rows] = np.where(np.isnan(allow_used), _num(sy), allow_s)
+        used[rows] = allow_used
+    return strength, used
+
+
+def thread_columns(dia_key, series, ref):
+    # (tpi, As_in2, D_in) arrays, looked up once per distinct series/diameter.
+    dia_key = np.asarray(dia_key)
+    series = np.asarray(series)
+    n = len(dia_key)
+    tpi = np.full(n, np.nan)
+    as_in2 = np.full(n, np.nan)
+    d_in = np.full(n, np.nan)
+    thread_keys = np.char.add(np.char.add(series.astype(str), '|'), dia_key.astype(str))
+    thread_names, thread_codes = np.unique(thread_keys, return_inverse=True)
+    for code, rows in _groups(thread_codes):
+        s, d = str(thread_names[code]).split('|', 1)
+        tpi[rows], as_in2[rows] = thread_table(ref, s, d)
+        d_in[rows] = ref.diameter_in.get(d, np.nan)
+    return tpi, as_in2, d_in
+
+
+def compute_torque(grade, dia_key, series, temp, pct, k, ref=None, lookup=None):
+    # lookup: strength source with lookup_strength's signature, e.g. an
+    # allowable_grid.grid_lookup() for fine-resolution or interpolated sweeps.
+    ref = ref if ref is not None else load_reference()
+    lookup = lookup if lookup is not None else lookup_strength
+    dia_key = np.asarray(dia_key)
+    pct = np.asarray(pct, dtype=float)
+    k = np.asarray(k, dtype=float)
+
+    count('torque_rows', len(pct))
+    with span('thread_lookup'):
+        tpi, as_in2, d_in = thread_columns(dia_key, series, ref)
+    with span('strength_lookup'):
+        strength, used = lookup(grade, dia_key, temp, ref)
+
+    with span('torque_math'), np.errstate(invalid='ignore'):
+        valid = (as_in2 != 0) & (strength != 0)
+        bolt_load = np.where(valid, as_in2 * (strength * 1000.0) * pct, np.nan)
+        torque = (k * d_in * bolt_load) / 12.0
+    p1, p2, p3 = pass_pcts(ref)
+    return {
+        'tpi': tpi,
+        'As_in2': as_in2,
+        'used_temp_F': used,
+        'Sy_or_allowable_ksi': strength,
+        'bolt_load_F_lbf': bolt_load,
+        'target_torque_ftlb': torque,
+        'pass1_ftlb': torque * p1,
+        'pass2_ftlb': torque * p2,
+        'pass3_ftlb': torque * p3,
+    }
+
+
+def solve_load(grade, dia_key, series, temp, k, torque, ref=None):
+    # Inverse of compute_torque: bolt load F = 12*T / (K*D) implied by an
+    # applied torque, and the pct of Sy/allowable it stresses the bolt to.
+    ref = ref if ref is not None else load_reference()
+    k = np.asarray(k, dtype=float)
+    torque = np.asarray(torque, dtype=float)
+    tpi, as_in2, d_in = thread_columns(dia_key, series, ref)
+    strength, used = lookup_strength(grade, dia_key, temp, ref)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bolt_load = np.where((k > 0) & (d_in > 0), 12.0 * torque / (k * d_in), np.nan)
+        stress = np.where(as_in2 > 0, bolt_load / (as_in2 * 1000.0), np.nan)
+        pct = np.where(strength > 0, stress / strength, np.nan)
+    return {
+        'tpi': tpi,
+        'As_in2': as_in2,
+        'used_temp_F': used,
+        'Sy_or_allowable_ksi': strength,
+        'bolt_load_F_lbf': bolt_load,
+        'bolt_stress_ksi': stress,
+        'pct_yield': pct,
+    }
+
+
+def temperature_grid(ref, step=TEMP_STEP_F):
+    temps = [t for rs in ref.allowable.values() for r in rs for band in r.temps for t in (band.tmin, band.tmax)]
+    if not temps:
+        return np.arange(100, 1001, step)
+    lo = int(min(temps)) // step * step
+    hi = -(-int(max(temps)) // step) * step
+    return np.arange(lo, hi + 1, step)
+
+
+def default_pcts(ref):
+    pcts = {g.pct_default for g in ref.gasket_types if g.pct_default is not None}
+    pcts.add(0.5)
+    return sorted(pcts)
+
+
+def factorial_axes(ref=None, grades=None, diameters=None, series=None, temps=None, pcts=None, lubes=None):
+    # Axes of the full-factorial book: grade x (series, diameter) x temperature
+    # x pct yield x lube. Series/diameter pairs with no TPI or As are skipped
+    # since no torque exists for them.
+    ref = ref if ref is not None else load_reference()
+    lubes = list(lubes if lubes is not None else LUBE_K)
+    threads = []
+    for s in (series if series is not None else ref.thread_series):
+        for d in (diameters if diameters is not None else ref.diameter_options):
+            if not np.isnan(thread_table(ref, s, d)[1]):
+                threads.append((s, d))
+    return {
+        'grade': np.array(grades if grades is not None else ref.grades, dtype=str),
+        'thread': np.array(threads, dtype=str).reshape(-1, 2),
+        'temp': np.asarray(temps if temps is not None else temperature_grid(ref)),
+        'pct': np.asarray(pcts if pcts is not None else default_pcts(ref), dtype=float),
+        'lube': np.array(lubes, dtype=str),
+        'K': np.array([LUBE_K[l] for l in lubes], dtype=float),
+    }
+
+
+def factorial_shape(axes):
+    return (len(axes['grade']), len(axes['thread']), len(axes['temp']), len(axes['pct']), len(axes['lube']))
+
+
+def factorial_slice(axes, start, stop):
+    # Rows [start, stop) of the book in grade-major order, so chunks can be
+    # produced without materialising the whole index grid.
+    gi, ti, tempi, pi, li = np.unravel_index(np.arange(start, stop), factorial_shape(axes))
+    return {
+        'grade': axes['grade'][gi],
+        'diameter_in': axes['thread'][ti, 1],
+        'thread_series': axes['thread'][ti, 0],
+        'working_temp_F': axes['temp'][tempi],
+        'pct_yield': axes['pct'][pi],
+        'lube': axes['lube'][li],
+        'K': axes['K'][li],
+    }
+
+
+def factorial_inputs(ref=None, **axes):
+    axes = factorial_axes(ref, **axes)
+    return factorial_slice(axes, 0, int(np.prod(factorial_shape(axes))))
+
+
+def torque_book(inputs, ref=None):
+    out = compute_torque(
+        inputs['grade'], inputs['diameter_in'], inputs['thread_series'],
+        inputs['working_temp_F'], inputs['pct_yield'], inputs['K'], ref,
+    )
+    out.update(inputs)
+    return out
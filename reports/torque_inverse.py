@@ -0,0 +1,170 @@
+import argparse, csv
+from pathlib import Path
+
+import numpy as np
+
+from job_analytics import BATCH_FORMS, form_inputs, job_files
+from jobs_data import diameter_key, iter_jobs, job_forms, parse_number
+from reference_data import load_reference
+from torque_book import cells
+from torque_engine import solve_load
+
+# Bulk inverse of the torque formula: implied bolt load and pct of
+# Sy/allowable from applied torques, checked against the gasket's
+# boltStressPctYield_allowed window.
+
+INPUT_COLUMNS = ('grade', 'diameter_in', 'thread_series', 'working_temp_F', 'K', 'torque_ftlb')
+OUTPUT_COLUMNS = (
+    'source', 'job_number', 'form_id', 'gasket_type', 'grade', 'diameter_in', 'thread_series', 'working_temp_F',
+    'basis_temp_F', 'K', 'torque_ftlb', 'As_in2', 'Sy_or_allowable_ksi', 'bolt_load_F_lbf', 'bolt_stress_ksi', 'pct_yield',
+    'window_min', 'window_max', 'flag',
+)
+# ok / below_window / above_window: implied pct yield against the gasket window
+# no_window: gasket unknown or without a pct window (e.g. RTJ, specified torque only)
+# not_computable: missing K, diameter, As or strength
+FLAGS = ('ok', 'below_window', 'above_window', 'no_window', 'not_computable')
+
+
+def gasket_windows(ref, gaskets):
+    # (min, max) pct yield arrays for gasket ids or labels (the form stores the label).
+    by_name = {}
+    for g in ref.gasket_types:
+        if len(g.pct_allowed) == 2:
+            by_name[g.id] = by_name[g.label] = tuple(float(v) for v in g.pct_allowed)
+    names, codes = np.unique(np.asarray(gaskets, dtype=str), return_inverse=True)
+    table = np.array([by_name.get(str(n), (np.nan, np.nan)) for n in names], dtype=float).reshape(-1, 2)
+    return table[codes, 0], table[codes, 1]
+
+
+def solve(columns, ref=None):
+    # columns: INPUT_COLUMNS arrays plus optional 'gasket_type' and
+    # 'basis_temp_F' (the temperature the torque was computed at, default
+    # working_temp_F); returns the solver output with window bounds and a
+    # flag per row.
+    ref = ref if ref is not None else load_reference()
+    n = len(columns['torque_ftlb'])
+    temps = columns.get('basis_temp_F', columns['working_temp_F'])
+    out = solve_load(columns['grade'], columns['diameter_in'], columns['thread_series'],
+                     temps, columns['K'], columns['torque_ftlb'], ref)
+    lo, hi = gasket_windows(ref, columns.get('gasket_type', np.full(n, '')))
+    pct = out['pct_yield']
+    flag = np.full(n, 'ok', dtype=object)
+    flag[pct < lo] = 'below_window'
+    flag[pct > hi] = 'above_window'
+    flag[np.isnan(lo)] = 'no_window'
+    flag[np.isnan(pct)] = 'not_computable'
+    out.update(window_min=lo, window_max=hi, flag=flag)
+    return out
+
+
+def read_csv(path):
+    # CSV with INPUT_COLUMNS (+ optional basis_temp_F, gasket_type, job_number, form_id).
+    with Path(path).open(newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    missing = [c for c in INPUT_COLUMNS if rows and c not in rows[0]]
+    if missing:
+        raise SystemExit(f'{path}: missing columns {missing}')
+
+    def number(value):
+        parsed = parse_number(value or '')
+        return parsed if parsed is not None else np.nan
+
+    columns = {
+        'grade': np.array([r['grade'] for r in rows], dtype=str),
+        'diameter_in': np.array([diameter_key(r['diameter_in']) for r in rows], dtype=str),
+        'thread_series': np.array([r['thread_series'] for r in rows], dtype=str),
+        'working_temp_F': np.array([number(r['working_temp_F']) for r in rows], dtype=float),
+        'K': np.array([number(r['K']) for r in rows], dtype=float),
+        'torque_ftlb': np.array([number(r['torque_ftlb']) for r in rows], dtype=float),
+    }
+    columns['basis_temp_F'] = np.array([number(r.get('basis_temp_F') or r['working_temp_F']) for r in rows],
+                                       dtype=float)
+    for name in ('gasket_type', 'job_number', 'form_id'):
+        columns[name] = np.array([r.get(name, '') or '' for r in rows], dtype=str)
+    columns['source'] = np.full(len(rows), str(path))
+    return columns
+
+
+def _torque_used(form):
+    # target_torque_used_rule: specified torque when entered, else calculated
+    specified = parse_number(form.get('specifiedTargetTorque', ''))
+    return specified if specified is not None else parse_number(form.get('calculatedTargetTorque', ''))
+
+
+def iter_job_batches(path, batch_forms=BATCH_FORMS):
+    # Column batches from a jobs.json; every bolt on a flange gets the final
+    # (100%) pass torque, so one row per form stands for all its bolts. Rows
+    # are solved at basis_temp_F, the temperature the app set the torque at
+    # (roundedTempF, 100 F), not the form's working temperature, so the window
+    # check compares like with like.
+    batch = []
+
+    def columns():
+        inputs = [form_inputs(form) for _, form in batch]
+        torque = [_torque_used(form) for _, form in batch]
+        return {
+            'source': np.full(len(batch), str(path)),
+            'job_number': np.array([str(job.get('number', '')) for job, _ in batch], dtype=str),
+            'form_id': np.array([str(form.get('id', '')) for _, form in batch], dtype=str),
+            'gasket_type': np.array([str(form.get('gasketType', '')) for _, form in batch], dtype=str),
+            'grade': np.array([i['grade'] or '' for i in inputs], dtype=str),
+            'diameter_in': np.array([i['diameter'] for i in inputs], dtype=str),
+            'thread_series': np.array([i['thread_series'] for i in inputs], dtype=str),
+            'working_temp_F': np.array([i['working_temp_F'] for i in inputs], dtype=float),
+            'basis_temp_F': np.array([i['basis_temp_F'] for i in inputs], dtype=float),
+            'K': np.array([i['K'] if i['K'] is not None else np.nan for i in inputs], dtype=float),
+            'torque_ftlb': np.array([t if t is not None else np.nan for t in torque], dtype=float),
+        }
+
+    for job in iter_jobs(path):
+        for form in job_forms(job):
+            if isinstance(form, dict):
+                batch.append((job, form))
+                if len(batch) >= batch_forms:
+                    yield columns()
+                    batch = []
+    if batch:
+        yield columns()
+
+
+def _rounded(name, values):
+    if name in ('bolt_load_F_lbf', 'bolt_stress_ksi'):
+        return np.round(values, 1)
+    if name == 'pct_yield':
+        return np.round(values, 4)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Back out bolt load and pct yield from applied torques.')
+    parser.add_argument('paths', nargs='+', type=Path,
+                        help=f'jobs.json exports, directories searched for jobs*.json, or CSV files with '
+                             f'columns {", ".join(INPUT_COLUMNS)}')
+    parser.add_argument('--out', type=Path, default=Path('reports') / 'Torque_Inverse.csv')
+    parser.add_argument('--flagged', action='store_true', help='only write rows outside the gasket window')
+    args = parser.parse_args()
+
+    ref = load_reference()
+    counts = dict.fromkeys(FLAGS, 0)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with args.out.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_COLUMNS)
+        for path in job_files(args.paths):
+            batches = [read_csv(path)] if path.suffix.lower() == '.csv' else iter_job_batches(path)
+            for columns in batches:
+                out = solve(columns, ref)
+                out.update({k: v for k, v in columns.items() if k not in out})
+                for flag in FLAGS:
+                    counts[flag] += int((out['flag'] == flag).sum())
+                if args.flagged:
+                    keep = np.isin(out['flag'], ('below_window', 'above_window'))
+                    out = {k: v[keep] for k, v in out.items()}
+                writer.writerows(zip(*(cells(name, _rounded(name, np.asarray(out[name]))) for name in OUTPUT_COLUMNS)))
+
+    print(', '.join(f'{n} {flag}' for flag, n in counts.items()))
+    print('Wrote:', args.out)
+
+
+if __name__ == '__main__':
+    main()
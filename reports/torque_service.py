@@ -0,0 +1,326 @@
+import argparse, asyncio, json, math, os, time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from jobs_data import APP_GRADE_KEYS, diameter_key, parse_number, parse_percent
+from reference_data import REFERENCE_PATH, load_reference
+from torque_engine import LUBE_K, compute_torque
+
+# Localhost HTTP/JSON wrapper around torque_engine.compute_torque for
+# planning tools. Endpoints:
+#   GET  /health           reference version/digest and cache counters
+#   POST /torque           one joint as an object
+#   POST /torque/batch     {"rows": [...]} of objects or
+#                          [grade, diameter, series, temp, pct, K] arrays
+# Results are cached per normalized joint and dropped when
+# flange_reference.json changes on disk.
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 200_000
+DEFAULT_RELOAD_INTERVAL = 1.0
+MAX_BODY_BYTES = 64 * 1024 * 1024
+INPUT_FIELDS = ('grade', 'diameter', 'series', 'temp', 'pct', 'K')
+RESULT_FIELDS = (
+    'tpi', 'As_in2', 'used_temp_F', 'Sy_or_allowable_ksi', 'bolt_load_F_lbf', 'target_torque_ftlb',
+    'pass1_ftlb', 'pass2_ftlb', 'pass3_ftlb',
+)
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LruCache:
+    __slots__ = ('maxsize', 'hits', 'misses', '_data')
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_lookups = {}
+
+
+def _reference_lookups(ref):
+    # (grades, thread series, diameter key by inch value) as hashed lookups,
+    # built once per reference digest.
+    lookups = _lookups.get(ref.digest)
+    if lookups is None:
+        lookups = _lookups[ref.digest] = (
+            frozenset(ref.grades),
+            frozenset(ref.thread_series),
+            {v: k for k, v in reversed(list(ref.diameter_in.items()))},
+        )
+    return lookups
+
+
+def normalize(raw, ref):
+    # -> (grade, diameter key, series, temp F, pct fraction, K), the cache key.
+    # Accepts the app's labels as well as reference keys: 'A193 B7' or
+    # 'A193_B7', '1-1/2' or 1.5, 50 or 0.5 for pct, a lube name for K.
+    if isinstance(raw, (list, tuple)):
+        if len(raw) != len(INPUT_FIELDS):
+            raise ValueError(f'expected {len(INPUT_FIELDS)} values: {", ".join(INPUT_FIELDS)}')
+        raw = dict(zip(INPUT_FIELDS, raw))
+    if not isinstance(raw, dict):
+        raise ValueError('joint must be an object or an array')
+    grades, thread_series, dia_by_value = _reference_lookups(ref)
+
+    grade = str(raw.get('grade', '')).strip()
+    grade = grade if grade in grades else APP_GRADE_KEYS.get(grade, grade)
+    if grade not in grades:
+        raise ValueError(f'unknown grade {grade!r}')
+
+    dia = diameter_key(raw.get('diameter', ''))
+    if dia not in ref.diameter_in:
+        dia = dia_by_value.get(parse_number(dia), dia)
+    if dia not in ref.diameter_in:
+        raise ValueError(f'unknown diameter {raw.get("diameter")!r}')
+
+    series = str(raw.get('series', '')).strip().upper()
+    if series not in thread_series:
+        raise ValueError(f'unknown thread series {raw.get("series")!r}')
+
+    temp = parse_number(raw.get('temp', ''))
+    pct = parse_percent(raw.get('pct', ''))
+    k = raw.get('K', '')
+    k = LUBE_K[k] if isinstance(k, str) and k in LUBE_K else parse_number(k)
+    for name, value in (('temp', temp), ('pct', pct), ('K', k)):
+        if value is None or not math.isfinite(value):
+            raise ValueError(f'{name} must be a number')
+    return grade, dia, series, temp, pct, k
+
+
+def _result(columns, i):
+    # NaN (nothing tabulated) -> null
+    out = {}
+    for name in RESULT_FIELDS:
+        value = float(columns[name][i])
+        out[name] = None if math.isnan(value) else value
+    return out
+
+
+class TorqueService:
+    def __init__(self, reference_path=REFERENCE_PATH, cache_size=DEFAULT_CACHE_SIZE):
+        self.reference_path = Path(reference_path)
+        self.ref = load_reference(self.reference_path)
+        self.cache = LruCache(cache_size)
+        self.reloads = 0
+        self._stat = self._reference_stat()
+
+    def _reference_stat(self):
+        try:
+            st = os.stat(self.reference_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def reload_if_changed(self):
+        # Returns True when a new reference was loaded. A half-written or
+        # invalid file keeps the previous reference until the next change.
+        stat = self._reference_stat()
+        if stat is None or stat == self._stat:
+            return False
+        self._stat = stat
+        try:
+            ref = load_reference(self.reference_path)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f'Reference reload failed, keeping {self.ref.digest[:12]}: {exc}')
+            return False
+        if ref.digest == self.ref.digest:
+            return False
+        self.ref = ref
+        self.cache.clear()
+        self.reloads += 1
+        print(f'Reloaded {self.reference_path} (version {ref.version}, {ref.digest[:12]})')
+        return True
+
+    def solve(self, joints):
+        # Cache lookups per joint; all misses go through one vectorized
+        # compute_torque call. Invalid joints get {'error': ...}.
+        ref = self.ref
+        results = [None] * len(joints)
+        missing = {}
+        for i, raw in enumerate(joints):
+            try:
+                key = normalize(raw, ref)
+            except ValueError as exc:
+                results[i] = {'error': str(exc)}
+                continue
+            hit = self.cache.get(key)
+            if hit is not None:
+                results[i] = hit
+            else:
+                missing.setdefault(key, []).append(i)
+        if missing:
+            keys = list(missing)
+            grade, dia, series, temp, pct, k = (np.array(col) for col in zip(*keys))
+            columns = compute_torque(grade, dia, series, temp.astype(float), pct.astype(float), k.astype(float), ref)
+            for j, key in enumerate(keys):
+                result = _result(columns, j)
+                self.cache.put(key, result)
+                for i in missing[key]:
+                    results[i] = result
+        return results
+
+    def health(self):
+        return {
+            'reference': str(self.reference_path),
+            'version': self.ref.version,
+            'digest': self.ref.digest,
+            'reloads': self.reloads,
+            'cache': {'size': len(self.cache), 'max': self.cache.maxsize,
+                      'hits': self.cache.hits, 'misses': self.cache.misses},
+        }
+
+    def handle(self, method, path, body):
+        # -> (status, payload)
+        if path == '/health':
+            if method != 'GET':
+                raise RequestError(405, 'use GET')
+            return 200, self.health()
+        if path not in ('/torque', '/torque/batch'):
+            raise RequestError(404, f'no endpoint {path}')
+        if method != 'POST':
+            raise RequestError(405, 'use POST')
+        try:
+            data = json.loads(body or b'null')
+        except ValueError as exc:
+            raise RequestError(400, f'invalid JSON: {exc}')
+        if path == '/torque':
+            return 200, self.solve([data])[0]
+        rows = data.get('rows') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise RequestError(400, 'expected {"rows": [...]} or a JSON array')
+        started = time.perf_counter()
+        results = self.solve(rows)
+        return 200, {'results': results, 'elapsed_ms': round((time.perf_counter() - started) * 1000.0, 3)}
+
+
+async def _read_request(reader):
+    # -> (method, path, headers, body) or None at EOF
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError(400, 'malformed request line')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise RequestError(400, f'invalid Content-Length {headers["content-length"]!r}')
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f'body over {MAX_BODY_BYTES} bytes')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    head = (
+        f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+    )
+    return head.encode('latin-1') + body
+
+
+async def _serve_client(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = service.handle(method, path, body)
+            except RequestError as exc:
+                keep_alive = False
+                status, payload = exc.status, {'error': str(exc)}
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _watch_reference(service, interval):
+    while True:
+        await asyncio.sleep(interval)
+        service.reload_if_changed()
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, reload_interval=DEFAULT_RELOAD_INTERVAL):
+    server = await asyncio.start_server(lambda r, w: _serve_client(service, r, w), host, port)
+    watcher = asyncio.create_task(_watch_reference(service, reload_interval)) if reload_interval > 0 else None
+    print(f'Serving torque calculations on http://{host}:{port} (reference {service.ref.digest[:12]})')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve batch torque calculations over HTTP/JSON on localhost.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--reference', type=Path, default=REFERENCE_PATH)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='cached joints (LRU)')
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help='seconds between reference file checks; 0 disables hot reload')
+    args = parser.parse_args()
+
+    service = TorqueService(args.reference, args.cache_size)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+import argparse, csv, json, time
+from pathlib import Path
+
+import numpy as np
+
+from range_index import load_index
+from reference_data import load_reference
+from torque_book import DEFAULT_CHUNK_ROWS, cells
+from torque_engine import LUBE_K, default_pcts, factorial_axes, factorial_shape, factorial_slice, torque_book
+
+# Monte Carlo scatter of the bolt load reached by torque-controlled tightening.
+# The wrench is set to the nominal target T0 = K0*D*F0/12; the joint responds
+# with its actual nut factor, tensile area and applied pct yield:
+#   F = F0 * m_pct / m_K            stress = S * pct * m_pct / (m_K * m_As)
+# where m_* are sampled multipliers with mean 1. They do not depend on grade,
+# diameter or temperature, so one sorted sample per lube serves every
+# combination: percentiles scale F0 and exceedance probabilities are
+# searchsorted lookups against the sample.
+
+INPUTS = ('K', 'pct', 'As')
+DISTRIBUTIONS = ('normal', 'uniform', 'lognormal')
+# (distribution, spread): sd for normal (clipped at 3 sd), half-width for
+# uniform, CV for lognormal, all relative to the nominal value.
+DEFAULT_SPREADS = {'K': ('normal', 0.10), 'pct': ('uniform', 0.04), 'As': ('uniform', 0.02)}
+DEFAULT_SAMPLES = 1_000_000
+DEFAULT_BATCH = 250_000
+DEFAULT_TEMPS = (100,)  # the app computes torque at a 100°F working temperature
+QUANTILES = (0.01, 0.05, 0.5, 0.95, 0.99)
+
+COLUMNS = (
+    'grade', 'diameter_in', 'thread_series', 'working_temp_F', 'pct_yield', 'lube', 'K',
+    'Sy_or_allowable_ksi', 'Sy_ksi', 'target_torque_ftlb', 'bolt_load_F_lbf', 'load_p05_lbf',
+    'load_p50_lbf', 'load_p95_lbf', 'stress_p95_ksi', 'p_exceed_allowable', 'p_exceed_yield',
+)
+
+
+def check_spread(dist, spread):
+    # Every multiplier must stay positive: a uniform half-width of 1 or more
+    # reaches K <= 0 and turns the 1/K load negative. Normal is clipped below
+    # and lognormal is always positive. 0 means no scatter.
+    if dist not in DISTRIBUTIONS:
+        raise ValueError(f'unknown distribution {dist!r}; expected one of {DISTRIBUTIONS}')
+    if not np.isfinite(spread) or spread < 0:
+        raise ValueError(f'{dist} spread must be a finite number >= 0, got {spread}')
+    if dist == 'uniform' and spread >= 1:
+        raise ValueError(f'uniform spread must be below 1 (multipliers 1 +/- spread), got {spread}')
+
+
+def sample_multipliers(rng, dist, spread, n):
+    check_spread(dist, spread)
+    if spread == 0:
+        return np.ones(n)
+    if dist == 'normal':
+        # clipped at 3 sd (and above zero): the tail near K = 0 would
+        # otherwise dominate the 1/K load scatter
+        return np.maximum(1.0 + spread * np.clip(rng.standard_normal(n), -3.0, 3.0), 1e-3)
+    if dist == 'uniform':
+        return rng.uniform(1.0 - spread, 1.0 + spread, n)
+    if dist == 'lognormal':
+        sigma = np.sqrt(np.log1p(spread * spread))
+        return rng.lognormal(-0.5 * sigma * sigma, sigma, n)
+
+
+def simulate(spreads, samples=DEFAULT_SAMPLES, seed=0, batch=DEFAULT_BATCH):
+    # -> {'load': sorted m_pct/m_K, 'stress': sorted load/m_As, 'log_var': {input: var}}
+    # Sampled in batches so temporaries stay at `batch` elements per input.
+    rng = np.random.default_rng(seed)
+    load = np.empty(samples)
+    stress = np.empty(samples)
+    log_sum = dict.fromkeys(INPUTS, 0.0)
+    log_sq = dict.fromkeys(INPUTS, 0.0)
+    for start in range(0, samples, batch):
+        n = min(batch, samples - start)
+        m = {name: sample_multipliers(rng, *spreads[name], n) for name in INPUTS}
+        for name, values in m.items():
+            logs = np.log(values)
+            log_sum[name] += logs.sum()
+            log_sq[name] += (logs * logs).sum()
+        load[start:start + n] = m['pct'] / m['K']
+        stress[start:start + n] = load[start:start + n] / m['As']
+    load.sort()
+    stress.sort()
+    log_var = {name: log_sq[name] / samples - (log_sum[name] / samples) ** 2 for name in INPUTS}
+    return {'load': load, 'stress': stress, 'log_var': log_var}
+
+
+def exceed_probability(sorted_sample, thresholds):
+    # P(sample > threshold), vectorized over thresholds
+    below = np.searchsorted(sorted_sample, np.asarray(thresholds, dtype=float), side='right')
+    return 1.0 - below / len(sorted_sample)
+
+
+def lube_summary(sim):
+    # Load scatter relative to nominal and the share of log-stress variance
+    # from each input (exact first-order indices for a product of independent
+    # factors).
+    load = sim['load']
+    total = sum(sim['log_var'].values())
+    return {
+        'load_pct_of_nominal': {f'p{round(q * 100):02d}': round(float(np.quantile(load, q)) * 100, 2) for q in QUANTILES},
+        'load_cv': round(float(load.std() / load.mean()), 4),
+        'variance_share': {name: round(v / total, 4) if total else 0.0 for name, v in sim['log_var'].items()},
+    }
+
+
+def combination_stats(chunk, sim, sy):
+    # Per-row load percentiles and exceedance probabilities for one lube.
+    strength = chunk['Sy_or_allowable_ksi']
+    pct = chunk['pct_yield']
+    f0 = chunk['bolt_load_F_lbf']
+    p05, p50, p95 = np.quantile(sim['load'], (0.05, 0.5, 0.95))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        allow_thr = 1.0 / pct
+        yield_thr = sy / (strength * pct)
+    p_yield = exceed_probability(sim['stress'], np.nan_to_num(yield_thr, nan=np.inf))
+    return {
+        'load_p05_lbf': f0 * p05,
+        'load_p50_lbf': f0 * p50,
+        'load_p95_lbf': f0 * p95,
+        'stress_p95_ksi': strength * pct * float(np.quantile(sim['stress'], 0.95)),
+        'p_exceed_allowable': exceed_probability(sim['stress'], allow_thr),
+        'p_exceed_yield': np.where(np.isnan(yield_thr), np.nan, p_yield),
+    }
+
+
+def _sy_column(ref, grades, diameters):
+    index = load_index(ref)
+    memo = {}
+    out = np.empty(len(grades))
+    for i, (g, d) in enumerate(zip(grades.tolist(), diameters.tolist())):
+        if (g, d) not in memo:
+            sy = index.lookup_sy(g, ref.diameter_in.get(d)) if d in ref.diameter_in else None
+            memo[g, d] = float(sy) if sy is not None else np.nan
+        out[i] = memo[g, d]
+    return out
+
+
+def iter_rows(ref, sims, axes, chunk_rows=DEFAULT_CHUNK_ROWS):
+    # Streams the factorial book in chunks, adding Monte Carlo columns; rows
+    # without a computable torque are dropped.
+    total = int(np.prod(factorial_shape(axes)))
+    for start in range(0, total, chunk_rows):
+        chunk = torque_book(factorial_slice(axes, start, min(start + chunk_rows, total)), ref)
+        keep = ~np.isnan(chunk['target_torque_ftlb'])
+        chunk = {k: v[keep] for k, v in chunk.items()}
+        if not keep.any():
+            continue
+        chunk['Sy_ksi'] = _sy_column(ref, chunk['grade'], chunk['diameter_in'])
+        stats = {name: np.full(len(chunk['grade']), np.nan) for name in COLUMNS[11:]}
+        for lube, sim in sims.items():
+            rows = chunk['lube'] == lube
+            if rows.any():
+                part = combination_stats({k: v[rows] for k, v in chunk.items()}, sim, chunk['Sy_ksi'][rows])
+                for name, values in part.items():
+                    stats[name][rows] = values
+        chunk.update(stats)
+        yield chunk
+
+
+def _rounded(name, values):
+    if name.startswith('p_exceed'):
+        return np.round(values, 6)
+    if name.endswith(('_lbf', '_ftlb', '_ksi')):
+        return np.round(values, 1)
+    return values
+
+
+def run(ref=None, spreads=None, k_spreads=None, samples=DEFAULT_SAMPLES, seed=0, temps=DEFAULT_TEMPS,
+        pcts=None, lubes=None, out_dir=Path('reports')):
+    ref = ref if ref is not None else load_reference()
+    spreads = dict(DEFAULT_SPREADS, **(spreads or {}))
+    lubes = list(lubes or LUBE_K)
+    axes = factorial_axes(ref, temps=list(temps), pcts=pcts if pcts is not None else default_pcts(ref), lubes=lubes)
+
+    # One simulation per distinct K spread; every lube reuses the same seed
+    # (common random numbers), so lube differences are not sampling noise.
+    started = time.perf_counter()
+    sims, by_spec = {}, {}
+    for lube in lubes:
+        lube_spreads = dict(spreads, K=(spreads['K'][0], (k_spreads or {}).get(lube, spreads['K'][1])))
+        spec = tuple(lube_spreads[name] for name in INPUTS)
+        if spec not in by_spec:
+            by_spec[spec] = simulate(lube_spreads, samples, seed)
+        sims[lube] = by_spec[spec]
+    sim_s = time.perf_counter() - started
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = out_dir / 'Torque_Uncertainty.csv'
+    rows = 0
+    with csv_path.open('w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for chunk in iter_rows(ref, sims, axes):
+            columns = [cells(name, _rounded(name, chunk[name])) for name in COLUMNS]
+            writer.writerows(zip(*columns))
+            rows += len(columns[0])
+
+    summary = {
+        'samples_per_simulation': samples,
+        'simulations': len(by_spec),
+        'seed': seed,
+        'simulation_s': round(sim_s, 3),
+        'spreads': {name: {'distribution': d, 'spread': s} for name, (d, s) in spreads.items()},
+        'K_spread_by_lube': {lube: (k_spreads or {}).get(lube, spreads['K'][1]) for lube in lubes},
+        'lubes': {lube: lube_summary(sim) for lube, sim in sims.items()},
+        'rows': rows,
+    }
+    json_path = out_dir / 'Torque_Uncertainty_Summary.json'
+    json_path.write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    return csv_path, json_path, summary
+
+
+def _spread_arg(text):
+    dist, _, spread = text.partition(':')
+    if dist not in DISTRIBUTIONS or not spread:
+        raise argparse.ArgumentTypeError(f'expected DIST:SPREAD with DIST in {DISTRIBUTIONS}, e.g. normal:0.1')
+    try:
+        spread = float(spread)
+        check_spread(dist, spread)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return dist, spread
+
+
+def _lube_spread_arg(text):
+    lube, _, spread = text.rpartition('=')
+    if lube not in LUBE_K or not spread:
+        raise argparse.ArgumentTypeError(f'expected LUBE=SPREAD with LUBE in {sorted(LUBE_K)}')
+    return lube, float(spread)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo bolt load scatter and allowable-stress exceedance '
+                                                 'for every grade/diameter/lube combination.')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='samples per simulation')
+    parser.add_argument('--seed', type=int, default=0)
+    for name in INPUTS:
+        dist, spread = DEFAULT_SPREADS[name]
+        parser.add_argument(f'--{name.lower()}-spread', dest=name, type=_spread_arg, default=None,
+                            help=f'DIST:SPREAD relative to nominal (default {dist}:{spread})')
+    parser.add_argument('--lube-k-spread', type=_lube_spread_arg, action='append', default=[],
+                        help='per-lube K spread, e.g. "Dry=0.2" (repeatable)')
+    parser.add_argument('--temps', type=float, nargs='+', default=list(DEFAULT_TEMPS), help='working temperatures, °F')
+    parser.add_argument('--pcts', type=float, nargs='+', help='pct yield targets (default: gasket defaults + 0.5)')
+    parser.add_argument('--lube', dest='lubes', action='append', choices=sorted(LUBE_K), help='repeatable (default: all)')
+    parser.add_argument('--out', type=Path, default=Path('reports'), help='output directory')
+    args = parser.parse_args()
+
+    spreads = {name: getattr(args, name) for name in INPUTS if getattr(args, name) is not None}
+    k_dist = spreads.get('K', DEFAULT_SPREADS['K'])[0]
+    for lube, spread in args.lube_k_spread:
+        try:
+            check_spread(k_dist, spread)
+        except ValueError as exc:
+            parser.error(f'--lube-k-spread {lube}: {exc}')
+    csv_path, json_path, summary = run(spreads=spreads, k_spreads=dict(args.lube_k_spread), samples=args.samples,
+                                       seed=args.seed, temps=args.temps, pcts=args.pcts, lubes=args.lubes,
+                                       out_dir=args.out)
+    n = summary['samples_per_simulation'] * summary['simulations']
+    print(f"{n:,} samples in {summary['simulation_s']} s; {summary['rows']} combinations")
+    for lube, s in summary['lubes'].items():
+        band = s['load_pct_of_nominal']
+        print(f"  {lube}: load p05-p95 {band['p05']}-{band['p95']}% of nominal, CV {s['load_cv']}")
+    print('Wrote:', csv_path, json_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,460 @@
+import argparse, json, math, time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from bolt_sequence import validate as validate_sequences
+from reference_data import (CACHE_DIR, REFERENCE_PATH, _fingerprint, is_placeholder, parse_diameter,
+                            subtree_fingerprints)
+
+CACHE_PATH = CACHE_DIR / 'validate_cache.json'
+# Bump when a check changes so cached results are recomputed.
+CHECKS_VERSION = 1
+TEMP_STEP_F = 50
+
+# Required structure: nested dicts are sections, types are leaf expectations.
+SCHEMA = {
+    'version': str,
+    'fasteners': {
+        'diameterOptions_in': list,
+        'threadSeriesOptions': list,
+        'tpi_lookup': dict,
+        'tensileStressArea_As_in2_lookup': dict,
+        'boltGrades': {
+            'options': list,
+            'strength_Sy_Su_min_ksi': dict,
+            'allowableStress_S_ksi_atTemp': dict,
+        },
+        'nutGrades': {'options': list},
+    },
+    'gasket_logic': {'gasket_types': list},
+    'torque_calculation': {'pass_logic': dict},
+    'tightening': {'sequenceLookup': {'sequenceByBoltCount': dict}},
+}
+
+
+class Issue:
+    __slots__ = ('severity', 'code', 'path', 'message')
+
+    def __init__(self, severity, code, path, message):
+        self.severity = severity
+        self.code = code
+        self.path = path
+        self.message = message
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self):
+        return f'{self.severity}: {self.code} at {self.path}: {self.message}'
+
+
+def compile_schema(spec, prefix=()):
+    # Flattens SCHEMA into (path, type) pairs, parents before children.
+    out = []
+    for key, expected in spec.items():
+        path = prefix + (key,)
+        if isinstance(expected, dict):
+            out.append((path, dict))
+            out.extend(compile_schema(expected, path))
+        else:
+            out.append((path, expected))
+    return out
+
+
+COMPILED_SCHEMA = compile_schema(SCHEMA)
+
+
+def _path(*parts):
+    out = ''
+    for part in parts:
+        out += f'[{part}]' if isinstance(part, int) else (f'.{part}' if out else str(part))
+    return out
+
+
+def check_schema(root):
+    issues = []
+    broken = set()
+    for path, expected in COMPILED_SCHEMA:
+        if any(path[:i] in broken for i in range(1, len(path))):
+            continue
+        node = root
+        for key in path[:-1]:
+            node = node[key]
+        if path[-1] not in node:
+            issues.append(Issue('error', 'missing_key', _path(*path), f'required {expected.__name__} is missing'))
+            broken.add(path)
+        elif not isinstance(node[path[-1]], expected):
+            issues.append(Issue('error', 'wrong_type', _path(*path),
+                                f'expected {expected.__name__}, got {type(node[path[-1]]).__name__}'))
+            broken.add(path)
+    return issues
+
+
+def check_value(value, path, name, issues, allow_zero=False):
+    # Returns the value as a float when it is a usable number.
+    if value is None:
+        issues.append(Issue('error', 'missing_value', path, f'{name} is null'))
+    elif is_placeholder(value):
+        issues.append(Issue('warning', 'placeholder', path, f'{name} is a placeholder ({value})'))
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        issues.append(Issue('error', 'not_a_number', path, f'{name} is {value!r}'))
+    elif value < 0 or (value == 0 and not allow_zero) or math.isnan(value):
+        issues.append(Issue('error', 'out_of_range', path, f'{name} is {value}'))
+    else:
+        return float(value)
+    return None
+
+
+def sweep(intervals, path, what, points=None, step=None):
+    # Sort-and-sweep over inclusive (lo, hi, label) intervals. Overlaps are
+    # errors (first match wins, so later entries are dead). Gaps are warnings
+    # when they leave a sorted point uncovered, or a multiple of `step`.
+    issues = []
+    covered_to, owner = -math.inf, None
+    for lo, hi, label in sorted(intervals, key=lambda r: (r[0], r[1])):
+        if lo > hi:
+            issues.append(Issue('error', f'{what}_inverted', _path(path, label), f'{what} range {lo}..{hi} is reversed'))
+            continue
+        if lo <= covered_to:
+            issues.append(Issue('error', f'{what}_overlap', _path(path, label),
+                                f'{what} range {lo}..{hi} overlaps {_path(path, owner)} (ends at {covered_to})'))
+        elif owner is not None:
+            missing = _uncovered(covered_to, lo, points, step)
+            if missing:
+                issues.append(Issue('warning', f'{what}_gap', _path(path, label),
+                                    f'no {what} range covers {", ".join(map(_fmt, missing))}'))
+        if hi > covered_to:
+            covered_to, owner = hi, label
+    if points is not None and intervals:
+        first = min(lo for lo, _, _ in intervals)
+        missing = points[:bisect_left(points, first)] + points[bisect_right(points, covered_to):]
+        if missing:
+            issues.append(Issue('warning', f'{what}_gap', path, f'no {what} range covers {", ".join(map(_fmt, missing))}'))
+    return issues
+
+
+def _uncovered(after, before, points, step):
+    if points is not None:
+        return points[bisect_right(points, after):bisect_left(points, before)]
+    if step is not None:
+        first = (math.floor(after / step) + 1) * step
+        return list(range(int(first), int(math.ceil(before)), step))
+    return []
+
+
+def _fmt(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _number_key(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_diameters(fasteners):
+    issues = []
+    seen = {}
+    for i, key in enumerate(fasteners.get('diameterOptions_in', [])):
+        path = _path('fasteners', 'diameterOptions_in', i)
+        try:
+            parse_diameter(str(key))
+        except (ValueError, ZeroDivisionError):
+            issues.append(Issue('error', 'bad_diameter', path, f'cannot parse diameter {key!r}'))
+        if key in seen:
+            issues.append(Issue('error', 'duplicate_diameter', path, f'{key} already listed at index {seen[key]}'))
+        seen.setdefault(key, i)
+    return issues
+
+
+def check_threads(fasteners):
+    issues = []
+    options = fasteners.get('diameterOptions_in', [])
+    for table, name, code in (('tpi_lookup', 'TPI', 'tpi'), ('tensileStressArea_As_in2_lookup', 'As', 'as')):
+        lookup = fasteners.get(table, {})
+        for series in fasteners.get('threadSeriesOptions', []):
+            values = lookup.get(series)
+            if values is None:
+                issues.append(Issue('error', f'missing_{code}_series', _path('fasteners', table, series),
+                                    f'no {name} table for {series}'))
+                continue
+            for dia in options:
+                path = _path('fasteners', table, series, dia)
+                # sizes a series does not cover are simply absent (8UN starts at 1 in.)
+                if dia not in values:
+                    continue
+                if values[dia] is None:
+                    issues.append(Issue('warning', f'null_{code}', path, f'{series} {dia} {name} is null'))
+                else:
+                    check_value(values[dia], path, name, issues)
+            for dia in values:
+                if dia not in options:
+                    issues.append(Issue('warning', 'unknown_diameter', _path('fasteners', table, series, dia),
+                                        f'{dia} is not in diameterOptions_in'))
+    return issues
+
+
+def _dia_points(fasteners):
+    points = []
+    for key in fasteners.get('diameterOptions_in', []):
+        try:
+            points.append(parse_diameter(str(key)))
+        except (ValueError, ZeroDivisionError):
+            pass
+    return sorted(points)
+
+
+def check_grades(bolt_grades):
+    issues = []
+    options = bolt_grades.get('options', [])
+    for table in ('strength_Sy_Su_min_ksi', 'allowableStress_S_ksi_atTemp'):
+        data = bolt_grades.get(table, {})
+        for grade in options:
+            if grade not in data:
+                issues.append(Issue('warning', 'missing_grade_data', _path('fasteners', 'boltGrades', table),
+                                    f'{grade} has no entries'))
+        for grade in data:
+            if grade not in options:
+                issues.append(Issue('warning', 'unknown_grade', _path('fasteners', 'boltGrades', table, grade),
+                                    f'{grade} is not in boltGrades.options'))
+    return issues
+
+
+def check_strength(grade, ranges, points):
+    issues = []
+    base = _path('fasteners', 'boltGrades', 'strength_Sy_Su_min_ksi', grade)
+    intervals = []
+    for i, r in enumerate(ranges):
+        path = _path(base, i)
+        lo, hi = r.get('diaMin_in'), r.get('diaMax_in')
+        if _number_key(lo) and _number_key(hi):
+            intervals.append((lo, hi, i))
+        else:
+            issues.append(Issue('error', 'bad_dia_range', path, f'diaMin_in/diaMax_in are {lo!r}/{hi!r}'))
+        sy = check_value(r.get('Sy'), _path(path, 'Sy'), 'Sy', issues)
+        su = check_value(r.get('Su'), _path(path, 'Su'), 'Su', issues)
+        if sy is not None and su is not None and sy > su:
+            issues.append(Issue('error', 'sy_above_su', path, f'Sy {sy} exceeds Su {su}'))
+    issues.extend(sweep(intervals, base, 'dia', points=points))
+    return issues
+
+
+def check_allowable(grade, ranges, points):
+    issues = []
+    base = _path('fasteners', 'boltGrades', 'allowableStress_S_ksi_atTemp', grade)
+    intervals = []
+    for i, r in enumerate(ranges):
+        path = _path(base, i)
+        lo, hi = r.get('diaMin_in'), r.get('diaMax_in')
+        if _number_key(lo) and _number_key(hi):
+            intervals.append((lo, hi, i))
+        else:
+            issues.append(Issue('error', 'bad_dia_range', path, f'diaMin_in/diaMax_in are {lo!r}/{hi!r}'))
+        temps = r.get('temps', [])
+        if not temps:
+            issues.append(Issue('warning', 'no_temps', path, 'no temperature bands'))
+        bands = []
+        for j, t in enumerate(temps):
+            tpath = _path(path, 'temps', j)
+            tmin, tmax = t.get('tMin'), t.get('tMax')
+            if _number_key(tmin) and _number_key(tmax):
+                bands.append((tmin, tmax, j))
+            else:
+                issues.append(Issue('error', 'bad_temp_range', tpath, f'tMin/tMax are {tmin!r}/{tmax!r}'))
+            check_value(t.get('S'), _path(tpath, 'S'), 'S', issues)
+        issues.extend(sweep(bands, _path(path, 'temps'), 'temp', step=TEMP_STEP_F))
+    issues.extend(sweep(intervals, base, 'dia', points=points))
+    return issues
+
+
+def check_nuts(fasteners):
+    issues = []
+    options = fasteners.get('nutGrades', {}).get('options', [])
+    if not options:
+        issues.append(Issue('error', 'no_nut_grades', 'fasteners.nutGrades.options', 'no nut grades listed'))
+    for i, nut in enumerate(options):
+        if options.index(nut) != i:
+            issues.append(Issue('error', 'duplicate_nut', _path('fasteners', 'nutGrades', 'options', i), f'{nut} listed twice'))
+    return issues
+
+
+def _window(value, path, name, issues):
+    if not (isinstance(value, list) and len(value) == 2 and all(_number_key(v) for v in value)):
+        issues.append(Issue('error', 'bad_window', path, f'{name} must be [low, high], got {value!r}'))
+        return None
+    lo, hi = value
+    if lo > hi or lo < 0 or hi > 1:
+        issues.append(Issue('error', 'bad_window', path, f'{name} [{lo}, {hi}] is not an increasing fraction range'))
+        return None
+    return lo, hi
+
+
+def _in_window(value, window, path, name, issues):
+    pct = check_value(value, path, name, issues)
+    if pct is not None and window is not None and not window[0] <= pct <= window[1]:
+        issues.append(Issue('error', 'default_outside_window', path, f'{name} {pct} is outside {list(window)}'))
+
+
+def check_gaskets(root):
+    issues = []
+    seen = set()
+    for i, g in enumerate(root.get('gasket_logic', {}).get('gasket_types', [])):
+        path = _path('gasket_logic', 'gasket_types', i)
+        gid = g.get('id')
+        if not gid:
+            issues.append(Issue('error', 'missing_gasket_id', path, 'gasket type has no id'))
+        elif gid in seen:
+            issues.append(Issue('error', 'duplicate_gasket_id', path, f'{gid} listed twice'))
+        seen.add(gid)
+        defaults = g.get('defaults', {})
+        if not g.get('allowCalculatedTorque', True):
+            if not defaults.get('specifiedTargetTorque_required', False):
+                issues.append(Issue('warning', 'specified_torque_not_required', path,
+                                    f'{gid} disallows calculated torque but does not require a specified torque'))
+            continue
+        window = _window(defaults.get('boltStressPctYield_allowed'), _path(path, 'defaults', 'boltStressPctYield_allowed'),
+                         'boltStressPctYield_allowed', issues)
+        _in_window(defaults.get('boltStressPctYield_default'), window,
+                   _path(path, 'defaults', 'boltStressPctYield_default'), 'boltStressPctYield_default', issues)
+    return issues
+
+
+def check_pass_logic(root):
+    issues = []
+    base = _path('torque_calculation', 'pass_logic')
+    logic = root.get('torque_calculation', {}).get('pass_logic', {})
+    for n in (1, 2):
+        window = _window(logic.get(f'pass{n}_allowed'), _path(base, f'pass{n}_allowed'), f'pass{n}_allowed', issues)
+        _in_window(logic.get(f'pass{n}_default'), window, _path(base, f'pass{n}_default'), f'pass{n}_default', issues)
+    check_value(logic.get('pass3'), _path(base, 'pass3'), 'pass3', issues)
+    return issues
+
+
+def check_sequences(root):
+    issues = []
+    base = _path('tightening', 'sequenceLookup', 'sequenceByBoltCount')
+    tightening = root.get('tightening', {})
+    raw = tightening.get('sequenceLookup', {}).get('sequenceByBoltCount', {})
+    table = {}
+    for key, bolts in raw.items():
+        try:
+            table[int(key)] = bolts
+        except ValueError:
+            issues.append(Issue('error', 'bad_bolt_count', _path(base, key), f'{key!r} is not a bolt count'))
+    for count, problem in validate_sequences(table):
+        issues.append(Issue('error', 'sequence_mismatch', _path(base, str(count)), problem))
+    span = tightening.get('boltCountRange', {})
+    expected = list(range(span.get('minEven', 4), span.get('maxEven', 0) + 1, span.get('step', 2) or 2))
+    missing = sorted(set(expected) - set(table))
+    if missing:
+        issues.append(Issue('warning', 'sequence_missing', base,
+                            f'boltCountRange lists counts without sequences: {", ".join(map(str, missing))}'))
+    return issues
+
+
+def check_units(root):
+    # Yields (unit, fingerprint keys it reads, check function). Each unit walks
+    # only its own subtree, so together they cover the file in one pass.
+    fasteners = root['fasteners']
+    bolt_grades = fasteners['boltGrades']
+    points = _dia_points(fasteners)
+    yield 'diameters', ('diameters',), lambda: check_diameters(fasteners)
+    yield 'threads', ('diameters', 'thread_series', 'tpi', 'tensile_area'), lambda: check_threads(fasteners)
+    yield 'grades', ('grades', 'strength/*', 'allowable/*'), lambda: check_grades(bolt_grades)
+    for grade, ranges in bolt_grades.get('strength_Sy_Su_min_ksi', {}).items():
+        yield 'strength/' + grade, ('diameters', 'strength/' + grade), \
+            lambda grade=grade, ranges=ranges: check_strength(grade, ranges, points)
+    for grade, ranges in bolt_grades.get('allowableStress_S_ksi_atTemp', {}).items():
+        yield 'allowable/' + grade, ('diameters', 'allowable/' + grade), \
+            lambda grade=grade, ranges=ranges: check_allowable(grade, ranges, points)
+    yield 'nuts', ('nuts',), lambda: check_nuts(fasteners)
+    yield 'gaskets', ('gaskets',), lambda: check_gaskets(root)
+    yield 'pass_logic', ('pass_logic',), lambda: check_pass_logic(root)
+    yield 'sequences', ('sequences',), lambda: check_sequences(root)
+
+
+def _unit_fingerprint(keys, fingerprints):
+    parts = {'version': CHECKS_VERSION}
+    for key in keys:
+        if key.endswith('/*'):
+            prefix = key[:-1]
+            parts[key] = sorted(k for k in fingerprints if k.startswith(prefix))
+        else:
+            parts[key] = fingerprints.get(key)
+    return _fingerprint(parts)
+
+
+def validate(data, cache=None):
+    # Returns (issues, units rerun). With a cache dict, units whose inputs
+    # are unchanged reuse their stored issues; the dict is updated in place.
+    root = data.get('flange_helper_reference_data')
+    if not isinstance(root, dict):
+        return [Issue('error', 'missing_key', 'flange_helper_reference_data', 'root object is missing')], 0
+    issues = check_schema(root)
+    if issues:
+        return issues, 0
+    fingerprints = subtree_fingerprints(root)
+    rerun = 0
+    live = set()
+    for unit, keys, check in check_units(root):
+        live.add(unit)
+        fp = _unit_fingerprint(keys, fingerprints)
+        cached = cache.get(unit) if cache is not None else None
+        if cached is not None and cached['fingerprint'] == fp:
+            issues.extend(Issue(**i) for i in cached['issues'])
+            continue
+        found = check()
+        rerun += 1
+        if cache is not None:
+            cache[unit] = {'fingerprint': fp, 'issues': [i.to_dict() for i in found]}
+        issues.extend(found)
+    if cache is not None:
+        for unit in set(cache) - live:
+            del cache[unit]
+    return issues, rerun
+
+
+def load_cache(path=CACHE_PATH):
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, sort_keys=True), encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate flange_reference.json (structure, ranges, missing data).')
+    parser.add_argument('path', type=Path, nargs='?', default=REFERENCE_PATH)
+    parser.add_argument('--json', action='store_true', help='print issues as JSON')
+    parser.add_argument('--strict', action='store_true', help='fail on warnings as well as errors')
+    parser.add_argument('--no-cache', action='store_true', help='rerun every check')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        data = json.loads(args.path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise SystemExit(f'Cannot read {args.path}: {e}')
+    cache = None if args.no_cache else load_cache()
+    issues, rerun = validate(data, cache)
+    if cache is not None:
+        save_cache(cache)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for i in issues if i.severity == 'error')
+    warnings = len(issues) - errors
+    if args.json:
+        print(json.dumps({'errors': errors, 'warnings': warnings, 'issues': [i.to_dict() for i in issues]}, indent=2))
+    else:
+        for issue in issues:
+            print(issue)
+        print(f'{args.path}: {errors} errors, {warnings} warnings ({rerun} checks run, {elapsed * 1000:.0f} ms)')
+    if errors or (args.strict and warnings):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
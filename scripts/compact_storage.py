@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+from PIL import Image, ImageChops
+
+# Shrinks a copy of the app's flange_helper storage directory (jobs.json,
+# photos/, signatures/, exports/) before it is synced or archived.
+
+JOBS_FILE = "jobs.json"
+STORAGE_DIR = "flange_helper"
+STORAGE_LIMIT_BYTES = 750 * 1024 * 1024  # JobStorage.STORAGE_LIMIT_BYTES
+MEDIA_DIRS = ("photos", "signatures")
+
+DEFAULT_MAX_EDGE = 1600  # PdfExporter.PDF_PHOTO_MAX_EDGE_PX
+DEFAULT_QUALITY = 80
+INK_THRESHOLD = 128
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def storage_relative(uri: str) -> str | None:
+    # photos/<name> or signatures/<name> for a form URI, following
+    # JobStorage.fileFromContentUri (FileProvider roots or .../flange_helper/...).
+    parsed = urlparse(uri)
+    parts = [unquote(p) for p in parsed.path.split("/") if p]
+    if parsed.scheme == "content" and len(parts) > 1 and parts[0] in MEDIA_DIRS:
+        return "/".join(parts)
+    if STORAGE_DIR in parts:
+        rest = parts[parts.index(STORAGE_DIR) + 1:]
+        return "/".join(rest) if rest else None
+    return None
+
+
+def encode_photo(path: Path, max_edge: int, quality: int) -> bytes | None:
+    # JPEG re-encode at most max_edge px on the long side. EXIF (orientation
+    # included) is kept and pixels are not rotated, so viewers and the app's
+    # BitmapFactory decode see the same image as before. None: keep the file.
+    with Image.open(path) as im:
+        if im.format != "JPEG":
+            return None
+        exif = im.info.get("exif")
+        scale = min(1.0, max_edge / max(im.size))
+        size = (max(1, round(im.width * scale)), max(1, round(im.height * scale)))
+        if scale < 1.0:
+            # DCT-domain downscale while decoding, then a final filtered resize
+            im.draft("RGB", size)
+        im = im.convert("RGB") if im.mode not in ("RGB", "L") else im
+        if im.size != size:
+            im = im.resize(size, Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="JPEG", quality=quality, optimize=True, **({"exif": exif} if exif else {}))
+    return buf.getvalue()
+
+
+def encode_signature(path: Path, threshold: int = INK_THRESHOLD) -> bytes | None:
+    # 1-bit palette PNG: ink is black, background white or transparent as in
+    # the source. Stays a PNG under the same name, so URIs keep working.
+    with Image.open(path) as im:
+        transparent = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+        rgba = im.convert("RGBA")
+    opaque = rgba.getchannel("A").point(lambda a: 255 if a >= threshold else 0)
+    dark = rgba.convert("L").point(lambda v: 255 if v < threshold else 0)
+    out = Image.new("P", rgba.size, 0)
+    out.putpalette([255, 255, 255, 0, 0, 0])
+    out.paste(1, mask=ImageChops.multiply(opaque, dark))
+    buf = io.BytesIO()
+    params = {"transparency": 0} if transparent else {}
+    out.save(buf, format="PNG", optimize=True, bits=1, **params)
+    return buf.getvalue()
+
+
+def compact_file(src: Path, dst: Path | None, kind: str, args: argparse.Namespace) -> tuple[int, int]:
+    # -> (bytes before, bytes after); the original is kept if re-encoding
+    # fails or does not make it smaller. dst None is a dry run.
+    before = src.stat().st_size
+    try:
+        data = (encode_photo(src, args.max_edge, args.quality) if kind == "photos"
+                else encode_signature(src, args.threshold))
+    except (OSError, ValueError):
+        data = None
+    if data is None or len(data) >= before:
+        if dst is not None:
+            shutil.copy2(src, dst)
+        return before, before
+    if dst is not None:
+        dst.write_bytes(data)
+    return before, len(data)
+
+
+def find_duplicates(root: Path) -> dict[str, str]:
+    # duplicate relative path -> first file (sorted) with identical content,
+    # grouped within photos/ and signatures/.
+    replace: dict[str, str] = {}
+    for kind in MEDIA_DIRS:
+        first: dict[str, str] = {}
+        for path in sorted((root / kind).glob("*")):
+            if path.is_file():
+                rel = f"{kind}/{path.name}"
+                digest = file_hash(path)
+                if digest in first:
+                    replace[rel] = first[digest]
+                else:
+                    first[digest] = rel
+    return replace
+
+
+def repoint(uri: str, replace: dict[str, str]) -> str:
+    rel = storage_relative(uri) if uri else None
+    if rel in replace and uri.endswith(rel):
+        return uri[: -len(rel)] + replace[rel]
+    return uri
+
+
+def form_uris(form: dict) -> list[str]:
+    return [form.get("contractorSignUri"), form.get("facilitySignUri")] + list(form.get("photoUris") or [])
+
+
+def unmapped_duplicates(jobs: list, replace: dict[str, str]) -> set[str]:
+    # Duplicates named by a jobs.json URI that repoint() cannot rewrite (a
+    # plain path outside flange_helper/, another FileProvider root, an encoded
+    # name). Dropping them would leave that reference dangling, so they are
+    # copied instead.
+    by_name: dict[str, list[str]] = {}
+    for rel in replace:
+        by_name.setdefault(rel.split("/", 1)[1], []).append(rel)
+    kept: set[str] = set()
+    for job in jobs:
+        for form in job.get("forms") or []:
+            for uri in form_uris(form):
+                if not uri:
+                    continue
+                name = unquote(urlparse(uri).path.rstrip("/").rsplit("/", 1)[-1])
+                for rel in by_name.get(name, ()):
+                    if repoint(uri, {rel: replace[rel]}) == uri:
+                        kept.add(rel)
+    return kept
+
+
+def rewrite_uris(jobs: list, replace: dict[str, str]) -> int:
+    changed = 0
+    for job in jobs:
+        for form in job.get("forms") or []:
+            for key in ("contractorSignUri", "facilitySignUri"):
+                if form.get(key) and repoint(form[key], replace) != form[key]:
+                    form[key] = repoint(form[key], replace)
+                    changed += 1
+            photos = form.get("photoUris") or []
+            swapped = [repoint(u, replace) for u in photos]
+            if swapped != photos:
+                form["photoUris"] = swapped
+                changed += 1
+    return changed
+
+
+def format_mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shrink photos and signatures in an exported flange_helper directory.")
+    parser.add_argument("storage", type=Path, help="flange_helper directory (jobs.json, photos/, signatures/)")
+    parser.add_argument("--out", type=Path, help="output directory (default: <storage>_compact)")
+    parser.add_argument("--max-edge", type=int, default=DEFAULT_MAX_EDGE, help="longest photo side in px")
+    parser.add_argument("--quality", type=int, default=DEFAULT_QUALITY, help="JPEG quality for photos")
+    parser.add_argument("--threshold", type=int, default=INK_THRESHOLD, help="signature ink threshold (0-255)")
+    parser.add_argument("--no-dedupe", action="store_true", help="keep identical images as separate files")
+    parser.add_argument("--workers", type=int, default=4, help="encoder threads")
+    parser.add_argument("--dry-run", action="store_true", help="report savings without writing anything")
+    args = parser.parse_args()
+
+    root = args.storage
+    jobs_path = root / JOBS_FILE
+    if not root.is_dir():
+        raise SystemExit(f"Storage directory not found: {root}")
+    out = None if args.dry_run else (args.out or root.with_name(root.name + "_compact"))
+    if out is not None and out.resolve() == root.resolve():
+        raise SystemExit("--out must differ from the storage directory")
+
+    # Duplicates can only be dropped when jobs.json is there to repoint the forms,
+    # and only those whose every reference can be repointed.
+    replace = {} if args.no_dedupe or not jobs_path.exists() else find_duplicates(root)
+    kept = set()
+    if replace:
+        jobs = json.loads(jobs_path.read_text(encoding="utf-8") or "[]")
+        kept = unmapped_duplicates(jobs, replace)
+        for rel in kept:
+            del replace[rel]
+    if out is not None:
+        shutil.copytree(root, out, dirs_exist_ok=True,
+                        ignore=lambda d, names: names if Path(d).name in MEDIA_DIRS else [])
+        for kind in MEDIA_DIRS:
+            (out / kind).mkdir(exist_ok=True)
+
+    totals = {kind: [0, 0, 0, 0] for kind in MEDIA_DIRS}  # files, before, after, duplicates
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for kind in MEDIA_DIRS:
+            for src in sorted((root / kind).glob("*")):
+                if not src.is_file():
+                    continue
+                if f"{kind}/{src.name}" in replace:
+                    size = src.stat().st_size
+                    totals[kind][1] += size
+                    totals[kind][3] += 1
+                    continue
+                dst = out / kind / src.name if out is not None else None
+                futures.append((kind, pool.submit(compact_file, src, dst, kind, args)))
+        for kind, future in futures:
+            before, after = future.result()
+            totals[kind][0] += 1
+            totals[kind][1] += before
+            totals[kind][2] += after
+
+    if kept:
+        print(f"Kept {len(kept)} duplicate images referenced by URIs that cannot be repointed")
+    if replace:
+        changed = rewrite_uris(jobs, replace)
+        if out is not None:
+            (out / JOBS_FILE).write_text(json.dumps(jobs, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        print(f"Repointed {changed} form references to deduplicated images")
+
+    saved = 0
+    for kind, (files, before, after, dupes) in totals.items():
+        saved += before - after
+        print(f"{kind}: {files} files, {dupes} duplicates dropped, {format_mb(before)} -> {format_mb(after)}")
+    print(f"Saved {format_mb(saved)} ({saved / STORAGE_LIMIT_BYTES:.1%} of the {format_mb(STORAGE_LIMIT_BYTES)} storage limit)")
+    if out is not None:
+        print(f"Output dir: {out}")
+
+
+if __name__ == "__main__":
+    main()
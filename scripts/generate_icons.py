@@ -1,49 +1,139 @@
 ﻿from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from PIL import Image
 
 ROOT = Path(__file__).resolve().parents[1]
-INPUT = ROOT / "assets" / "branding" / "Flange Helper.png"
-OUTPUT_DIR = ROOT / "assets" / "branding" / "exports"
-NAME = "FH"
+BRANDING_DIR = ROOT / "assets" / "branding"
+OUTPUT_DIR = BRANDING_DIR / "exports"
+MANIFEST = OUTPUT_DIR / ".icon_manifest.json"
+
+# name used in output files -> master image
+MASTERS = {
+    "FH": BRANDING_DIR / "Flange Helper.png",
+    "WH": BRANDING_DIR / "Welders Helper MAIN Program.png",
+}
+DEFAULT_MASTERS = ["FH"]
 
 ANDROID_SIZES = [48, 72, 96, 144, 192, 512, 1024]
 IOS_SIZES = [20, 29, 40, 58, 60, 76, 80, 87, 120, 152, 167, 180, 1024]
+PLATFORMS = {"Android": ANDROID_SIZES, "iOS": IOS_SIZES}
 
+# Bump when the resampling below changes so cached outputs are rebuilt.
+PIPELINE_VERSION = 1
+RESAMPLE = "LANCZOS"
 
-def ensure_output_dir() -> None:
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
 
-def resize_and_save(img: Image.Image, size: int, platform: str) -> Path:
-    target = img.resize((size, size), Image.LANCZOS)
-    filename = f"{size}x{size}_{NAME}_{platform}.png"
-    out_path = OUTPUT_DIR / filename
-    target.save(out_path, format="PNG")
-    return out_path
 
+def output_name(size: int, name: str, platform: str) -> str:
+    return f"{size}x{size}_{name}_{platform}.png"
+
+
+def load_manifest() -> dict:
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict) -> None:
+    MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def build_pyramid(img: Image.Image, smallest: int) -> list[Image.Image]:
+    # Halve the master while the next level still holds twice the smallest
+    # target, so every size is resampled from a nearby level instead of the
+    # full-resolution master.
+    levels = [img]
+    while levels[-1].width // 2 >= smallest * 2:
+        prev = levels[-1]
+        levels.append(prev.resize((prev.width // 2, prev.height // 2), Image.LANCZOS))
+    return levels
 
-def main() -> None:
-    if not INPUT.exists():
-        raise SystemExit(f"Input not found: {INPUT}")
 
-    img = Image.open(INPUT)
+def pick_level(levels: list[Image.Image], size: int) -> Image.Image:
+    # Smallest level that is still at least 2x the target (or the master).
+    for level in reversed(levels):
+        if level.width >= size * 2:
+            return level
+    return levels[0]
+
+
+def resize_and_save(levels: list[Image.Image], size: int, out_paths: list[Path]) -> list[Path]:
+    source = pick_level(levels, size)
+    target = source if source.width == size else source.resize((size, size), Image.LANCZOS)
+    for out_path in out_paths:
+        target.save(out_path, format="PNG")
+    return out_paths
+
+
+def export_master(name: str, pool: ThreadPoolExecutor, manifest: dict, force: bool) -> tuple[int, int, list[int]]:
+    path = MASTERS[name]
+    if not path.exists():
+        raise SystemExit(f"Input not found: {path}")
+    params = {"source": file_hash(path), "resample": RESAMPLE, "version": PIPELINE_VERSION}
+
+    img = Image.open(path)
+    # size -> output paths; one resize serves every platform sharing a size
+    wanted: dict[int, list[Path]] = {}
+    too_large: list[int] = []
+    for platform, sizes in PLATFORMS.items():
+        for size in sizes:
+            if size > img.width:
+                too_large.append(size)
+                continue
+            filename = output_name(size, name, platform)
+            out_path = OUTPUT_DIR / filename
+            if not force and out_path.exists() and manifest.get(filename) == params:
+                continue
+            wanted.setdefault(size, []).append(out_path)
+
+    skipped = sum(len(s) for s in PLATFORMS.values()) - len(too_large) - sum(len(p) for p in wanted.values())
+    if not wanted:
+        return 0, skipped, too_large
+
     if img.mode not in ("RGB", "RGBA"):
         img = img.convert("RGBA")
+    img.load()
+    levels = build_pyramid(img, min(wanted))
+    futures = [pool.submit(resize_and_save, levels, size, paths) for size, paths in sorted(wanted.items(), reverse=True)]
+    generated = 0
+    for future in futures:
+        for out_path in future.result():
+            manifest[out_path.name] = params
+            generated += 1
+    return generated, skipped, too_large
 
-    ensure_output_dir()
 
-    generated: list[Path] = []
-    for size in ANDROID_SIZES:
-        generated.append(resize_and_save(img, size, "Android"))
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export Android/iOS icon sizes from the branding masters.")
+    parser.add_argument("--master", action="append", choices=sorted(MASTERS),
+                        help="master to export (repeatable, default: FH)")
+    parser.add_argument("--all", action="store_true", help="export every master")
+    parser.add_argument("--workers", type=int, default=4, help="resize threads")
+    parser.add_argument("--force", action="store_true", help="rewrite outputs even when unchanged")
+    args = parser.parse_args()
+
+    names = sorted(MASTERS) if args.all else (args.master or DEFAULT_MASTERS)
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest()
 
-    for size in IOS_SIZES:
-        generated.append(resize_and_save(img, size, "iOS"))
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for name in names:
+            generated, skipped, too_large = export_master(name, pool, manifest, args.force)
+            save_manifest(manifest)
+            print(f"{name}: {MASTERS[name].name} -> generated {generated}, unchanged {skipped}")
+            if too_large:
+                print(f"  skipped sizes larger than the master: {sorted(set(too_large))}")
 
-    print(f"Input: {INPUT} ({img.width}x{img.height})")
     print(f"Output dir: {OUTPUT_DIR}")
-    print(f"Generated {len(generated)} files")
 
 
 if __name__ == "__main__":